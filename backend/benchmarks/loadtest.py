@@ -0,0 +1,381 @@
+"""
+Reproducible load test for the SahayataAI API.
+
+Run from the backend directory:
+
+    # 1. Seed a database with the dataset, optionally scaled 10x/100x
+    python -m benchmarks.loadtest seed --database-url postgresql://localhost/sahayata_bench --scale 10
+
+    # 2. Start the API against that database, then replay the workload
+    DATABASE_URL=postgresql://localhost/sahayata_bench RATE_LIMIT_ENABLED=0 uvicorn main:app --port 8000
+    python -m benchmarks.loadtest run --base-url http://localhost:8000 \\
+        --concurrency 16 --duration 60 --output baseline.json
+
+    # 3. Compare a later run against the baseline (exit code 1 on regression)
+    python -m benchmarks.loadtest compare baseline.json current.json --tolerance 0.15
+
+The workload is generated from a fixed random seed, so two runs with the same
+arguments send the same request sequence per worker. Seeding runs the real
+importer, so versions, translations, constraints and related schemes are
+filled as in production. To benchmark the embedded read-only catalogue, add
+--embedded catalogue.sqlite3 to the seed command and serve that file with
+CATALOGUE_BACKEND=sqlite EMBEDDED_CATALOGUE_PATH=catalogue.sqlite3 (it has no
+login route).
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import requests
+
+# Default request mix (relative weights)
+DEFAULT_MIX = {
+    "chat": 50,
+    "search": 15,
+    "category": 10,
+    "detail": 15,
+    "eligibility": 7,
+    "login": 3,
+}
+
+BENCH_USER = {
+    "name": "Bench User",
+    "mobile": "9000000000",
+    "dob": "1990-01-01",
+    "gender": "Female",
+    "username": "bench_user",
+    "password": "bench_password",
+}
+
+PROFILE_CHOICES = {
+    "gender": [None, "Male", "Female", "Women"],
+    "age": [None, 12, 22, 30, 45, 65],
+    "occupation": [None, "Farmer", "Student", "Artisan", "Self-employed", "Other"],
+    "location": [None, "Rural", "Urban"],
+    "caste": [None, "General", "SC", "ST", "OBC"],
+    "annual_income": [None, 50000, 200000, 600000],
+}
+
+
+# ============================================================================
+# SEEDING
+# ============================================================================
+
+# Emptied by a reset, children first
+CATALOGUE_TABLES = ("scheme_translations", "scheme_relations", "scheme_constraints", "scheme_changes",
+                    "catalogue_versions", "schemes")
+
+
+def scaled_dataset(scale: int):
+    """SahayataDatasetFinal.csv repeated `scale` times; copies get unique names in every language"""
+    import pandas as pd
+
+    df = pd.read_csv("SahayataDatasetFinal.csv")
+    name_columns = [column for column in df.columns if column.startswith("Scheme Name (")]
+    copies = [df]
+    for copy in range(1, scale):
+        # Synthetic copies keep the text (and therefore match rates) but get unique names
+        clone = df.copy()
+        for column in name_columns:
+            clone[column] = clone[column].astype(str) + f" #{copy}"
+        copies.append(clone)
+    return pd.concat(copies, ignore_index=True)
+
+
+def seed_database(database_url: str, scale: int, reset: bool, embedded: str = None) -> int:
+    """Import the dataset, repeated `scale` times, with import_data; optionally export the SQLite catalogue"""
+    from sqlalchemy import create_engine, inspect, text
+    import import_data
+    from database.connection import Base
+    import models.schemes  # noqa: F401 - register tables on Base
+    import models.users  # noqa: F401
+
+    engine = create_engine(database_url, echo=False)
+    Base.metadata.create_all(bind=engine)
+    if reset:
+        existing = set(inspect(engine).get_table_names())
+        with engine.begin() as conn:
+            for table in CATALOGUE_TABLES:
+                if table in existing:
+                    conn.execute(text(f"DELETE FROM {table}"))
+
+    df = scaled_dataset(scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "dataset.csv")
+        df.to_csv(csv_path, index=False)
+        import_data.DATABASE_URL = database_url
+        import_data.import_schemes(csv_path)
+    if embedded:
+        import_data.export_embedded(embedded)
+    return len(df)
+
+
+# ============================================================================
+# WORKLOAD
+# ============================================================================
+
+def build_chat_messages() -> Dict[str, List[str]]:
+    """Chat messages per language from INTENT_KEYWORDS and the no-result suggestions"""
+    from routes.chatbot import INTENT_KEYWORDS, NO_RESULTS_SUGGESTIONS
+
+    messages = {}
+    for lang, intents in INTENT_KEYWORDS.items():
+        lang_messages = []
+        for keywords in intents.values():
+            lang_messages.extend(keywords)
+        for option in NO_RESULTS_SUGGESTIONS[lang]["options"]:
+            lang_messages.extend(re.findall(r"'([^']+)'", option))
+        messages[lang] = sorted(set(lang_messages))
+    return messages
+
+
+class Workload:
+    """Deterministic request generator for one worker"""
+
+    def __init__(self, seed: int, mix: Dict[str, int], messages: Dict[str, List[str]],
+                 categories: List[str], scheme_ids: List[int]):
+        self.rng = random.Random(seed)
+        self.routes = list(mix.keys())
+        self.weights = [mix[route] for route in self.routes]
+        self.messages = messages
+        self.categories = categories or ["Education"]
+        self.scheme_ids = scheme_ids or [1]
+
+    def next_request(self) -> Tuple[str, str, str, dict]:
+        """Return (route label, method, path, kwargs for requests)"""
+        route = self.rng.choices(self.routes, self.weights)[0]
+        rng = self.rng
+
+        if route == "chat":
+            lang = rng.choices(["en", "te", "hi"], [60, 25, 15])[0]
+            return route, "POST", "/api/chatbot/chat", {
+                "json": {"message": rng.choice(self.messages[lang]), "language": lang}
+            }
+        if route == "search":
+            lang = rng.choices(["en", "te", "hi"], [60, 25, 15])[0]
+            query = rng.choice([m for m in self.messages[lang] if len(m) >= 2])
+            return route, "GET", "/api/schemes/search", {
+                "params": {"query": query, "language": lang}
+            }
+        if route == "category":
+            return route, "GET", f"/api/schemes/category/{rng.choice(self.categories)}", {}
+        if route == "detail":
+            return route, "GET", f"/api/schemes/{rng.choice(self.scheme_ids)}", {}
+        if route == "eligibility":
+            profile = {key: rng.choice(values) for key, values in PROFILE_CHOICES.items()}
+            return route, "POST", "/api/schemes/check-eligibility", {
+                "json": {key: value for key, value in profile.items() if value is not None}
+            }
+        return route, "POST", "/api/auth/login", {
+            "json": {"username": BENCH_USER["username"], "password": BENCH_USER["password"]}
+        }
+
+
+def _discover_catalogue(session: requests.Session, base_url: str) -> Tuple[List[str], List[int]]:
+    stats = session.get(f"{base_url}/api/schemes/statistics", timeout=30).json()
+    categories = [cat["name"] for cat in stats.get("categories", [])]
+    scheme_ids = []
+    for category in categories:
+        listing = session.get(f"{base_url}/api/schemes/category/{category}",
+                              params={"limit": 100}, timeout=30).json()
+        scheme_ids.extend(scheme["id"] for scheme in listing.get("schemes", []))
+    return categories, sorted(set(scheme_ids))
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: List[Tuple[str, float, int]], elapsed: float) -> Dict:
+    """Per-route throughput and latency percentiles (milliseconds)"""
+    by_route: Dict[str, List[Tuple[float, int]]] = {}
+    for route, latency, status_code in samples:
+        by_route.setdefault(route, []).append((latency, status_code))
+    by_route["all"] = [(latency, status_code) for _, latency, status_code in samples]
+
+    report = {}
+    for route, values in sorted(by_route.items()):
+        latencies = sorted(latency * 1000 for latency, _ in values)
+        errors = sum(1 for _, status_code in values if status_code == 0 or status_code >= 500)
+        rate_limited = sum(1 for _, status_code in values if status_code == 429)
+        report[route] = {
+            "requests": len(values),
+            "errors": errors,
+            "rate_limited": rate_limited,
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        }
+    return report
+
+
+def run_load(base_url: str, concurrency: int, duration: float, max_requests: int,
+             seed: int, mix: Dict[str, int]) -> Dict:
+    base_url = base_url.rstrip("/")
+    setup = requests.Session()
+    setup.post(f"{base_url}/api/auth/signup", json=BENCH_USER, timeout=30)
+    categories, scheme_ids = _discover_catalogue(setup, base_url)
+    messages = build_chat_messages()
+
+    samples: List[Tuple[str, float, int]] = []
+    samples_lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        session = requests.Session()
+        workload = Workload(seed + worker_id, mix, messages, categories, scheme_ids)
+        local = []
+        while time.perf_counter() < deadline:
+            with samples_lock:
+                if max_requests and issued[0] >= max_requests:
+                    break
+                issued[0] += 1
+            route, method, path, kwargs = workload.next_request()
+            start = time.perf_counter()
+            try:
+                status_code = session.request(method, base_url + path, timeout=60, **kwargs).status_code
+            except requests.RequestException:
+                status_code = 0
+            local.append((route, time.perf_counter() - start, status_code))
+        with samples_lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "base_url": base_url,
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 2),
+            "seed": seed,
+            "mix": mix,
+            "catalogue_size": len(scheme_ids),
+            "python": platform.python_version(),
+            "host": platform.node(),
+        },
+        "routes": summarize(samples, elapsed),
+    }
+
+
+# ============================================================================
+# COMPARISON
+# ============================================================================
+
+def compare_reports(baseline: Dict, current: Dict, tolerance: float, min_requests: int = 50) -> List[str]:
+    """Return human-readable regressions (p95/p99 slower or throughput lower than tolerance)"""
+    regressions = []
+    print(f"{'route':<14}{'p95 base':>10}{'p95 now':>10}{'p99 base':>10}{'p99 now':>10}{'rps base':>10}{'rps now':>10}")
+    for route, base in sorted(baseline["routes"].items()):
+        now = current["routes"].get(route)
+        if now is None:
+            continue
+        print(f"{route:<14}{base['p95_ms']:>10}{now['p95_ms']:>10}{base['p99_ms']:>10}"
+              f"{now['p99_ms']:>10}{base['throughput_rps']:>10}{now['throughput_rps']:>10}")
+        if min(base["requests"], now["requests"]) < min_requests:
+            # Too few samples for stable tail percentiles
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and now[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{route}: {key} {base[key]} -> {now[key]}")
+        if base["throughput_rps"] and now["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {base['throughput_rps']} -> {now['throughput_rps']}")
+        if now["errors"] > base["errors"]:
+            regressions.append(f"{route}: errors {base['errors']} -> {now['errors']}")
+    return regressions
+
+
+def _parse_mix(value: str) -> Dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    if value:
+        for part in value.split(","):
+            route, weight = part.split("=")
+            if route not in DEFAULT_MIX:
+                raise argparse.ArgumentTypeError(f"Unknown route '{route}'")
+            mix[route] = int(weight)
+    return {route: weight for route, weight in mix.items() if weight > 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SahayataAI load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = sub.add_parser("seed", help="Seed a database with the dataset")
+    seed_cmd.add_argument("--database-url", required=True)
+    seed_cmd.add_argument("--scale", type=int, default=1, help="Repeat the dataset N times (e.g. 10, 100)")
+    seed_cmd.add_argument("--no-reset", action="store_true",
+                          help="Import over the existing catalogue as a new version instead of emptying it first")
+    seed_cmd.add_argument("--embedded", metavar="PATH",
+                          help="Also write the SQLite catalogue served with CATALOGUE_BACKEND=sqlite")
+
+    run_cmd = sub.add_parser("run", help="Replay the request mix against a running API")
+    run_cmd.add_argument("--base-url", default="http://localhost:8000")
+    run_cmd.add_argument("--concurrency", type=int, default=8)
+    run_cmd.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    run_cmd.add_argument("--requests", type=int, default=0, help="Stop after N requests (0 = no limit)")
+    run_cmd.add_argument("--seed", type=int, default=42)
+    run_cmd.add_argument("--mix", type=_parse_mix, default=dict(DEFAULT_MIX),
+                         help="Route weights, e.g. chat=60,search=20,login=0")
+    run_cmd.add_argument("--output", help="Write the JSON report to this file")
+
+    cmp_cmd = sub.add_parser("compare", help="Compare a report against a baseline")
+    cmp_cmd.add_argument("baseline")
+    cmp_cmd.add_argument("current")
+    cmp_cmd.add_argument("--tolerance", type=float, default=0.15)
+    cmp_cmd.add_argument("--min-requests", type=int, default=50,
+                         help="Skip routes with fewer samples than this in either report")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        count = seed_database(args.database_url, args.scale, reset=not args.no_reset, embedded=args.embedded)
+        print(f"✅ Seeded {count} schemes")
+        return 0
+
+    if args.command == "run":
+        report = run_load(args.base_url, args.concurrency, args.duration, args.requests,
+                          args.seed, args.mix)
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(output)
+        print(output)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare_reports(baseline, current, args.tolerance, args.min_requests)
+    if regressions:
+        print("\n❌ Regressions:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,531 @@
+"""
+Micro-benchmarks for the pure-Python functions on the request/import hot path.
+
+Run from the backend directory:
+
+    python -m benchmarks.microbench                          # all benchmarks
+    python -m benchmarks.microbench -k relevance             # filter by name
+    python -m benchmarks.microbench --save before.json       # record a run
+    python -m benchmarks.microbench --baseline before.json   # speedup vs a saved run
+
+Every operation can have several implementations. The implementation named
+"current" is the one the application uses; an optimization registers its
+replacement next to it with @implementation("<op>", "<name>") and every run
+then reports that implementation's speedup over "current" on the same corpus.
+
+Corpora are fixed (hand-written multilingual queries plus rows from
+SahayataDatasetFinal.csv), so numbers are comparable across commits.
+"""
+import argparse
+import csv
+import functools
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "SahayataDatasetFinal.csv")
+
+# ============================================================================
+# CORPORA
+# ============================================================================
+
+CHAT_QUERIES = [
+    ("student scholarship", "en"),
+    ("I am a farmer looking for crop loan", "en"),
+    ("pension for senior citizen in AP", "en"),
+    ("health insurance for my mother", "en"),
+    ("women self help group loan", "en"),
+    ("housing scheme awas", "en"),
+    ("job training for unemployed youth", "en"),
+    ("what schemes are available", "en"),
+    ("విద్యార్థి స్కాలర్‌షిప్", "te"),
+    ("రైతు రుణం కావాలి", "te"),
+    ("మహిళ పథకం", "te"),
+    ("వృద్ధులు పెన్షన్", "te"),
+    ("ఇల్లు నిర్మాణం", "te"),
+    ("छात्र छात्रवृत्ति", "hi"),
+    ("किसान ऋण योजना", "hi"),
+    ("महिला योजना", "hi"),
+    ("वरिष्ठ नागरिक पेंशन", "hi"),
+    ("स्वास्थ्य बीमा", "hi"),
+]
+
+ELIGIBILITY_PROFILES = [
+    {"gender": "Female", "age": 24, "occupation": "Student", "location": "Rural"},
+    {"gender": "Male", "age": 45, "occupation": "Farmer", "annual_income": 80000},
+    {"age": 67, "location": "Urban", "annual_income": 150000},
+    {"gender": "Women", "caste": "SC", "disability": True},
+    {"occupation": "Artisan", "minority": True, "annual_income": 250000},
+    {},
+]
+
+
+# Misspelt and correctly spelt chat terms for the spelling corrector
+SPELLING_TERMS = [
+    ("scholorship", "en"), ("pention", "en"), ("agricultre", "en"), ("insurence", "en"),
+    ("employmnet", "en"), ("housng", "en"), ("scholarship", "en"), ("widow", "en"),
+    ("విద్యార్తి", "te"), ("పెన్షను", "te"), ("రైతు", "te"),
+    ("किसाण", "hi"), ("स्वास्थ", "hi"), ("छात्रवृत्ती", "hi"), ("पेंशन", "hi"),
+]
+
+# Chat messages without an intent keyword, which the intent classifier routes
+UNROUTED_QUERIES = [
+    "my paddy fields were flooded", "i lost my husband, any help?", "fees for my son's engineering course",
+    "మా పాప ఫీజు కట్టలేకపోతున్నాం", "बाढ़ में झोपड़ी बह गई",
+]
+
+# The eligibility index is measured on the dataset repeated this many times
+ELIGIBILITY_CATALOGUE_COPIES = 10
+
+LANGUAGE_SUFFIXES = (("en", "EN"), ("te", "TE"), ("hi", "HI"))
+
+
+@functools.lru_cache(maxsize=None)
+def load_dataset_rows() -> List[Dict[str, str]]:
+    with open(DATASET, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def tag_corpus() -> List[str]:
+    return [row["Beneficiary Tags"] for row in load_dataset_rows()]
+
+
+def scheme_result_corpus() -> List[tuple]:
+    """(query, schemes, language) triples shaped like search_database() output"""
+    from import_data import extract_category
+
+    rows = load_dataset_rows()
+    corpus = []
+    for lang, suffix in LANGUAGE_SUFFIXES:
+        schemes = [
+            {
+                "id": index + 1,
+                "scheme_name": row[f"Scheme Name ({suffix})"],
+                "description": row[f"Description ({suffix})"][:180],
+                "scheme_type": row["Scheme Type"],
+                "category": extract_category(row["Beneficiary Tags"]),
+            }
+            for index, row in enumerate(rows[:10])
+        ]
+        corpus.append(("query", schemes, lang))
+        corpus.append(("query", schemes[:1], lang))
+        corpus.append(("query", [], lang))
+    return corpus
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+# op name -> {"corpus": factory, "call": adapter(fn, item), "impls": {name: factory}}
+OPERATIONS: Dict[str, Dict] = {}
+
+
+def operation(name: str, corpus: Callable[[], list], call: Callable):
+    OPERATIONS[name] = {"corpus": corpus, "call": call, "impls": {}}
+
+
+def implementation(op: str, name: str):
+    """Register a factory returning the function to benchmark for `op`"""
+    def decorator(factory):
+        OPERATIONS[op]["impls"][name] = factory
+        return factory
+    return decorator
+
+
+operation(
+    "extract_query_keywords",
+    corpus=lambda: CHAT_QUERIES,
+    call=lambda fn, item: fn(item[0], item[1]),
+)
+
+
+def relevance_corpus() -> List[tuple]:
+    from routes.schemes import EligibilityRequest
+
+    profiles = [EligibilityRequest(**profile) for profile in ELIGIBILITY_PROFILES]
+    return [(tags, profile) for tags in tag_corpus() for profile in profiles]
+
+
+operation(
+    "calculate_relevance",
+    corpus=relevance_corpus,
+    call=lambda fn, item: fn(item[0], item[1]),
+)
+operation(
+    "extract_category",
+    corpus=tag_corpus,
+    call=lambda fn, item: fn(item),
+)
+operation(
+    "generate_response",
+    corpus=scheme_result_corpus,
+    call=lambda fn, item: fn(*item),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def spelling_dictionaries():
+    """One symmetric-delete dictionary per language, built like fuzzy.rebuild() from the dataset"""
+    from routes.chatbot import INTENT_KEYWORDS
+    from services import fuzzy
+
+    columns = ("Scheme Name", "Description", "Eligibility", "Benefits", "Application Process")
+    dictionaries = {}
+    for lang, suffix in LANGUAGE_SUFFIXES:
+        texts = [row[f"{column} ({suffix})"] for row in load_dataset_rows() for column in columns]
+        texts += [row["Beneficiary Tags"] for row in load_dataset_rows()]
+        keywords = list(INTENT_KEYWORDS[lang]) + [kw for kws in INTENT_KEYWORDS[lang].values() for kw in kws]
+        dictionaries[lang] = fuzzy.build_dictionary(texts, keywords)
+    return dictionaries
+
+
+@functools.lru_cache(maxsize=None)
+def eligibility_index():
+    from services import eligibility
+
+    rows = load_dataset_rows()
+    constraints = {}
+    for copy in range(ELIGIBILITY_CATALOGUE_COPIES):
+        for index, row in enumerate(rows):
+            constraints[copy * len(rows) + index + 1] = eligibility.extract_constraints(
+                row["Eligibility (EN)"], row["Beneficiary Tags"], row["Scheme Type"], row["Scheme Name (EN)"]
+            )
+    return eligibility.EligibilityIndex(constraints)
+
+
+def eligibility_corpus() -> List[Dict]:
+    profiles = []
+    for profile in ELIGIBILITY_PROFILES:
+        profiles.append({key: profile.get(key) for key in ("age", "annual_income", "gender")})
+    return profiles
+
+
+@functools.lru_cache(maxsize=None)
+def snippet_fields() -> Dict[tuple, str]:
+    """(scheme id, language, field) -> text for the dataset, as the snippet index stores it"""
+    from services import snippets
+
+    fields = {}
+    for index, row in enumerate(load_dataset_rows()):
+        for lang, suffix in LANGUAGE_SUFFIXES:
+            for field in snippets.SNIPPET_FIELDS:
+                value = row[f"{field.replace('_', ' ').title()} ({suffix})"]
+                if value:
+                    fields[(index + 1, lang, field)] = value
+    return fields
+
+
+def snippet_corpus() -> List[tuple]:
+    """(scheme id, language, terms): every chat query against the first ten schemes"""
+    from services import snippets
+
+    return [
+        (scheme_id, lang, snippets.query_terms(query))
+        for query, lang in CHAT_QUERIES
+        for scheme_id in range(1, 11)
+    ]
+
+
+operation(
+    "correct_term",
+    corpus=lambda: SPELLING_TERMS,
+    call=lambda fn, item: fn(item[0], item[1]),
+)
+operation(
+    "match_eligibility",
+    corpus=eligibility_corpus,
+    call=lambda fn, item: fn(**item),
+)
+operation(
+    "intent_probabilities",
+    corpus=lambda: [query for query, _ in CHAT_QUERIES] + UNROUTED_QUERIES,
+    call=lambda fn, item: fn(item),
+)
+operation(
+    "snippet",
+    corpus=snippet_corpus,
+    call=lambda fn, item: fn(*item),
+)
+
+
+@implementation("extract_query_keywords", "current")
+def _current_extract_query_keywords():
+    from routes.chatbot import extract_query_keywords
+    return extract_query_keywords
+
+
+@implementation("calculate_relevance", "current")
+def _current_calculate_relevance():
+    from routes.schemes import calculate_relevance
+    return calculate_relevance
+
+
+@implementation("extract_category", "current")
+def _current_extract_category():
+    from import_data import extract_category
+    return extract_category
+
+
+@implementation("generate_response", "current")
+def _current_generate_response():
+    from routes.chatbot import generate_response
+    return generate_response
+
+
+@implementation("correct_term", "current")
+def _current_correct_term():
+    from services.fuzzy import MIN_CORRECTION_COUNT
+
+    dictionaries = spelling_dictionaries()
+    return lambda term, lang: dictionaries[lang].lookup(term, MIN_CORRECTION_COUNT)
+
+
+@implementation("correct_term", "linear_scan")
+def _linear_scan_correct_term():
+    """Edit distance to every vocabulary word, as before the delete dictionary"""
+    from services.fuzzy import MIN_CORRECTION_COUNT, edit_distance
+
+    dictionaries = spelling_dictionaries()
+
+    def lookup(term, lang):
+        speller = dictionaries[lang]
+        if term in speller.words:
+            return term
+        max_distance = min(speller.max_edit_distance, 0 if len(term) < 5 else 1 if len(term) < 9 else 2)
+        if max_distance == 0:
+            return None
+        best, best_distance, best_count = None, max_distance + 1, 0
+        for candidate, count in speller.words.items():
+            if count < MIN_CORRECTION_COUNT:
+                continue
+            distance = edit_distance(term, candidate, max_distance)
+            if distance < best_distance or (distance == best_distance and count > best_count):
+                best, best_distance, best_count = candidate, distance, count
+        return best if best_distance <= max_distance else None
+    return lookup
+
+
+@implementation("match_eligibility", "current")
+def _current_match_eligibility():
+    return eligibility_index().match
+
+
+@implementation("match_eligibility", "linear_scan")
+def _linear_scan_match_eligibility():
+    """Every scheme's constraints checked in turn, as a per-request scan would"""
+    index = eligibility_index()
+
+    def match(age=None, annual_income=None, gender=None):
+        male = bool(gender) and gender.lower() in ("male", "man", "men")
+        matched = []
+        for scheme_id in index.ids:
+            c = index.constraints[scheme_id]
+            if age is not None and ((c.min_age or 0) > age or (c.max_age is not None and c.max_age < age)):
+                continue
+            if annual_income is not None and c.income_ceiling is not None and c.income_ceiling < annual_income:
+                continue
+            if male and c.gender == "female":
+                continue
+            matched.append(scheme_id)
+        return matched
+    return match
+
+
+@implementation("intent_probabilities", "current")
+def _current_intent_probabilities():
+    from services import intent
+
+    return intent.get_model().probabilities
+
+
+@implementation("intent_probabilities", "dense")
+def _dense_intent_probabilities():
+    """A full HASH_DIM input vector times the weights, instead of gathering the hashed rows"""
+    import numpy as np
+    from services import intent
+
+    model = intent.get_model()
+    n_intents = len(model.intents)
+
+    def probabilities(message):
+        indices, values = intent.features(message, model.dim, model.ngram_range)
+        x = np.zeros(model.dim, dtype=np.float32)
+        x[indices] = values
+        logits = x @ model.weights + model.bias
+        return intent.softmax(logits[:n_intents]), intent.softmax(logits[n_intents:])
+    return probabilities
+
+
+@implementation("snippet", "current")
+def _current_snippet():
+    from services import snippets
+
+    fields = {key: snippets.index_field(value) for key, value in snippet_fields().items()}
+    vocabulary: Dict[str, set] = {}
+    for (_, lang, _), entry in fields.items():
+        vocabulary.setdefault(lang, set()).update(entry.postings)
+    # snippet() reads the module's index, normally built on catalogue change
+    snippets._index = snippets.SnippetIndex(
+        "microbench", fields, {lang: tuple(sorted(words)) for lang, words in vocabulary.items()}, {}
+    )
+    return snippets.snippet
+
+
+@implementation("snippet", "rescan")
+def _rescan_snippet():
+    """Search the raw text for every term and segment it into graphemes on each request"""
+    from services import snippets
+
+    fields = snippet_fields()
+
+    def snippet(scheme_id, lang, terms, length=snippets.SNIPPET_LENGTH):
+        best = None
+        for field in snippets.SNIPPET_FIELDS:
+            value = fields.get((scheme_id, lang, field))
+            if value is None:
+                continue
+            lowered = value.lower()
+            hits = []
+            for term in terms:
+                start = lowered.find(term)
+                while start != -1:
+                    hits.append((start, start + len(term), term))
+                    start = lowered.find(term, start + 1)
+            distinct = len({term for _, _, term in hits})
+            if best is None or distinct > best[0]:
+                best = (distinct, field, value, sorted(hits))
+        if best is None:
+            return None
+        _, field, value, hits = best
+        starts = snippets.grapheme_starts(value)
+        start = max(0, hits[0][0] - snippets.LEADING_CONTEXT) if hits else 0
+        start = snippets._floor(starts, start)
+        end = snippets._ceil(starts, min(start + length, len(value)))
+        text = value[start:end]
+        for term in {term for _, _, term in hits}:
+            text = text.replace(term, f"{snippets.HIGHLIGHT[0]}{term}{snippets.HIGHLIGHT[1]}")
+        return field, text
+    return snippet
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def measure(fn: Callable, call: Callable, corpus: list, min_time: float, repeats: int) -> Dict:
+    """ns/op (median of repeats) and peak bytes allocated per op"""
+    # Calibrate: how many passes over the corpus make one repeat last min_time / repeats
+    target = min_time / repeats
+    passes = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(passes):
+            for item in corpus:
+                call(fn, item)
+        elapsed = time.perf_counter() - start
+        if elapsed >= target / 4 or passes >= 1 << 20:
+            break
+        passes *= 2
+    passes = max(1, int(passes * target / max(elapsed, 1e-9)))
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            for _ in range(passes):
+                for item in corpus:
+                    call(fn, item)
+            timings.append((time.perf_counter_ns() - start) / (passes * len(corpus)))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    # Allocation profile: one traced pass, peak bytes per call
+    tracemalloc.start()
+    peaks = []
+    for item in corpus:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        call(fn, item)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+    tracemalloc.stop()
+
+    return {
+        "ns_per_op": round(statistics.median(timings), 1),
+        "ns_per_op_min": round(min(timings), 1),
+        "ns_per_op_stdev": round(statistics.pstdev(timings), 1),
+        "peak_alloc_bytes_per_op": round(statistics.mean(peaks), 1),
+        "ops_per_pass": len(corpus),
+    }
+
+
+def run(filters: List[str], min_time: float, repeats: int) -> Dict[str, Dict[str, Dict]]:
+    results = {}
+    for op, spec in OPERATIONS.items():
+        if filters and not any(f in op for f in filters):
+            continue
+        corpus = spec["corpus"]()
+        results[op] = {}
+        for impl_name, factory in spec["impls"].items():
+            results[op][impl_name] = measure(factory(), spec["call"], corpus, min_time, repeats)
+    return results
+
+
+def print_results(results: Dict, baseline: Dict = None) -> None:
+    print(f"{'operation':<26}{'impl':<16}{'ns/op':>12}{'±':>10}{'alloc B/op':>12}{'speedup':>10}")
+    for op, impls in results.items():
+        reference = impls.get("current")
+        for impl_name, stats in impls.items():
+            speedup = ""
+            if baseline and impl_name in baseline.get(op, {}):
+                speedup = f"{baseline[op][impl_name]['ns_per_op'] / stats['ns_per_op']:.2f}x*"
+            elif reference and impl_name != "current":
+                speedup = f"{reference['ns_per_op'] / stats['ns_per_op']:.2f}x"
+            print(f"{op:<26}{impl_name:<16}{stats['ns_per_op']:>12.1f}{stats['ns_per_op_stdev']:>10.1f}"
+                  f"{stats['peak_alloc_bytes_per_op']:>12.1f}{speedup:>10}")
+    if baseline:
+        print("\n* speedup against the same implementation in the baseline file")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SahayataAI micro-benchmarks")
+    parser.add_argument("-k", dest="filters", action="append", default=[],
+                        help="Only run operations whose name contains this string")
+    parser.add_argument("--min-time", type=float, default=1.0,
+                        help="Approximate seconds spent timing each implementation")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save", help="Write results to a JSON file")
+    parser.add_argument("--baseline", help="Compare against a JSON file written by --save")
+    args = parser.parse_args(argv)
+
+    results = run(args.filters, args.min_time, args.repeats)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                         "min_time": args.min_time, "repeats": args.repeats},
+                "results": results,
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Scaling of the sharded chat scorer (services/sharded_search.py) with core count.
+
+Run from the backend directory; no database is needed:
+
+    python -m benchmarks.parallel_scoring                       # 50,000 schemes, 1..cpu_count workers
+    python -m benchmarks.parallel_scoring --schemes 200000 --workers 1,2,4,8,16
+
+The catalogue is SahayataDatasetFinal.csv repeated until it has --schemes
+rows. The queries are the load test's chat messages in en/te/hi with their
+extracted keywords. For every worker count the catalogue is split into that
+many shards and served by that many pool workers, and the run reports:
+
+- latency: one query at a time, so each query is spread over all workers
+- throughput: queries submitted from several threads at once
+
+Both are compared with scoring the whole catalogue in this process, one
+query after another. Worker counts above the machine's cores cannot scale.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from benchmarks.loadtest import build_chat_messages
+from benchmarks.microbench import DATASET
+from import_data import build_scheme_rows
+from routes.chatbot import extract_query_keywords
+from services import sharded_search
+from services.sharded_search import LANGUAGES, SchemeRow
+
+# Each worker maps every shard before timing starts
+WARMUP_ROUNDS = 3
+
+
+def build_rows(count: int) -> Dict[str, List[SchemeRow]]:
+    """count schemes per language, repeating the dataset with fresh ids"""
+    dataset = build_scheme_rows(pd.read_csv(DATASET), verbose=False)
+    rows = {language: [] for language in LANGUAGES}
+    for scheme_id in range(1, count + 1):
+        scheme = dataset[(scheme_id - 1) % len(dataset)]
+        for language in LANGUAGES:
+            rows[language].append(SchemeRow(
+                scheme_id, scheme[f"scheme_name_{language}"], scheme[f"description_{language}"],
+                scheme[f"eligibility_{language}"], scheme[f"benefits_{language}"],
+                scheme[f"application_process_{language}"], scheme["scheme_type"], scheme["category"],
+                scheme["official_link"], scheme["beneficiary_tags"],
+            ))
+    return rows
+
+
+def build_queries() -> List[Tuple[str, str, List[str]]]:
+    """(language, lowercased message, keywords) for every load test chat message"""
+    queries = []
+    for language, messages in build_chat_messages().items():
+        for message in messages:
+            keywords = sorted(extract_query_keywords(message, language))
+            queries.append((language, message.strip().lower(), keywords))
+    return queries
+
+
+def _latency(pool, sharded, queries, limit: int) -> float:
+    """Mean milliseconds per query, one query at a time"""
+    started = time.perf_counter()
+    for language, query, keywords in queries:
+        sharded_search.scatter_gather(pool, sharded, language, query, keywords, None, limit)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def _throughput(pool, sharded, queries, limit: int, clients: int) -> float:
+    """Queries per second with clients threads submitting at once"""
+    def run(query):
+        language, text, keywords = query
+        sharded_search.scatter_gather(pool, sharded, language, text, keywords, None, limit)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(run, queries))
+    return len(queries) / (time.perf_counter() - started)
+
+
+def run(schemes: int, worker_counts: List[int], repeat: int, limit: int) -> Dict:
+    print(f"🚀 Building {schemes} schemes...")
+    rows = build_rows(schemes)
+    queries = build_queries() * repeat
+    print(f"✅ {len(queries)} queries, {os.cpu_count()} CPU(s)")
+
+    # Baseline: the whole catalogue scored in this process
+    sharded = sharded_search.build("bench", rows, 1)
+    try:
+        _latency(None, sharded, queries[:20], limit)
+        serial_ms = _latency(None, sharded, queries, limit)
+    finally:
+        sharded.close()
+    serial_qps = 1000 / serial_ms
+    print(f"📊 In-process: {serial_ms:.2f} ms/query, {serial_qps:.0f} queries/s")
+
+    results = []
+    for workers in worker_counts:
+        sharded = sharded_search.build("bench", rows, workers)
+        pool = sharded_search.start_pool(workers)
+        try:
+            for _ in range(WARMUP_ROUNDS * workers):
+                _latency(pool, sharded, queries[:5], limit)
+            latency_ms = _latency(pool, sharded, queries, limit)
+            throughput = _throughput(pool, sharded, queries, limit, clients=2 * workers)
+        finally:
+            pool.shutdown()
+            sharded.close()
+        result = {
+            "workers": workers,
+            "latency_ms": round(latency_ms, 3),
+            "latency_speedup": round(serial_ms / latency_ms, 2),
+            "throughput_qps": round(throughput, 1),
+            "throughput_speedup": round(throughput / serial_qps, 2),
+            "efficiency": round(throughput / serial_qps / workers, 2),
+        }
+        results.append(result)
+
+    print(f"\n{'workers':>8}{'ms/query':>10}{'speedup':>9}{'queries/s':>11}{'speedup':>9}{'per core':>10}")
+    for result in results:
+        print(f"{result['workers']:>8}{result['latency_ms']:>10.2f}{result['latency_speedup']:>9.2f}"
+              f"{result['throughput_qps']:>11.0f}{result['throughput_speedup']:>9.2f}{result['efficiency']:>10.2f}")
+    if max(worker_counts) > (os.cpu_count() or 1):
+        print(f"\n⚠️ Only {os.cpu_count()} CPU(s): worker counts above that share cores and cannot scale")
+
+    return {
+        "schemes": schemes,
+        "queries": len(queries),
+        "cpus": os.cpu_count(),
+        "serial_ms": round(serial_ms, 3),
+        "serial_qps": round(serial_qps, 1),
+        "results": results,
+        "median_efficiency": statistics.median(result["efficiency"] for result in results) if results else None,
+    }
+
+
+def _worker_counts(value: str) -> List[int]:
+    return sorted({int(part) for part in value.split(",") if part.strip()})
+
+
+def main(argv=None):
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *[2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus], cpus})
+
+    parser = argparse.ArgumentParser(description="Scaling of the sharded chat scorer with worker count")
+    parser.add_argument("--schemes", type=int, default=50_000, help="Catalogue size")
+    parser.add_argument("--workers", type=_worker_counts, default=default_workers,
+                        help="Comma-separated worker counts, e.g. 1,2,4,8")
+    parser.add_argument("--repeat", type=int, default=2, help="Passes over the query set")
+    parser.add_argument("--limit", type=int, default=10, help="Results per query")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.schemes, args.workers, args.repeat, args.limit)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
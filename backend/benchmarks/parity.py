@@ -0,0 +1,118 @@
+"""
+Response parity between two running APIs, e.g. Postgres and the embedded catalogue.
+
+Run from the backend directory:
+
+    # 1. Import, writing the embedded snapshot as well
+    python import_data.py --embedded catalogue.sqlite3
+
+    # 2. Start the API on both backends
+    RATE_LIMIT_ENABLED=0 uvicorn main:app --port 8000
+    CATALOGUE_BACKEND=sqlite EMBEDDED_CATALOGUE_PATH=catalogue.sqlite3 RATE_LIMIT_ENABLED=0 \\
+        uvicorn main:app --port 8001
+
+    # 3. Replay the load test workload against both and diff every response
+    python -m benchmarks.parity --reference http://localhost:8000 --candidate http://localhost:8001
+
+The fixtures are the load test's: the same seeded request generator (without
+logins), plus statistics, the full change snapshot and every scheme's detail
+and related schemes. Exit code 1 when any response differs.
+"""
+import argparse
+import json
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+import requests
+
+from benchmarks.loadtest import DEFAULT_MIX, Workload, _discover_catalogue, build_chat_messages
+
+# Logins write to the users table, which the embedded catalogue does not have
+PARITY_MIX = {route: weight for route, weight in DEFAULT_MIX.items() if route != "login"}
+
+# Fresh per response on any backend
+VOLATILE_KEYS = {"conversation_id"}
+
+
+def fixtures(categories: List[str], scheme_ids: List[int], count: int, seed: int) -> Iterator[Tuple[str, str, dict]]:
+    """(method, path, kwargs for requests) for every request to compare"""
+    yield "GET", "/api/schemes/statistics", {}
+    yield "GET", "/api/schemes/changes", {"params": {"since": 0}}
+    for scheme_id in scheme_ids:
+        yield "GET", f"/api/schemes/{scheme_id}", {}
+        yield "GET", f"/api/schemes/{scheme_id}/related", {}
+    workload = Workload(seed, PARITY_MIX, build_chat_messages(), categories, scheme_ids)
+    for _ in range(count):
+        _, method, path, kwargs = workload.next_request()
+        yield method, path, kwargs
+
+
+def _fetch(session: requests.Session, base_url: str, method: str, path: str, kwargs: dict):
+    response = session.request(method, base_url + path, timeout=60, **kwargs)
+    try:
+        body = response.json()
+    except ValueError:
+        body = response.text
+    return response.status_code, body
+
+
+def _first_difference(a, b, where: str = "") -> Optional[str]:
+    if type(a) is not type(b):
+        return f"{where or '/'}: {a!r} != {b!r}"
+    if isinstance(a, dict):
+        for key in sorted((set(a) | set(b)) - VOLATILE_KEYS, key=str):
+            if key not in a or key not in b:
+                return f"{where}/{key}: only in {'reference' if key in a else 'candidate'}"
+            difference = _first_difference(a[key], b[key], f"{where}/{key}")
+            if difference:
+                return difference
+        return None
+    if isinstance(a, (list, tuple)):
+        if len(a) != len(b):
+            return f"{where or '/'}: {len(a)} items != {len(b)} items"
+        for i, (x, y) in enumerate(zip(a, b)):
+            difference = _first_difference(x, y, f"{where}/{i}")
+            if difference:
+                return difference
+        return None
+    return None if a == b else f"{where or '/'}: {a!r} != {b!r}"
+
+
+def compare(reference_url: str, candidate_url: str, count: int, seed: int) -> Tuple[int, List[str]]:
+    """Replay the fixtures against both APIs; returns (requests compared, differences)"""
+    reference_url, candidate_url = reference_url.rstrip("/"), candidate_url.rstrip("/")
+    reference, candidate = requests.Session(), requests.Session()
+    categories, scheme_ids = _discover_catalogue(reference, reference_url)
+
+    compared, differences = 0, []
+    for method, path, kwargs in fixtures(categories, scheme_ids, count, seed):
+        expected = _fetch(reference, reference_url, method, path, kwargs)
+        actual = _fetch(candidate, candidate_url, method, path, kwargs)
+        compared += 1
+        difference = _first_difference(expected, actual)
+        if difference:
+            differences.append(f"{method} {path} {json.dumps(kwargs, ensure_ascii=False)} {difference}")
+    return compared, differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare API responses between two backends")
+    parser.add_argument("--reference", default="http://localhost:8000", help="API on Postgres")
+    parser.add_argument("--candidate", default="http://localhost:8001", help="API on the backend under test")
+    parser.add_argument("--requests", type=int, default=500, help="Generated workload requests")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--show", type=int, default=20, help="Differences to print")
+    args = parser.parse_args(argv)
+
+    compared, differences = compare(args.reference, args.candidate, args.requests, args.seed)
+    if differences:
+        print(f"❌ {len(differences)} of {compared} responses differ:")
+        for line in differences[:args.show]:
+            print(f"   {line[:300]}")
+        return 1
+    print(f"✅ {compared} responses identical")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import sys
-from sqlalchemy import Column, Integer, String, Text, Date, create_engine
+from sqlalchemy import text as sql_text
+from sqlalchemy import BigInteger, Boolean, Column, Float, Index, Integer, String, Text, Date, DateTime, create_engine, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -48,6 +49,95 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     password_hash = Column(String)
 
+class UserRecommendation(Base):
+    __tablename__ = "user_recommendations"
+    
+    user_id = Column(Integer, primary_key=True)
+    catalogue_version = Column(String, nullable=False)
+    valid_until = Column(Date)
+    scheme_ids = Column(String, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, index=True)
+    params = Column(Text)
+    progress = Column(Float, default=0.0)
+    message = Column(Text)
+    result = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+
+class QueryLog(Base):
+    __tablename__ = "query_log"
+    
+    id = Column(BigInteger, primary_key=True)
+    logged_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    source = Column(String(16), nullable=False)
+    language = Column(String(8), nullable=False)
+    query = Column(String, nullable=False, index=True)
+    result_count = Column(Integer, nullable=False)
+    latency_ms = Column(Float)
+    top_ids = Column(String)
+
+# Catalogue versions and per-scheme change log (written by import_data.py)
+class CatalogueVersion(Base):
+    __tablename__ = "catalogue_versions"
+    
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    inserted = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    deleted = Column(Integer, default=0)
+
+class SchemeChange(Base):
+    __tablename__ = "scheme_changes"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, index=True, nullable=False)
+    scheme_id = Column(Integer, nullable=False)
+    change_type = Column(String(8), nullable=False)
+
+class SchemeConstraint(Base):
+    __tablename__ = "scheme_constraints"
+    
+    scheme_id = Column(Integer, primary_key=True)
+    min_age = Column(Integer)
+    max_age = Column(Integer)
+    income_ceiling = Column(BigInteger)
+    gender = Column(String)
+    state = Column(String)
+    castes = Column(String)
+    occupations = Column(String)
+    disability = Column(Boolean, default=False)
+
+class SchemeTranslation(Base):
+    __tablename__ = "scheme_translations"
+    
+    scheme_id = Column(Integer, primary_key=True)
+    lang = Column(String(8), primary_key=True)
+    field = Column(String(32), primary_key=True)
+    text = Column(Text, nullable=False)
+    
+    __table_args__ = tuple(
+        Index(f"ix_scheme_translations_{lang}", "scheme_id", "field", postgresql_where=sql_text(f"lang = '{lang}'"))
+        for lang in ("en", "te", "hi")
+    )
+
+class SchemeRelation(Base):
+    __tablename__ = "scheme_relations"
+    
+    scheme_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    related_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
 # Create tables
 if __name__ == "__main__":
     DATABASE_URL = os.getenv("DATABASE_URL")
@@ -71,4 +161,4 @@ if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
     
     print("\n✅ Tables created successfully!")
-    print("📊 Tables created: schemes, users")
+    print("📊 Tables created: schemes, users, user_recommendations, jobs, query_log, catalogue_versions, scheme_changes, scheme_constraints, scheme_relations, scheme_translations")
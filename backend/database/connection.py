@@ -1,6 +1,17 @@
+import itertools
+import logging
 import os
+import threading
+import time
+from fastapi import HTTPException
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
+from services.metrics import instrument_engine
+from database.slow_queries import install_slow_query_hook
+
+logger = logging.getLogger(__name__)
 
 # Production: Use DATABASE_URL from environment
 # Development: Use local PostgreSQL
@@ -9,28 +20,148 @@ DATABASE_URL = os.getenv(
     "postgresql://praneeth@localhost:5432/sahayataaifinal"
 )
 
-# Render uses 'postgres://' but SQLAlchemy needs 'postgresql://'
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+# Optional read replicas, comma-separated; catalogue reads go here, writes stay on DATABASE_URL
+READ_DATABASE_URLS = [url.strip() for url in os.getenv("READ_DATABASE_URL", "").split(",") if url.strip()]
+
+# Set when connecting through PgBouncer in transaction pooling mode
+PGBOUNCER_MODE = os.getenv("PGBOUNCER_MODE", "0") == "1"
+
+# How long a replica that failed to connect is skipped before being retried
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+# Offline kiosks: CATALOGUE_BACKEND=sqlite serves the catalogue from the importer's embedded snapshot
+CATALOGUE_BACKEND = os.getenv("CATALOGUE_BACKEND", "postgres")
+EMBEDDED_CATALOGUE_PATH = os.getenv("EMBEDDED_CATALOGUE_PATH", "catalogue.sqlite3")
+EMBEDDED = CATALOGUE_BACKEND == "sqlite"
+
+
+def _normalize_url(url: str) -> str:
+    # Render uses 'postgres://' but SQLAlchemy needs 'postgresql://'
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def _engine_options(url: str, replica: bool) -> dict:
+    """Engine options; PgBouncer mode leaves pooling to the bouncer and never prepares statements"""
+    if not PGBOUNCER_MODE:
+        # Replicas get restarted and failed over; ping so stale pooled connections are dropped
+        return {"pool_pre_ping": True} if replica else {}
+    # A server connection may serve a different client after every transaction,
+    # so nothing may outlive one: no client-side pool, no named prepared statements
+    connect_args = {}
+    driver = make_url(url).drivername
+    if driver.endswith("+psycopg"):
+        connect_args["prepare_threshold"] = None
+    elif driver.endswith("+asyncpg"):
+        connect_args["statement_cache_size"] = 0
+    return {"poolclass": NullPool, "connect_args": connect_args}
+
+
+def _create_engine(url: str, replica: bool = False):
+    engine = create_engine(url, echo=False, **_engine_options(url, replica))
+    instrument_engine(engine)
+    return engine
+
 
-engine = create_engine(DATABASE_URL, echo=False)
+if EMBEDDED:
+    # Read-only and local: no primary to write to and no replicas to spread reads over
+    from database import embedded
+    DATABASE_URL = embedded.url(EMBEDDED_CATALOGUE_PATH)
+    engine = embedded.create_engine(EMBEDDED_CATALOGUE_PATH)
+    instrument_engine(engine)
+    read_engines = []
+else:
+    DATABASE_URL = _normalize_url(DATABASE_URL)
+    engine = _create_engine(DATABASE_URL)
+    read_engines = [_create_engine(_normalize_url(url), replica=True) for url in READ_DATABASE_URLS]
+
+# Opt-in slow query capture: set SLOW_QUERY_MS to enable
+SLOW_QUERY_MS = os.getenv("SLOW_QUERY_MS")
+if SLOW_QUERY_MS:
+    _slow_log = install_slow_query_hook(
+        engine,
+        threshold_ms=float(SLOW_QUERY_MS),
+        explain_sample_rate=float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1")),
+        capacity=int(os.getenv("SLOW_QUERY_BUFFER", "200")),
+    )
+    for _read_engine in read_engines:
+        install_slow_query_hook(_read_engine, _slow_log.threshold_ms, log=_slow_log)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 def get_db():
     """Database session generator"""
+    if EMBEDDED:
+        # The embedded snapshot is read-only and has no users, jobs or query log
+        raise HTTPException(
+            status_code=503,
+            detail="Not available on the offline catalogue; accounts and admin tools need the main server"
+        )
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+# ============================================================================
+# READ ROUTING
+# ============================================================================
+
+_replica_cycle = itertools.cycle(range(len(read_engines)))
+_replica_down_until = [0.0] * len(read_engines)
+_replica_lock = threading.Lock()
+
+def _next_replica():
+    """Round-robin over replicas that are not in their retry back-off"""
+    now = time.monotonic()
+    with _replica_lock:
+        for _ in range(len(read_engines)):
+            i = next(_replica_cycle)
+            if _replica_down_until[i] <= now:
+                return i
+    return None
+
+def ReadSessionLocal():
+    """Session on a healthy read replica, or on the primary when none is configured or reachable"""
+    for _ in range(len(read_engines)):
+        i = _next_replica()
+        if i is None:
+            break
+        db = SessionLocal(bind=read_engines[i])
+        try:
+            # Check out a connection now so a dead replica fails here, not mid-request
+            db.connection()
+            return db
+        except Exception as e:
+            db.close()
+            _replica_down_until[i] = time.monotonic() + REPLICA_RETRY_SECONDS
+            logger.warning("read_replica_unavailable replica=%d error=%s", i, str(e).splitlines()[0])
+    return SessionLocal()
+
+def get_read_db():
+    """Session for read-only catalogue queries; may lag the primary slightly"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # Test connection
 def test_connection():
     try:
         with engine.connect() as conn:
-            print(f"✅ Database connected: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'local'}")
-            return True
+            if EMBEDDED:
+                print(f"✅ Embedded catalogue opened read-only: {EMBEDDED_CATALOGUE_PATH}")
+            else:
+                print(f"✅ Database connected: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'local'}")
+        for i, read_engine in enumerate(read_engines):
+            try:
+                with read_engine.connect():
+                    print(f"✅ Read replica {i} connected")
+            except Exception as e:
+                print(f"⚠️ Read replica {i} unavailable, reads fall back to primary: {e}")
+        return True
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
         return False
@@ -0,0 +1,132 @@
+"""
+Embedded read-only catalogue: a SQLite snapshot for offline kiosks and edge deployments.
+
+write_snapshot() copies the catalogue tables from the primary database into
+one SQLite file; the importer writes it with --embedded. With
+CATALOGUE_BACKEND=sqlite, database/connection.py opens that file read-only
+in place of Postgres and every catalogue read (chat, search, categories,
+details, statistics, eligibility, related, changes) runs against it.
+
+The routes share their SQL with the Postgres path. install() makes the few
+Postgres-isms they use behave the same on SQLite: ILIKE is rewritten to LIKE,
+and LIKE, LOWER and UPPER are replaced with Unicode-aware versions that keep
+Postgres' backslash escape, so a search matches exactly the schemes it
+matches on Postgres.
+
+Connections are not pooled: a replaced snapshot file is seen by the next
+session, and the periodic catalogue refresh reloads the indexes from it.
+"""
+import functools
+import os
+import re
+from typing import Dict
+
+from sqlalchemy import create_engine as sa_create_engine, event, inspect, select
+from sqlalchemy.pool import NullPool
+
+# Catalogue tables copied into the snapshot; users, jobs and analytics stay on the primary
+EMBEDDED_TABLES = (
+    "schemes", "catalogue_versions", "scheme_changes",
+    "scheme_translations", "scheme_constraints", "scheme_relations",
+)
+
+COPY_BATCH_SIZE = 1000
+
+_ILIKE = re.compile(r"\bILIKE\b")
+
+
+def url(path: str) -> str:
+    return f"sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true"
+
+
+@functools.lru_cache(maxsize=1024)
+def _like_pattern(pattern: str):
+    """Regex for a LIKE pattern: % and _ wildcards, backslash escapes the next character"""
+    parts = []
+    chars = iter(pattern)
+    for ch in chars:
+        if ch == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def _like(pattern, value):
+    # SQLite calls like(pattern, value) for "value LIKE pattern"
+    if pattern is None or value is None:
+        return None
+    return _like_pattern(str(pattern).lower()).fullmatch(str(value).lower()) is not None
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def _upper(value):
+    return value.upper() if isinstance(value, str) else value
+
+
+def install(engine) -> None:
+    """Postgres-compatible ILIKE, LIKE, LOWER and UPPER on every connection of a SQLite engine"""
+
+    @event.listens_for(engine, "connect")
+    def _register_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("like", 2, _like, deterministic=True)
+        dbapi_connection.create_function("lower", 1, _lower, deterministic=True)
+        dbapi_connection.create_function("upper", 1, _upper, deterministic=True)
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _rewrite_ilike(conn, cursor, statement, parameters, context, executemany):
+        return _ILIKE.sub("LIKE", statement), parameters
+
+
+def create_engine(path: str):
+    """Read-only engine on the snapshot at path"""
+    engine = sa_create_engine(
+        url(path), echo=False, poolclass=NullPool, connect_args={"check_same_thread": False}
+    )
+    install(engine)
+    return engine
+
+
+def write_snapshot(source_engine, path: str) -> Dict[str, int]:
+    """Copy the catalogue tables into a new SQLite file and move it over path; returns rows per table"""
+    from database.connection import Base
+    import models.catalogue  # noqa: F401 - register tables on Base
+    import models.schemes  # noqa: F401
+
+    tables = [Base.metadata.tables[name] for name in EMBEDDED_TABLES]
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    target = sa_create_engine(f"sqlite:///{os.path.abspath(tmp_path)}", echo=False)
+    counts = {}
+    try:
+        Base.metadata.create_all(target, tables=tables)
+        with source_engine.connect() as source, target.begin() as conn:
+            inspector = inspect(source)
+            for table in tables:
+                counts[table.name] = 0
+                if not inspector.has_table(table.name):
+                    # Left empty, so reads fall back exactly as they do on the source database
+                    continue
+                result = source.execute(select(table).order_by(*table.primary_key.columns)).mappings()
+                while True:
+                    rows = [dict(row) for row in result.fetchmany(COPY_BATCH_SIZE)]
+                    if not rows:
+                        break
+                    conn.execute(table.insert(), rows)
+                    counts[table.name] += len(rows)
+            conn.exec_driver_sql("ANALYZE")
+    finally:
+        target.dispose()
+
+    # Readers open the file per session, so they see either the old snapshot or the new one
+    os.replace(tmp_path, path)
+    return counts
@@ -0,0 +1,151 @@
+"""
+Opt-in slow query capture for the SQLAlchemy engine.
+
+Every statement is timed through cursor events. Statements slower than the
+threshold are stored with their normalized shape and (redacted) parameters in
+a fixed-size ring buffer. A sample of slow SELECTs is re-run with
+EXPLAIN (ANALYZE, BUFFERS) on a background thread, so the plan capture never
+adds latency to the request that triggered it.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_SENSITIVE_PARAM = re.compile(r"pass|hash|token|secret", re.IGNORECASE)
+_COMMENT = re.compile(r"--[^\n]*")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a statement to its shape: no comments, literals or extra whitespace"""
+    shape = _COMMENT.sub(" ", statement)
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def _redact(parameters) -> Optional[Dict]:
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {
+            key: "***" if _SENSITIVE_PARAM.search(str(key)) else _truncate(value)
+            for key, value in parameters.items()
+        }
+    if isinstance(parameters, (list, tuple)):
+        return {"positional": [_truncate(value) for value in parameters]}
+    return {"value": _truncate(parameters)}
+
+
+def _truncate(value, limit: int = 200):
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit] + "..."
+    return value if isinstance(value, (int, float, bool, type(None))) else str(value)
+
+
+class SlowQueryLog:
+    """Thread-safe ring buffer of slow statements"""
+
+    def __init__(self, threshold_ms: float, explain_sample_rate: float, capacity: int):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        self._explain_pending = 0
+
+    def record(self, entry: Dict) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def should_explain(self, statement: str) -> bool:
+        # EXPLAIN ANALYZE executes the statement, so only ever sample reads
+        if not statement.lstrip().upper().startswith("SELECT"):
+            return False
+        if self._explain_pending >= 4 or random.random() >= self.explain_sample_rate:
+            return False
+        with self._lock:
+            self._explain_pending += 1
+        return True
+
+    def schedule_explain(self, engine, entry: Dict, statement: str, parameters) -> None:
+        self._explain_pool.submit(self._run_explain, engine, entry, statement, parameters)
+
+    def _run_explain(self, engine, entry: Dict, statement: str, parameters) -> None:
+        try:
+            with engine.connect().execution_options(slow_query_log=False) as conn:
+                result = conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters
+                )
+                entry["explain"] = "\n".join(row[0] for row in result)
+                conn.rollback()
+        except Exception as e:
+            entry["explain"] = f"EXPLAIN failed: {e}"
+        finally:
+            with self._lock:
+                self._explain_pending -= 1
+
+
+slow_query_log: Optional[SlowQueryLog] = None
+
+
+def install_slow_query_hook(engine, threshold_ms: float, explain_sample_rate: float = 0.1,
+                            capacity: int = 200, log: Optional[SlowQueryLog] = None) -> SlowQueryLog:
+    """Attach slow query capture to an engine and return its ring buffer (pass log to share one)"""
+    global slow_query_log
+    if log is None:
+        log = SlowQueryLog(threshold_ms, explain_sample_rate, capacity)
+    can_explain = engine.dialect.name == "postgresql"
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("slow_query_start")
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        if elapsed_ms < log.threshold_ms:
+            return
+        if context is not None and not context.execution_options.get("slow_query_log", True):
+            return
+
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed_ms, 2),
+            "shape": normalize_statement(statement),
+            "parameters": _redact(parameters),
+            "executemany": executemany,
+            "explain": None,
+        }
+        log.record(entry)
+        logger.warning("slow_query duration_ms=%.1f shape=%r", elapsed_ms, entry["shape"][:300])
+
+        if can_explain and not executemany and log.should_explain(statement):
+            log.schedule_explain(engine, entry, statement, parameters)
+
+    slow_query_log = log
+    return log
@@ -0,0 +1,110 @@
+"""
+Data access for scheme_translations, the normalised per-language text store.
+
+Every query filters on a single language (plus English as the fallback for
+untranslated fields), so it reads only the rows of that language through
+its partial index. Adding a language adds rows and an index; existing
+languages read the same number of rows as before.
+
+The wide *_en/_te/_hi columns on schemes stay as they are, and callers fall
+back to them while the table has not been populated by the importer.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+
+from models.schemes import TRANSLATED_FIELDS
+from services import catalogue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = "en"
+
+# Languages that also have columns on the schemes table
+WIDE_LANGUAGES = ("en", "te", "hi")
+
+_enabled = False
+
+
+def enabled() -> bool:
+    """True once scheme_translations holds data"""
+    return _enabled
+
+
+@catalogue.on_change
+def _detect(db, version: str) -> None:
+    global _enabled
+    try:
+        _enabled = db.execute(text("SELECT EXISTS (SELECT 1 FROM scheme_translations)")).scalar()
+    except Exception:
+        # Database imported before translations were normalised
+        db.rollback()
+        _enabled = False
+
+
+def _languages(language: str) -> List[str]:
+    return [language] if language == DEFAULT_LANGUAGE else [language, DEFAULT_LANGUAGE]
+
+
+def fetch(db, scheme_ids: Iterable[int], language: str,
+          fields: Iterable[str] = TRANSLATED_FIELDS) -> Dict[int, Dict[str, str]]:
+    """{scheme_id: {field: text}} in one language, English where a field is untranslated"""
+    scheme_ids = list(scheme_ids)
+    fields = list(fields)
+    if not scheme_ids:
+        return {}
+    query = text("""
+        SELECT scheme_id, lang, field, text
+        FROM scheme_translations
+        WHERE lang IN :langs AND scheme_id IN :ids AND field IN :fields
+    """).bindparams(
+        bindparam("langs", expanding=True), bindparam("ids", expanding=True), bindparam("fields", expanding=True)
+    )
+    rows = db.execute(query, {"langs": _languages(language), "ids": scheme_ids, "fields": fields}).fetchall()
+
+    result: Dict[int, Dict[str, str]] = {scheme_id: {} for scheme_id in scheme_ids}
+    # Fallback rows first so the requested language overwrites them
+    for row in sorted(rows, key=lambda row: row.lang == language):
+        result[row.scheme_id][row.field] = row.text
+    return result
+
+
+def fetch_one(db, scheme_id: int, language: str) -> Optional[Dict[str, str]]:
+    return fetch(db, [scheme_id], language).get(scheme_id)
+
+
+def uses_table(language: str) -> bool:
+    """Whether searches in language read scheme_translations rather than the wide columns
+
+    en/te/hi keep their columns on schemes, which a search reads without a join.
+    """
+    return _enabled and language not in WIDE_LANGUAGES
+
+
+def localized_schemes_sql(fields: Iterable[str] = TRANSLATED_FIELDS) -> str:
+    """Subquery with one row per scheme and one column per field in the :lang language
+
+    Untranslated fields fall back to English. Use as FROM ({sql}) AS schemes and
+    bind :lang and :default_lang. Translation rows are filtered to each language
+    before they are pivoted, so only those two languages' rows are read.
+    """
+    fields = list(fields)
+
+    def pivot(lang_param: str) -> str:
+        columns = ", ".join(f"MAX(CASE WHEN field = '{field}' THEN text END) AS {field}" for field in fields)
+        return f"""
+            SELECT scheme_id, {columns}
+            FROM scheme_translations
+            WHERE lang = :{lang_param}
+            GROUP BY scheme_id
+        """
+
+    columns = ",\n".join(f"COALESCE(t.{field}, d.{field}) AS {field}" for field in fields)
+    return f"""
+        SELECT s.id, s.scheme_type, s.category, s.official_link, s.beneficiary_tags,
+               {columns}
+        FROM schemes s
+        LEFT JOIN ({pivot("lang")}) t ON t.scheme_id = s.id
+        LEFT JOIN ({pivot("default_lang")}) d ON d.scheme_id = s.id
+    """
@@ -0,0 +1,182 @@
+"""
+Export the scheme catalogue as static, content-hashed JSON bundles.
+
+    python export_catalogue.py --out catalogue_export [--precompress]
+
+Writes, per language (en, te, hi):
+
+    <lang>/schemes.<hash>.json          every scheme with that language's text
+    <lang>/categories/<slug>.<hash>.json  schemes of one category, in id order
+    <lang>/statistics.<hash>.json       totals and per-category counts
+    <lang>/search-index.<hash>.json     term -> scheme ids inverted index
+
+plus manifest.json pointing at the current file of each bundle. Hashed files
+never change and can be cached forever by a CDN or bundled for offline use;
+only manifest.json needs a short cache lifetime.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from services.categories import AP_SCHEME_CONDITION, resolve, slugify
+from services.fuzzy import tokenize
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+LANGUAGES = ("en", "te", "hi")
+TEXT_FIELDS = ("scheme_name", "description", "eligibility", "benefits", "application_process")
+
+# Index terms are taken from these fields only; full descriptions would bloat the index
+INDEXED_FIELDS = ("scheme_name", "description")
+
+
+def _dump(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str).encode("utf-8")
+
+
+def _write(out_dir: str, relative_stem: str, data, precompress: bool) -> dict:
+    """Write data as <stem>.<content hash>.json and return its manifest entry"""
+    body = _dump(data)
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    relative_path = f"{relative_stem}.{digest}.json"
+    path = os.path.join(out_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+    if precompress:
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + ".br", "wb") as f:
+                f.write(brotli.compress(body, quality=11))
+    return {"path": relative_path, "bytes": len(body), "sha256": hashlib.sha256(body).hexdigest()}
+
+
+def load_catalogue(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT *, ({AP_SCHEME_CONDITION}) AS is_ap
+            FROM schemes
+            ORDER BY id
+        """)).mappings().fetchall()
+    return [dict(row) for row in rows]
+
+
+def category_info(name: str, language: str) -> dict:
+    category = resolve(name) if name else None
+    if category is None:
+        return {"slug": slugify(name or "uncategorized"), "name": name or ""}
+    return {"slug": category.slug, "name": category.names.get(language, category.name)}
+
+
+def build_language_bundles(rows, language: str):
+    schemes = []
+    by_category = defaultdict(list)
+    category_names = {}
+    postings = defaultdict(set)
+
+    for row in rows:
+        category = category_info(row["category"], language)
+        scheme = {
+            "id": row["id"],
+            "category": row["category"] or "",
+            "category_slug": category["slug"],
+            "scheme_type": row["scheme_type"] or "",
+            "official_link": row["official_link"] or "",
+            "beneficiary_tags": row["beneficiary_tags"] or "",
+        }
+        for field in TEXT_FIELDS:
+            scheme[field] = row.get(f"{field}_{language}") or ""
+        schemes.append(scheme)
+
+        category_names[category["slug"]] = category["name"]
+        by_category[category["slug"]].append({
+            "id": row["id"],
+            "scheme_name": scheme["scheme_name"],
+            "scheme_type": scheme["scheme_type"],
+            "official_link": scheme["official_link"],
+        })
+
+        indexed = [scheme[field] for field in INDEXED_FIELDS] + [scheme["beneficiary_tags"], scheme["category"]]
+        for term in tokenize(" ".join(indexed)):
+            if len(term) > 1 and not term.isdigit():
+                postings[term].add(row["id"])
+
+    total = len(rows)
+    ap_count = sum(1 for row in rows if row["is_ap"])
+    statistics = {
+        "total_schemes": total,
+        "ap_schemes": ap_count,
+        "central_schemes": total - ap_count,
+        "categories": sorted(
+            ({"slug": slug, "name": category_names[slug], "count": len(items)} for slug, items in by_category.items()),
+            key=lambda c: (-c["count"], c["slug"]),
+        ),
+    }
+    search_index = {
+        "fields": list(INDEXED_FIELDS) + ["beneficiary_tags", "category"],
+        "terms": {term: sorted(ids) for term, ids in sorted(postings.items())},
+    }
+    return schemes, dict(by_category), statistics, search_index
+
+
+def export_catalogue(out_dir: str, precompress: bool = False):
+    print("🚀 Exporting catalogue bundles...")
+    engine = create_engine(DATABASE_URL, echo=False)
+    rows = load_catalogue(engine)
+    print(f"✅ Loaded {len(rows)} schemes")
+
+    # Catalogue version: hash of the full rows, independent of export time
+    version = hashlib.sha256(_dump([
+        {k: v for k, v in row.items() if k not in ("created_at", "updated_at")} for row in rows
+    ])).hexdigest()[:12]
+
+    manifest = {
+        "version": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "total_schemes": len(rows),
+        "languages": {},
+    }
+    for language in LANGUAGES:
+        schemes, by_category, statistics, search_index = build_language_bundles(rows, language)
+        manifest["languages"][language] = {
+            "schemes": _write(out_dir, f"{language}/schemes", schemes, precompress),
+            "statistics": _write(out_dir, f"{language}/statistics", statistics, precompress),
+            "search_index": _write(out_dir, f"{language}/search-index", search_index, precompress),
+            "categories": {
+                slug: _write(out_dir, f"{language}/categories/{slug}", items, precompress)
+                for slug, items in sorted(by_category.items())
+            },
+        }
+        print(f"📦 {language}: {len(schemes)} schemes, {len(by_category)} categories, "
+              f"{len(search_index['terms'])} index terms")
+
+    # Written last so readers never see a manifest pointing at missing files
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    with open(manifest_path + ".tmp", "wb") as f:
+        f.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    print(f"\n✅ Export completed: version {version}")
+    print(f"🎯 Manifest: {manifest_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export static catalogue bundles")
+    parser.add_argument("--out", default="catalogue_export", help="output directory")
+    parser.add_argument("--precompress", action="store_true", help="also write .gz (and .br) variants")
+    args = parser.parse_args()
+    export_catalogue(args.out, args.precompress)
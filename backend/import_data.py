@@ -1,8 +1,18 @@
+import argparse
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, func, insert, select, text, update
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
+import re
+from services.categories import categorize
+from services.eligibility import constraint_rows
+from services.related import relation_rows
+from database.connection import Base
+from models.schemes import (
+    TRANSLATION_LANGUAGES, Scheme, SchemeConstraint, SchemeRelation, SchemeTranslation,
+)
+from models.catalogue import CatalogueVersion, SchemeChange
 
 # Load environment
 load_dotenv()
@@ -11,44 +21,10 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 def extract_category(beneficiary_tags):
     """Extract category from beneficiary tags"""
-    tags = str(beneficiary_tags).lower()
-    
-    if 'farmer' in tags or 'agriculture' in tags or 'rural' in tags:
-        return 'Agriculture, Rural & Environment'
-    elif 'education' in tags or 'student' in tags or 'learning' in tags:
-        return 'Education & Learning'
-    elif 'women' in tags or 'child' in tags:
-        return 'Women and Child'
-    elif 'health' in tags or 'medical' in tags:
-        return 'Health & Wellness'
-    elif 'employment' in tags or 'skill' in tags or 'job' in tags:
-        return 'Skills & Employment'
-    elif 'entrepreneur' in tags or 'business' in tags:
-        return 'Business & Entrepreneurship'
-    elif 'housing' in tags or 'shelter' in tags:
-        return 'Housing & Shelter'
-    elif 'bank' in tags or 'insurance' in tags or 'financial' in tags:
-        return 'Banking, Financial Services and Insurance'
-    elif 'transport' in tags:
-        return 'Transport & Infrastructure'
-    else:
-        return 'Social welfare & Empowerment'
-
-def import_schemes():
-    print("🚀 Starting CSV import...")
-    
-    # Read CSV
-    try:
-        df = pd.read_csv('SahayataDatasetFinal.csv')
-        print(f"✅ CSV loaded: {len(df)} schemes found\n")
-    except FileNotFoundError:
-        print("❌ Error: SahayataDatasetFinal.csv not found!")
-        return
-    
-    # Connect to database
-    engine = create_engine(DATABASE_URL, echo=False)
-    
-    # Prepare data for bulk insert
+    return categorize(beneficiary_tags).name
+
+def build_scheme_rows(df, verbose=True):
+    """Convert dataset rows into dicts matching the schemes table columns"""
     schemes_data = []
     
     for index, row in df.iterrows():
@@ -78,16 +54,219 @@ def import_schemes():
         
         schemes_data.append(scheme_dict)
         
-        if (index + 1) % 20 == 0:
+        if verbose and (index + 1) % 20 == 0:
             print(f"📊 Processed {index + 1} schemes...")
     
-    # Bulk insert using pandas
-    df_final = pd.DataFrame(schemes_data)
-    df_final.to_sql('schemes', engine, if_exists='append', index=False)
+    return schemes_data
+
+SCHEME_COLUMNS = [
+    'scheme_name_en', 'scheme_name_te', 'scheme_name_hi',
+    'description_en', 'description_te', 'description_hi',
+    'eligibility_en', 'eligibility_te', 'eligibility_hi',
+    'benefits_en', 'benefits_te', 'benefits_hi',
+    'application_process_en', 'application_process_te', 'application_process_hi',
+    'official_link', 'beneficiary_tags', 'scheme_type', 'category'
+]
+
+def scheme_key(scheme):
+    """Natural key used to match dataset rows to stored schemes"""
+    return (scheme.get('scheme_name_en') or '').strip().lower()
+
+def diff_schemes(existing, incoming):
+    """Split incoming rows into inserts, updates (id, row) and deleted ids against stored rows"""
+    stored = {scheme_key(row): row for row in existing}
+    inserts, updates = [], []
+    seen = set()
+    
+    for scheme in incoming:
+        key = scheme_key(scheme)
+        seen.add(key)
+        current = stored.get(key)
+        if current is None:
+            inserts.append(scheme)
+        elif any((current.get(col) or '') != (scheme.get(col) or '') for col in SCHEME_COLUMNS):
+            updates.append((current['id'], scheme))
+    
+    deletes = [row['id'] for key, row in stored.items() if key not in seen]
+    return inserts, updates, deletes
+
+# Dataset column headers of the translated fields, e.g. "Scheme Name (TE)"
+TRANSLATION_HEADERS = {
+    'Scheme Name': 'scheme_name',
+    'Description': 'description',
+    'Eligibility': 'eligibility',
+    'Benefits': 'benefits',
+    'Application Process': 'application_process',
+}
+TRANSLATION_COLUMN_RE = re.compile(r'^(.+) \(([A-Z]{2,3})\)$')
+
+def build_translations(df):
+    """{scheme key: {(lang, field): text}} for every language column in the dataset"""
+    columns = []
+    for column in df.columns:
+        match = TRANSLATION_COLUMN_RE.match(column)
+        if not match or match.group(1) not in TRANSLATION_HEADERS:
+            continue
+        lang = match.group(2).lower()
+        if lang not in TRANSLATION_LANGUAGES:
+            print(f"⚠️ Skipping column {column!r}: add '{lang}' to TRANSLATION_LANGUAGES to import it")
+            continue
+        columns.append((column, lang, TRANSLATION_HEADERS[match.group(1)]))
+    
+    translations = {}
+    for _, row in df.iterrows():
+        texts = {}
+        for column, lang, field in columns:
+            value = row.get(column)
+            if pd.notna(value) and str(value).strip():
+                texts[(lang, field)] = str(value).strip()
+        translations[str(row.get('Scheme Name (EN)', '')).strip().lower()] = texts
+    return translations
+
+def load_translations(conn):
+    """Stored translations in the same shape as build_translations"""
+    rows = conn.execute(text("""
+        SELECT s.scheme_name_en, t.lang, t.field, t.text
+        FROM scheme_translations t JOIN schemes s ON s.id = t.scheme_id
+    """)).fetchall()
+    translations = {}
+    for row in rows:
+        translations.setdefault((row.scheme_name_en or '').strip().lower(), {})[(row.lang, row.field)] = row.text
+    return translations
+
+def refresh_translations(conn, translations):
+    """Rewrite scheme_translations for every stored scheme"""
+    ids = {scheme_key(row): row['id'] for row in conn.execute(
+        select(Scheme.__table__.c.id, Scheme.__table__.c.scheme_name_en)
+    ).mappings()}
+    rows = [
+        {"scheme_id": ids[key], "lang": lang, "field": field, "text": value}
+        for key, texts in translations.items() if key in ids
+        for (lang, field), value in texts.items()
+    ]
+    conn.execute(delete(SchemeTranslation.__table__))
+    if rows:
+        conn.execute(insert(SchemeTranslation.__table__), rows)
+    languages = sorted({row["lang"] for row in rows})
+    print(f"🌐 Translations: {len(rows)} texts in {len(languages)} languages ({', '.join(languages)})")
+
+def refresh_constraints(conn):
+    """Re-extract structured eligibility constraints for every stored scheme"""
+    schemes = conn.execute(select(
+        Scheme.__table__.c.id, Scheme.__table__.c.eligibility_en, Scheme.__table__.c.beneficiary_tags,
+        Scheme.__table__.c.scheme_type, Scheme.__table__.c.scheme_name_en,
+    )).mappings().fetchall()
+    rows = constraint_rows(schemes)
+    conn.execute(delete(SchemeConstraint.__table__))
+    if rows:
+        conn.execute(insert(SchemeConstraint.__table__), rows)
+    with_limits = sum(1 for row in rows if row["min_age"] or row["max_age"] or row["income_ceiling"])
+    print(f"📐 Eligibility constraints: {len(rows)} schemes, {with_limits} with age or income limits")
+
+def refresh_relations(conn):
+    """Recompute the related-schemes graph over the whole catalogue"""
+    schemes = conn.execute(select(Scheme.__table__)).mappings().fetchall()
+    rows = relation_rows(schemes)
+    conn.execute(delete(SchemeRelation.__table__))
+    if rows:
+        conn.execute(insert(SchemeRelation.__table__), rows)
+    print(f"🔗 Related schemes: {len(rows)} edges for {len(schemes)} schemes")
+
+def import_schemes(csv_path='SahayataDatasetFinal.csv'):
+    print("🚀 Starting CSV import...")
+    
+    # Read CSV
+    try:
+        df = pd.read_csv(csv_path)
+        print(f"✅ CSV loaded: {len(df)} schemes found\n")
+    except FileNotFoundError:
+        print(f"❌ Error: {csv_path} not found!")
+        return
+    
+    # Connect to database
+    engine = create_engine(DATABASE_URL, echo=False)
+    Base.metadata.create_all(
+        engine,
+        tables=[Scheme.__table__, CatalogueVersion.__table__, SchemeChange.__table__,
+                SchemeConstraint.__table__, SchemeRelation.__table__, SchemeTranslation.__table__],
+    )
+    # Languages added since the table was created get their partial index here
+    for index in SchemeTranslation.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    
+    # Prepare data and compare with what is already stored
+    schemes_data = build_scheme_rows(df)
+    translations = build_translations(df)
+    
+    with engine.begin() as conn:
+        existing = [dict(row) for row in conn.execute(select(Scheme.__table__)).mappings()]
+        inserts, updates, deletes = diff_schemes(existing, schemes_data)
+        
+        # Schemes whose only change is in translations (e.g. a new language) are updates too
+        stored_translations = load_translations(conn)
+        updated_ids = {scheme_id for scheme_id, _ in updates}
+        stored = {scheme_key(row): row['id'] for row in existing}
+        for scheme in schemes_data:
+            key = scheme_key(scheme)
+            scheme_id = stored.get(key)
+            if scheme_id is not None and scheme_id not in updated_ids \
+                    and translations.get(key, {}) != stored_translations.get(key, {}):
+                updates.append((scheme_id, scheme))
+                updated_ids.add(scheme_id)
+        
+        # The first versioned import always records a version, so clients have a baseline to sync from
+        first_version = conn.execute(select(func.max(CatalogueVersion.__table__.c.id))).scalar() is None
+        if not (inserts or updates or deletes or first_version):
+            refresh_constraints(conn)
+            refresh_relations(conn)
+            print("\n✅ Catalogue already up to date, no new version recorded")
+            return
+        
+        # Every change in one transaction under a new catalogue version
+        version = conn.execute(
+            insert(CatalogueVersion.__table__).values(
+                inserted=len(inserts), updated=len(updates), deleted=len(deletes)
+            ).returning(CatalogueVersion.__table__.c.id)
+        ).scalar_one()
+        
+        changes = []
+        for scheme in inserts:
+            scheme_id = conn.execute(
+                insert(Scheme.__table__).values(**scheme).returning(Scheme.__table__.c.id)
+            ).scalar_one()
+            changes.append({"version": version, "scheme_id": scheme_id, "change_type": "insert"})
+        for scheme_id, scheme in updates:
+            conn.execute(update(Scheme.__table__).where(Scheme.__table__.c.id == scheme_id).values(**scheme))
+            changes.append({"version": version, "scheme_id": scheme_id, "change_type": "update"})
+        if deletes:
+            conn.execute(delete(Scheme.__table__).where(Scheme.__table__.c.id.in_(deletes)))
+            changes.extend({"version": version, "scheme_id": scheme_id, "change_type": "delete"} for scheme_id in deletes)
+        if changes:
+            conn.execute(insert(SchemeChange.__table__), changes)
+        refresh_translations(conn, translations)
+        refresh_constraints(conn)
+        refresh_relations(conn)
     
     print(f"\n✅ Import completed!")
-    print(f"📈 Total schemes imported: {len(schemes_data)}")
+    print(f"📈 Catalogue version {version}: {len(inserts)} inserted, {len(updates)} updated, {len(deletes)} deleted")
     print(f"🎯 Database: sahayataaifinal")
 
+def export_embedded(path='catalogue.sqlite3'):
+    """Write the read-only SQLite snapshot served with CATALOGUE_BACKEND=sqlite"""
+    from database import embedded
+
+    engine = create_engine(DATABASE_URL, echo=False)
+    counts = embedded.write_snapshot(engine, path)
+    print(f"📦 Embedded catalogue written to {path}: "
+          + ", ".join(f"{table} {rows}" for table, rows in counts.items()))
+    return counts
+
 if __name__ == "__main__":
-    import_schemes()
+    parser = argparse.ArgumentParser(description="Import the scheme dataset")
+    parser.add_argument("--csv", default='SahayataDatasetFinal.csv', help="dataset to import")
+    parser.add_argument("--embedded", metavar="PATH",
+                        help="also write the SQLite catalogue for offline deployments (CATALOGUE_BACKEND=sqlite)")
+    args = parser.parse_args()
+    import_schemes(args.csv)
+    if args.embedded:
+        export_embedded(args.embedded)
@@ -0,0 +1,39 @@
+"""
+Sidecar job worker: runs queued background jobs outside the API process.
+
+    python job_worker.py
+
+Set JOB_WORKER_ENABLED=0 on the API processes to leave imports, exports and
+recommendation refreshes to this worker. Index rebuilds and cache warming
+still run in every API process, which holds the in-memory state.
+"""
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+
+from database.connection import test_connection
+from services import catalogue, eligibility, jobs
+
+
+async def main():
+    # Recommendation refreshes need the eligibility index and the current catalogue version
+    asyncio.create_task(catalogue.refresh_periodically())
+    await jobs.run_worker()
+
+
+if __name__ == "__main__":
+    print("🚀 Starting job worker...")
+    if not test_connection():
+        raise SystemExit(1)
+    catalogue.refresh()
+    print(f"✅ Handling: {', '.join(jobs.runnable_kinds())}")
+    asyncio.run(main())
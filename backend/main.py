@@ -1,9 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import chatbot, stats
-from database.connection import test_connection
+from fastapi.responses import PlainTextResponse
+from routes import chatbot, stats, schemes, auth, admin
+from database.connection import EMBEDDED, test_connection
+from services.metrics import MetricsMiddleware, render_metrics
+from services.rate_limit import RateLimitMiddleware
+from services.compression import CompressionMiddleware
+from services import catalogue, jobs, query_log, recommendations, sharded_search
+import asyncio
+import logging
 import os
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+
 app = FastAPI(
     title="SahayataAI API",
     description="Multilingual Government Schemes Chatbot API",
@@ -19,6 +31,11 @@ origins = [
     "https://*.vercel.app",
 ]
 
+# Inside the rate limiter so cached responses are rate limited too
+app.add_middleware(CompressionMiddleware)
+
+# Registered before CORS so rejected requests still get CORS headers
+app.add_middleware(RateLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,15 +44,47 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(chatbot.router)
 app.include_router(stats.router)
+app.include_router(schemes.router)
+app.include_router(auth.router)
+app.include_router(admin.router)
 
 @app.on_event("startup")
 async def startup_event():
-    """Test database connection on startup"""
+    """Test database connection and load the catalogue on startup"""
     test_connection()
+    try:
+        catalogue.refresh()
+    except Exception as e:
+        print(f"⚠️ Catalogue not loaded: {e}")
+    asyncio.create_task(catalogue.refresh_periodically())
+    if EMBEDDED:
+        # Read-only catalogue snapshot: nothing to store recommendations, queries or jobs in
+        return
+    asyncio.create_task(recommendations.refresh_periodically())
+    asyncio.create_task(query_log.flush_periodically())
+    jobs.set_app(app)
+    try:
+        jobs.ensure_table()
+    except Exception as e:
+        print(f"⚠️ Job table not available: {e}")
+    # Runs per-process jobs (index rebuilds, cache warming) even with JOB_WORKER_ENABLED=0
+    asyncio.create_task(jobs.run_worker())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the scoring workers and write out queries still in the log buffer"""
+    sharded_search.shutdown()
+    if EMBEDDED:
+        return
+    try:
+        await asyncio.to_thread(query_log.flush)
+    except Exception as e:
+        print(f"⚠️ Query log not flushed: {e}")
 
 @app.get("/")
 def root():
@@ -46,6 +95,7 @@ def root():
         "endpoints": [
             "/api/chatbot/chat",
             "/api/chatbot/health",
+            "/metrics",
             "/docs"
         ]
     }
@@ -53,3 +103,8 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "database": "connected"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
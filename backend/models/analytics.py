@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, String
+from database.connection import Base
+
+class QueryLog(Base):
+    """One search, written in batches by services/query_log.py"""
+    __tablename__ = "query_log"
+
+    id = Column(BigInteger, primary_key=True)
+    logged_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    source = Column(String(16), nullable=False)  # chat / search
+    language = Column(String(8), nullable=False)
+    query = Column(String, nullable=False, index=True)  # normalised
+    result_count = Column(Integer, nullable=False)
+    latency_ms = Column(Float)
+    top_ids = Column(String)  # comma-separated, best first
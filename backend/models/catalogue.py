@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+from database.connection import Base
+
+class CatalogueVersion(Base):
+    """One row per import that changed the catalogue; id is the catalogue version"""
+    __tablename__ = "catalogue_versions"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    inserted = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    deleted = Column(Integer, default=0)
+
+class SchemeChange(Base):
+    """Per-scheme change log, read by /api/schemes/changes"""
+    __tablename__ = "scheme_changes"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, index=True, nullable=False)
+    scheme_id = Column(Integer, nullable=False)
+    change_type = Column(String(8), nullable=False)  # insert / update / delete
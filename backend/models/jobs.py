@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String, Text, func
+from database.connection import Base
+
+class Job(Base):
+    """Background maintenance job, run by the worker in services/jobs.py"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, index=True)  # queued / running / succeeded / failed
+    params = Column(Text)  # JSON
+    progress = Column(Float, default=0.0)  # 0.0 - 1.0
+    message = Column(Text)
+    result = Column(Text)  # JSON
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))  # touched by the worker while running
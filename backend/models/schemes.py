@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, Column, Float, Index, Integer, String, Text
+from sqlalchemy import text as sql_text
 from database.connection import Base
 
 class Scheme(Base):
@@ -23,4 +24,50 @@ class Scheme(Base):
     official_link = Column(String)
     beneficiary_tags = Column(String)  # Stored as comma-separated
     scheme_type = Column(String)  # AP/Central
-    category = Column(String, index=True)  # ← MAKE SURE THIS LINE EXISTS
\ No newline at end of file
+    category = Column(String, index=True)  # ← MAKE SURE THIS LINE EXISTS
+
+class SchemeConstraint(Base):
+    """Structured eligibility limits extracted from the eligibility prose by the importer"""
+    __tablename__ = "scheme_constraints"
+
+    scheme_id = Column(Integer, primary_key=True)
+    min_age = Column(Integer)  # NULL = no lower limit
+    max_age = Column(Integer)  # NULL = no upper limit
+    income_ceiling = Column(BigInteger)  # annual, rupees; NULL = no ceiling
+    gender = Column(String)  # "female" when men are excluded, else NULL
+    state = Column(String)  # "andhra pradesh" for AP-only schemes, else NULL
+    castes = Column(String)  # comma-separated targets: sc, st, obc, bc, ews, minority
+    occupations = Column(String)  # comma-separated targets: farmer, student, ...
+    disability = Column(Boolean, default=False)
+
+class SchemeRelation(Base):
+    """Precomputed nearest neighbours of each scheme, written by the importer"""
+    __tablename__ = "scheme_relations"
+
+    scheme_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)  # 0 = most similar
+    related_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)  # weighted cosine similarity
+
+# Languages with a per-language partial index on scheme_translations; new languages are appended here
+TRANSLATION_LANGUAGES = ("en", "te", "hi")
+TRANSLATED_FIELDS = ("scheme_name", "description", "eligibility", "benefits", "application_process")
+
+class SchemeTranslation(Base):
+    """One translated text field of a scheme; one row per (scheme, language, field)"""
+    __tablename__ = "scheme_translations"
+
+    scheme_id = Column(Integer, primary_key=True)
+    lang = Column(String(8), primary_key=True)
+    field = Column(String(32), primary_key=True)
+    text = Column(Text, nullable=False)
+
+    # Reads always filter on one language, so each language gets its own small index
+    __table_args__ = tuple(
+        Index(
+            f"ix_scheme_translations_{lang}", "scheme_id", "field",
+            postgresql_where=sql_text(f"lang = '{lang}'"),
+            sqlite_where=sql_text(f"lang = '{lang}'"),
+        )
+        for lang in TRANSLATION_LANGUAGES
+    )
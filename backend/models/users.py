@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Date, DateTime, Integer, String
 from database.connection import Base
 
 class User(Base):
@@ -11,3 +11,13 @@ class User(Base):
     gender = Column(String)
     username = Column(String, unique=True, index=True)
     password_hash = Column(String)
+
+class UserRecommendation(Base):
+    """Ranked scheme ids per user, precomputed so serving is one keyed read"""
+    __tablename__ = "user_recommendations"
+
+    user_id = Column(Integer, primary_key=True)
+    catalogue_version = Column(String, nullable=False)
+    valid_until = Column(Date)  # next birthday that crosses an age threshold; NULL = never
+    scheme_ids = Column(String, nullable=False)  # comma-separated, best first
+    computed_at = Column(DateTime, nullable=False)
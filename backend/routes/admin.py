@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+import hmac
+import os
+
+from database import slow_queries
+from database.connection import get_db
+from services import jobs, query_log
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set and sent as X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    # compare_digest only takes str that is pure ASCII; bytes work for any token
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+# Slow query ring buffer
+@router.get("/slow-queries", dependencies=[Depends(require_admin)])
+def get_slow_queries(limit: int = 50):
+    log = slow_queries.slow_query_log
+    if log is None:
+        return {"enabled": False, "count": 0, "queries": []}
+
+    entries = log.entries()
+    return {
+        "enabled": True,
+        "threshold_ms": log.threshold_ms,
+        "explain_sample_rate": log.explain_sample_rate,
+        "capacity": log.capacity,
+        "count": len(entries),
+        "queries": entries[:limit]
+    }
+
+@router.delete("/slow-queries", dependencies=[Depends(require_admin)])
+def clear_slow_queries():
+    if slow_queries.slow_query_log is not None:
+        slow_queries.slow_query_log.clear()
+    return {"success": True}
+
+# Background jobs
+class JobRequest(BaseModel):
+    kind: str
+    params: Optional[Dict] = None
+
+@router.post("/jobs", dependencies=[Depends(require_admin)], status_code=status.HTTP_202_ACCEPTED)
+def create_job(request: JobRequest, db: Session = Depends(get_db)):
+    try:
+        return {"success": True, "job": jobs.enqueue(db, request.kind, request.params)}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{e}; known kinds: {', '.join(jobs.kinds())}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@router.get("/jobs", dependencies=[Depends(require_admin)])
+def get_jobs(
+    status_filter: Optional[str] = Query(None, alias="status", regex="^(queued|running|succeeded|failed)$"),
+    limit: int = Query(50, le=500),
+    db: Session = Depends(get_db)
+):
+    try:
+        items = jobs.list_jobs(db, status_filter, limit)
+        return {"kinds": jobs.kinds(), "count": len(items), "jobs": items}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@router.get("/jobs/{job_id}", dependencies=[Depends(require_admin)])
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    try:
+        job = jobs.get_job(db, job_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+        return {"success": True, "job": job}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+# Search analytics from the query log
+@router.get("/queries", dependencies=[Depends(require_admin)])
+def get_query_analytics(
+    days: int = Query(7, ge=1, le=365),
+    language: Optional[str] = Query(None, regex="^(en|te|hi)$"),
+    limit: int = Query(50, le=500),
+    db: Session = Depends(get_db)
+):
+    try:
+        return {
+            "days": days,
+            "language": language,
+            "pending": query_log.pending(),
+            "dropped": query_log.dropped(),
+            "top": query_log.top_queries(db, days, language, limit),
+            "zero_results": query_log.zero_result_queries(db, days, language, limit)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, validator
 from datetime import datetime, date
+from typing import Optional
 import bcrypt
 import re
 
@@ -9,7 +11,12 @@ import re
 import sys
 sys.path.append('..')
 from database.connection import get_db
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
+from services.tokens import TokenError, issue_token_pair, verify_token
+from services import categories, recommendations
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -46,10 +53,51 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class ProfileUpdateRequest(BaseModel):
+    name: Optional[str] = None
+    dob: Optional[str] = None  # Format: YYYY-MM-DD
+    gender: Optional[str] = None
+
 class AuthResponse(BaseModel):
     success: bool
     message: str
     user: dict = None
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    token_type: Optional[str] = None
+    expires_in: Optional[int] = None
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    """Verify the bearer access token in memory; no database or bcrypt work"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        claims = verify_token(credentials.credentials, "access")
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return {"id": claims["sub"], "username": claims["usr"], "name": claims.get("name")}
+
+def _refresh_recommendations(db: Session, user_id: int):
+    """Precompute recommendations; a failure here never fails the request, the background job retries"""
+    try:
+        recommendations.refresh_user(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("recommendations_refresh_failed user_id=%s", user_id)
 
 # Signup endpoint
 @router.post("/signup", response_model=AuthResponse)
@@ -86,10 +134,11 @@ def signup(request: SignupRequest, db: Session = Depends(get_db)):
         dob = datetime.strptime(request.dob, '%Y-%m-%d').date()
         
         # Insert user
-        db.execute(
+        user_id = db.execute(
             text("""
                 INSERT INTO users (name, mobile, dob, gender, username, password_hash)
                 VALUES (:name, :mobile, :dob, :gender, :username, :password_hash)
+                RETURNING id
             """),
             {
                 "name": request.name,
@@ -99,19 +148,24 @@ def signup(request: SignupRequest, db: Session = Depends(get_db)):
                 "username": request.username,
                 "password_hash": password_hash
             }
-        )
+        ).scalar()
         db.commit()
+        _refresh_recommendations(db, user_id)
         
         return AuthResponse(
             success=True,
             message="Account created successfully!",
             user={
+                "id": user_id,
                 "username": request.username,
                 "name": request.name,
                 "mobile": request.mobile
-            }
+            },
+            **issue_token_pair(user_id, request.username, request.name)
         )
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -164,7 +218,8 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
                 "username": user.username,
                 "name": user.name,
                 "mobile": user.mobile
-            }
+            },
+            **issue_token_pair(user.id, user.username, user.name)
         )
         
     except HTTPException:
@@ -174,3 +229,129 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error during login: {str(e)}"
         )
+
+# Exchange a refresh token for a new token pair
+@router.post("/refresh", response_model=AuthResponse)
+def refresh(request: RefreshRequest):
+    try:
+        claims = verify_token(request.refresh_token, "refresh")
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+    
+    return AuthResponse(
+        success=True,
+        message="Token refreshed",
+        user={"id": claims["sub"], "username": claims["usr"], "name": claims.get("name")},
+        **issue_token_pair(claims["sub"], claims["usr"], claims.get("name"))
+    )
+
+# Current user from the access token (no database access)
+@router.get("/me")
+def me(current_user: dict = Depends(get_current_user)):
+    return {"success": True, "user": current_user}
+
+# Update the stored profile
+@router.put("/me")
+def update_profile(
+    request: ProfileUpdateRequest,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        updates = {}
+        if request.name is not None:
+            updates["name"] = request.name
+        if request.dob is not None:
+            updates["dob"] = datetime.strptime(request.dob, '%Y-%m-%d').date()
+        if request.gender is not None:
+            updates["gender"] = request.gender
+        
+        if updates:
+            assignments = ", ".join(f"{column} = :{column}" for column in updates)
+            db.execute(
+                text(f"UPDATE users SET {assignments} WHERE id = :id"),
+                dict(updates, id=current_user["id"])
+            )
+            db.commit()
+            if "dob" in updates or "gender" in updates:
+                _refresh_recommendations(db, current_user["id"])
+        
+        user = db.execute(
+            text("SELECT id, name, mobile, dob, gender, username FROM users WHERE id = :id"),
+            {"id": current_user["id"]}
+        ).fetchone()
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        
+        return {
+            "success": True,
+            "user": {
+                "id": user.id,
+                "username": user.username,
+                "name": user.name,
+                "mobile": user.mobile,
+                "dob": user.dob.isoformat() if user.dob else None,
+                "gender": user.gender
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating profile: {str(e)}"
+        )
+
+# Personalised recommendations, precomputed from the stored profile
+@router.get("/me/recommendations")
+def my_recommendations(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    try:
+        row = recommendations.get(db, current_user["id"])
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Recommendations are not available yet"
+            )
+        
+        scheme_ids = [int(scheme_id) for scheme_id in row["scheme_ids"].split(",") if scheme_id]
+        index = categories.get_index()
+        if index is not None:
+            schemes = [index.schemes[scheme_id] for scheme_id in scheme_ids if scheme_id in index.schemes]
+        else:
+            results = db.execute(
+                text("""
+                    SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
+                           category, scheme_type, official_link
+                    FROM schemes
+                    WHERE id IN :ids
+                """).bindparams(bindparam("ids", expanding=True)),
+                {"ids": scheme_ids}
+            ).mappings().fetchall()
+            by_id = {result["id"]: dict(result) for result in results}
+            schemes = [by_id[scheme_id] for scheme_id in scheme_ids if scheme_id in by_id]
+        
+        return {
+            "success": True,
+            "catalogue_version": row["catalogue_version"],
+            "computed_at": row["computed_at"],
+            "count": len(schemes),
+            "schemes": schemes
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error loading recommendations: {str(e)}"
+        )
@@ -1,21 +1,38 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from database.connection import get_db
-from sqlalchemy import text
-from typing import List, Dict, Set
+from database.connection import ReadSessionLocal
+from database import translations
+from models.schemes import TRANSLATED_FIELDS
+from sqlalchemy import bindparam, text
+from typing import Iterator, List, Dict, Set, Optional, Tuple
+from services import catalogue, categories, fuzzy, intent, metrics, query_log, sharded_search, snippets
+from services.conversation import get_conversation_store
+from services.singleflight import SingleFlight
+import asyncio
+import json
+import logging
+import os
 import re
+import time
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/chatbot", tags=["Chatbot"])
 
 class ChatRequest(BaseModel):
     message: str
     language: str = "en"
+    conversation_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     schemes: list = []
     language: str
+    conversation_id: Optional[str] = None
+    refined: bool = False
+    corrected_query: Optional[str] = None
 
 # ============================================================================
 # COMPREHENSIVE KEYWORD MAPPING
@@ -78,181 +95,414 @@ def extract_query_keywords(query: str, language: str) -> Set[str]:
 # ENHANCED DATABASE SEARCH WITH FUZZY MATCHING
 # ============================================================================
 
+def snippet_terms(query: str, language: str, keywords: Set[str]) -> List[str]:
+    """Terms highlighted in result snippets: the query's meaningful words and its matched keywords"""
+    stopwords = REFINEMENT_STOPWORDS.get(language, set()) | REFINEMENT_STOPWORDS["en"]
+    return snippets.query_terms(query, keywords, stopwords)
+
+def shape_search_row(row, language: Optional[str] = None, terms: Optional[List[str]] = None) -> Dict:
+    """Convert a search result row into the scheme dict returned to clients
+
+    With a language, the dict also carries a snippet of the best-matching field
+    with the terms highlighted.
+    """
+    desc = row.description or ""
+    # Truncate description smartly, never inside a grapheme cluster
+    truncated_desc = snippets.truncate(desc, 180)
+    
+    shaped = {
+        "id": row.id,
+        "scheme_name": row.scheme_name or "N/A",
+        "description": truncated_desc,
+        "eligibility": row.eligibility or "",
+        "benefits": row.benefits or "",
+        "application_process": row.application_process or "",
+        "scheme_type": row.scheme_type or "",
+        "category": row.category or "",
+        "official_link": row.official_link or "",
+        "beneficiary_tags": row.beneficiary_tags or "",
+        "score": row.score
+    }
+    if language is not None:
+        match = snippets.snippet(row.id, language, terms or [])
+        shaped["snippet"] = match.text if match else snippets.truncate(desc, snippets.SNIPPET_LENGTH, snippets.ELLIPSIS)
+        shaped["snippet_field"] = match.field if match else "description"
+    return shaped
+
+def _text_source(language: str) -> Tuple[str, Dict, Tuple[str, ...]]:
+    """(FROM clause, its parameters, column names for TRANSLATED_FIELDS) of one language's text
+
+    The wide columns for en/te/hi, else one language's text from scheme_translations.
+    """
+    if translations.uses_table(language):
+        source = f"({translations.localized_schemes_sql()}) AS schemes"
+        params = {"lang": language, "default_lang": translations.DEFAULT_LANGUAGE}
+        return source, params, TRANSLATED_FIELDS
+    return "schemes", {}, tuple(f"{field}_{language}" for field in TRANSLATED_FIELDS)
+
+def iter_search_database(query: str, language: str, db: Session, limit: int = 10,
+                         keywords: Optional[Set[str]] = None,
+                         category_names: Optional[List[str]] = None) -> Iterator[Dict]:
+    """Run the ranked search and return a generator that shapes rows as they are consumed
+
+    category_names, when given, restricts the search to schemes in those categories.
+    """
+    # Extract keywords
+    if keywords is None:
+        with metrics.phase("keyword_extraction"):
+            keywords = extract_query_keywords(query, language)
+    
+    # Large catalogues are ranked across the sharded worker pool when it is enabled
+    if sharded_search.available():
+        with metrics.phase("retrieval"):
+            ranked = sharded_search.search(query.strip().lower(), language, keywords, category_names, limit)
+        if ranked is not None:
+            terms = snippet_terms(query, language, keywords)
+            return (shape_search_row(row, language, terms) for row in ranked)
+    
+    source, params, (name_col, desc_col, elig_col, benefits_col, apply_col) = _text_source(language)
+    
+    # Clean and prepare search patterns
+    query_clean = query.strip().lower()
+    like_pattern = f"%{query_clean}%"
+    
+    # Build dynamic WHERE clause based on extracted keywords
+    keyword_conditions = []
+    if keywords:
+        for kw in keywords:
+            keyword_conditions.append(f"LOWER(beneficiary_tags) LIKE '%{kw}%'")
+            keyword_conditions.append(f"LOWER(category) LIKE '%{kw}%'")
+    
+    keyword_clause = " OR ".join(keyword_conditions) if keyword_conditions else "1=0"
+    category_clause = "AND category IN :category_names" if category_names is not None else ""
+    if category_names is not None:
+        params["category_names"] = category_names
+    
+    sql_query = f"""
+        SELECT 
+            id,
+            {name_col} as scheme_name,
+            {desc_col} as description,
+            {elig_col} as eligibility,
+            {benefits_col} as benefits,
+            {apply_col} as application_process,
+            scheme_type,
+            category,
+            official_link,
+            beneficiary_tags,
+            -- ADVANCED RELEVANCE SCORING
+            (
+                -- Exact name match (highest priority)
+                CASE WHEN LOWER({name_col}) LIKE :pattern THEN 100 ELSE 0 END +
+                
+                -- Category match (very high priority)
+                CASE WHEN LOWER(category) LIKE :pattern THEN 90 ELSE 0 END +
+                
+                -- Beneficiary tags match (high priority)
+                CASE WHEN LOWER(beneficiary_tags) LIKE :pattern THEN 80 ELSE 0 END +
+                
+                -- Scheme type match
+                CASE WHEN LOWER(scheme_type) LIKE :pattern THEN 70 ELSE 0 END +
+                
+                -- Description match (medium priority)
+                CASE WHEN LOWER({desc_col}) LIKE :pattern THEN 60 ELSE 0 END +
+                
+                -- Eligibility match
+                CASE WHEN LOWER({elig_col}) LIKE :pattern THEN 40 ELSE 0 END +
+                
+                -- Benefits match
+                CASE WHEN LOWER({benefits_col}) LIKE :pattern THEN 30 ELSE 0 END +
+                
+                -- Application process match
+                CASE WHEN LOWER({apply_col}) LIKE :pattern THEN 20 ELSE 0 END +
+                
+                -- Keyword-based bonus (if keywords extracted)
+                CASE WHEN ({keyword_clause}) THEN 50 ELSE 0 END
+            ) as score
+        FROM {source}
+        WHERE (
+            LOWER({name_col}) LIKE :pattern
+            OR LOWER({desc_col}) LIKE :pattern
+            OR LOWER({elig_col}) LIKE :pattern
+            OR LOWER({benefits_col}) LIKE :pattern
+            OR LOWER({apply_col}) LIKE :pattern
+            OR LOWER(scheme_type) LIKE :pattern
+            OR LOWER(category) LIKE :pattern
+            OR LOWER(beneficiary_tags) LIKE :pattern
+            OR ({keyword_clause})
+        ) {category_clause}
+        ORDER BY score DESC, id ASC 
+        LIMIT :limit
+    """
+    statement = text(sql_query)
+    if category_names is not None:
+        statement = statement.bindparams(bindparam("category_names", expanding=True))
+    
+    with metrics.phase("retrieval"):
+        result = db.execute(statement, dict(params, pattern=like_pattern, limit=limit))
+    
+    terms = snippet_terms(query, language, keywords)
+    return (shape_search_row(row, language, terms) for row in result)
+
+# ============================================================================
+# INTENT ROUTING
+# ============================================================================
+
+# A routed search that finds fewer schemes than this is rerun over the whole catalogue
+MIN_ROUTED_RESULTS = 3
+
+def route_query(query: str, keywords: Set[str]) -> Tuple[Set[str], Optional[List[str]]]:
+    """Keywords and category names to search for a message that matched no intent keyword
+
+    Returns the keywords unchanged and no categories (search everything) when
+    keywords already matched or the classifier is unsure.
+    """
+    if keywords:
+        return keywords, None
+    with metrics.phase("intent_classification"):
+        prediction = intent.classify(query)
+    if prediction is None or prediction.intent is None:
+        return keywords, None
+    names = [category.name for category in map(categories.resolve, prediction.categories) if category]
+    return {prediction.intent}, names or None
+
+def iter_routed_search(query: str, language: str, db: Session, limit: int = 10,
+                       keywords: Optional[Set[str]] = None) -> Iterator[Dict]:
+    """Ranked search, limited to the predicted categories for messages without intent keywords
+
+    A routed search that finds too little is rerun over the whole catalogue.
+    """
+    if keywords is None:
+        with metrics.phase("keyword_extraction"):
+            keywords = extract_query_keywords(query, language)
+    routed_keywords, category_names = route_query(query, keywords)
+    if category_names is None:
+        # An intent without confident categories still replaces the empty keywords
+        metrics.INTENT_ROUTES.inc("unrouted" if routed_keywords == keywords else "intent_only")
+        return iter_search_database(query, language, db, limit, routed_keywords)
+    keywords = routed_keywords
+    
+    routed = list(iter_search_database(query, language, db, limit, keywords, category_names))
+    if len(routed) >= min(MIN_ROUTED_RESULTS, limit):
+        metrics.INTENT_ROUTES.inc("routed")
+        return iter(routed)
+    metrics.INTENT_ROUTES.inc("fallback")
+    return iter_search_database(query, language, db, limit, keywords)
+
 def search_database(query: str, language: str, db: Session, limit: int = 10) -> List[Dict]:
     """Enhanced search with fuzzy matching and keyword extraction"""
     try:
         # Extract keywords
-        keywords = extract_query_keywords(query, language)
-        
-        # Column names
-        name_col = f"scheme_name_{language}"
-        desc_col = f"description_{language}"
-        elig_col = f"eligibility_{language}"
-        benefits_col = f"benefits_{language}"
-        apply_col = f"application_process_{language}"
-        
-        # Clean and prepare search patterns
-        query_clean = query.strip().lower()
-        like_pattern = f"%{query_clean}%"
-        
-        # Build dynamic WHERE clause based on extracted keywords
-        keyword_conditions = []
-        if keywords:
-            for kw in keywords:
-                keyword_conditions.append(f"LOWER(beneficiary_tags) LIKE '%{kw}%'")
-                keyword_conditions.append(f"LOWER(category) LIKE '%{kw}%'")
+        with metrics.phase("keyword_extraction"):
+            keywords = extract_query_keywords(query, language)
         
-        keyword_clause = " OR ".join(keyword_conditions) if keyword_conditions else "1=0"
+        ranked = iter_routed_search(query, language, db, limit, keywords)
         
-        sql_query = f"""
-            SELECT 
-                id,
-                {name_col} as scheme_name,
-                {desc_col} as description,
-                {elig_col} as eligibility,
-                {benefits_col} as benefits,
-                {apply_col} as application_process,
-                scheme_type,
-                category,
-                official_link,
-                beneficiary_tags,
-                -- ADVANCED RELEVANCE SCORING
-                (
-                    -- Exact name match (highest priority)
-                    CASE WHEN LOWER({name_col}) LIKE :pattern THEN 100 ELSE 0 END +
-                    
-                    -- Category match (very high priority)
-                    CASE WHEN LOWER(category) LIKE :pattern THEN 90 ELSE 0 END +
-                    
-                    -- Beneficiary tags match (high priority)
-                    CASE WHEN LOWER(beneficiary_tags) LIKE :pattern THEN 80 ELSE 0 END +
-                    
-                    -- Scheme type match
-                    CASE WHEN LOWER(scheme_type) LIKE :pattern THEN 70 ELSE 0 END +
-                    
-                    -- Description match (medium priority)
-                    CASE WHEN LOWER({desc_col}) LIKE :pattern THEN 60 ELSE 0 END +
-                    
-                    -- Eligibility match
-                    CASE WHEN LOWER({elig_col}) LIKE :pattern THEN 40 ELSE 0 END +
-                    
-                    -- Benefits match
-                    CASE WHEN LOWER({benefits_col}) LIKE :pattern THEN 30 ELSE 0 END +
-                    
-                    -- Application process match
-                    CASE WHEN LOWER({apply_col}) LIKE :pattern THEN 20 ELSE 0 END +
-                    
-                    -- Keyword-based bonus (if keywords extracted)
-                    CASE WHEN ({keyword_clause}) THEN 50 ELSE 0 END
-                ) as score
-            FROM schemes
-            WHERE 
-                LOWER({name_col}) LIKE :pattern
-                OR LOWER({desc_col}) LIKE :pattern
-                OR LOWER({elig_col}) LIKE :pattern
-                OR LOWER({benefits_col}) LIKE :pattern
-                OR LOWER({apply_col}) LIKE :pattern
-                OR LOWER(scheme_type) LIKE :pattern
-                OR LOWER(category) LIKE :pattern
-                OR LOWER(beneficiary_tags) LIKE :pattern
-                OR ({keyword_clause})
-            ORDER BY score DESC, id ASC 
-            LIMIT :limit
-        """
+        # Retrieval also computes the SQL relevance score; shaping rows is timed as scoring
+        with metrics.phase("scoring"):
+            schemes = list(ranked)
         
-        result = db.execute(text(sql_query), {"pattern": like_pattern, "limit": limit})
-        
-        schemes = []
-        for row in result:
-            desc = row.description or ""
-            # Truncate description smartly
-            truncated_desc = desc[:180] + "..." if len(desc) > 180 else desc
-            
-            schemes.append({
-                "id": row.id,
-                "scheme_name": row.scheme_name or "N/A",
-                "description": truncated_desc,
-                "eligibility": row.eligibility or "",
-                "benefits": row.benefits or "",
-                "application_process": row.application_process or "",
-                "scheme_type": row.scheme_type or "",
-                "category": row.category or "",
-                "official_link": row.official_link or "",
-                "beneficiary_tags": row.beneficiary_tags or "",
-                "score": row.score
-            })
-        
-        print(f"✅ FOUND {len(schemes)} schemes for '{query}' in {language}")
-        if schemes:
-            print(f"   Top: {schemes[0]['scheme_name']} (Score: {schemes[0]['score']})")
-        if keywords:
-            print(f"   Extracted keywords: {keywords}")
+        metrics.log_event(
+            logger, logging.DEBUG, "search",
+            query=query, language=language, found=len(schemes),
+            top_id=schemes[0]["id"] if schemes else None,
+            top_score=schemes[0]["score"] if schemes else None,
+            keywords=sorted(keywords),
+        )
         
         return schemes
         
-    except Exception as e:
-        print(f"❌ Search error: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("search_failed query=%r language=%r", query, language)
         return []
 
+# ============================================================================
+# MULTI-TURN REFINEMENT
+# ============================================================================
+
+# Results a chat turn shows; conversations keep a larger pool of ranked candidate ids for follow-ups
+RESULT_LIMIT = 10
+CANDIDATE_POOL = 50
+
+# Identical concurrent chat searches run once and share the (read-only) result
+CHAT_SINGLEFLIGHT_TIMEOUT = float(os.getenv("CHAT_SINGLEFLIGHT_TIMEOUT", "5"))
+_search_flight = SingleFlight("chat_search", CHAT_SINGLEFLIGHT_TIMEOUT)
+
+def _search_in_own_session(query: str, language: str, limit: int) -> List[Dict]:
+    """search_database on a session of its own: the leader's thread must not share a request's session"""
+    db = ReadSessionLocal()
+    try:
+        return search_database(query, language, db, limit=limit)
+    finally:
+        db.close()
+
+# Phrases that mark a follow-up as narrowing the previous results
+REFINEMENT_MARKERS = {
+    "en": ["which of these", "of these", "among these", "from these", "of them", "only", "just", "these", "those", "filter"],
+    "te": ["వీటిలో", "వాటిలో", "ఇందులో", "మాత్రమే"],
+    "hi": ["इनमें से", "इनमें", "उनमें", "केवल", "सिर्फ"],
+}
+
+# Markers are whole words: "only" must not match inside "commonly"
+_MARKER_BOUNDARY = r"\s,.;:!?()\"'"
+REFINEMENT_MARKER_PATTERNS = {
+    language: re.compile(
+        rf"(?<![^{_MARKER_BOUNDARY}])(?:{'|'.join(map(re.escape, sorted(markers, key=len, reverse=True)))})"
+        rf"(?![^{_MARKER_BOUNDARY}])"
+    )
+    for language, markers in REFINEMENT_MARKERS.items()
+}
+
+REFINEMENT_STOPWORDS = {
+    "en": {"which", "what", "are", "is", "for", "the", "a", "an", "of", "to", "in", "me", "show",
+           "give", "scheme", "schemes", "please", "with", "and", "or", "that", "them", "any"},
+    "te": {"పథకాలు", "పథకం", "ఏవి", "ఏది", "కోసం", "కు", "చూపించు"},
+    "hi": {"योजना", "योजनाएं", "कौन", "से", "है", "हैं", "के", "लिए", "की", "का", "दिखाओ"},
+}
+
+# Short or non-keyword refinements mapped to the strings they should match
+REFINEMENT_SYNONYMS = {
+    "ap": ["andhra pradesh", "state scheme", "ap"],
+    "andhra": ["andhra pradesh", "state scheme"],
+    "ఏపీ": ["andhra pradesh", "state scheme", "ఆంధ్ర"],
+    "ఆంధ్ర": ["andhra pradesh", "state scheme", "ఆంధ్ర"],
+    "आंध्र": ["andhra pradesh", "state scheme", "आंध्र"],
+    "central": ["central sector", "centrally sponsored", "central scheme"],
+    "state": ["state scheme", "andhra pradesh"],
+}
+
+@catalogue.on_change
+def _rebuild_spelling_dictionaries(db, version):
+    fuzzy.rebuild(db, INTENT_KEYWORDS, known_words=REFINEMENT_STOPWORDS)
+
+def detect_intents(query: str, language: str) -> Set[str]:
+    """Intent categories (INTENT_KEYWORDS keys) mentioned in a query"""
+    lang_keywords = INTENT_KEYWORDS.get(language, INTENT_KEYWORDS["en"])
+    return {kw for kw in extract_query_keywords(query, language) if kw in lang_keywords}
+
+def is_refinement(query: str, language: str, context: Dict) -> bool:
+    """Whether a follow-up narrows the previous result set rather than changing intent"""
+    markers = REFINEMENT_MARKER_PATTERNS.get(language, REFINEMENT_MARKER_PATTERNS["en"])
+    if markers.search(query.lower()):
+        return True
+    
+    # Same intent without a marker: narrowing ("scholarship" after "education")
+    intents = detect_intents(query, language)
+    return bool(intents) and intents.issubset(context.get("intents", []))
+
+def _refinement_groups(query: str, language: str) -> List[List[str]]:
+    """One list of acceptable match strings per meaningful term in the follow-up"""
+    query_lower = query.lower()
+    if language in REFINEMENT_MARKER_PATTERNS:
+        query_lower = REFINEMENT_MARKER_PATTERNS[language].sub(" ", query_lower)
+    
+    stopwords = REFINEMENT_STOPWORDS.get(language, set()) | REFINEMENT_STOPWORDS["en"]
+    lang_keywords = INTENT_KEYWORDS.get(language, INTENT_KEYWORDS["en"])
+    
+    groups = []
+    for term in re.split(r"[\s,.;:!?()\"']+", query_lower):
+        if not term or term in stopwords:
+            continue
+        alternatives = set(REFINEMENT_SYNONYMS.get(term, [term]))
+        for category, keywords in lang_keywords.items():
+            if term in keywords or term == category:
+                # Tags and categories are English, so expand to the English keywords too
+                alternatives.update(keywords)
+                alternatives.update(INTENT_KEYWORDS["en"][category])
+                alternatives.add(category)
+        groups.append(sorted(alternatives))
+    return groups
+
+def refine_candidates(query: str, language: str, candidates: List[Dict]) -> List[Dict]:
+    """Filter and re-rank the previous turn's candidates in memory"""
+    groups = _refinement_groups(query, language)
+    if not groups:
+        return list(candidates)
+    
+    refined = []
+    for scheme in candidates:
+        name = scheme["scheme_name"].lower()
+        labels = f"{scheme['beneficiary_tags']} {scheme['category']} {scheme['scheme_type']}".lower()
+        blob = " ".join([
+            name, labels, scheme["description"].lower(), scheme["eligibility"].lower(),
+            scheme["benefits"].lower()
+        ])
+        tokens = set(re.split(r"[\s,.;:!?()/\-]+", blob))
+        
+        bonus = 0
+        for alternatives in groups:
+            # Very short terms ("ap") must match a whole token
+            matched = [alt for alt in alternatives if (alt in tokens if len(alt) <= 3 else alt in blob)]
+            if not matched:
+                break
+            if any(alt in name for alt in matched):
+                bonus += 20
+            elif any(alt in labels for alt in matched):
+                bonus += 10
+        else:
+            refined.append(dict(scheme, score=(scheme.get("score") or 0) + bonus))
+    
+    refined.sort(key=lambda s: s["score"], reverse=True)
+    return refined
+
 # ============================================================================
 # SMART RESPONSE GENERATOR
 # ============================================================================
 
+NO_RESULTS_SUGGESTIONS = {
+    "en": {
+        "text": "❌ No schemes found for your query.\n\n💡 **Try these suggestions:**",
+        "options": [
+            "\n🎓 Education: 'student scholarship' or 'education'",
+            "🌾 Agriculture: 'farmer loan' or 'agriculture'",
+            "👩 Women: 'women scheme' or 'mahila'",
+            "🏥 Health: 'health insurance' or 'medical'",
+            "💰 Pension: 'pension' or 'senior citizen'",
+            "🏠 Housing: 'housing' or 'awas'",
+            "💼 Employment: 'employment' or 'job training'",
+            "\n🔍 **Or click the category buttons above!**"
+        ]
+    },
+    "te": {
+        "text": "❌ మీ ప్రశ్నకు పథకాలు కనుగొనబడలేదు.\n\n💡 **ఈ సూచనలను ప్రయత్నించండి:**",
+        "options": [
+            "\n🎓 విద్య: 'విద్యార్థి స్కాలర్‌షిప్' లేదా 'విద్య'",
+            "🌾 వ్యవసాయం: 'రైతు రుణం' లేదా 'వ్యవసాయం'",
+            "👩 మహిళలు: 'మహిళ పథకం' లేదా 'మహిళ'",
+            "🏥 ఆరోగ్యం: 'ఆరోగ్య బీమా' లేదా 'ఆరోగ్యం'",
+            "💰 పెన్షన్: 'పెన్షన్' లేదా 'వృద్ధులు'",
+            "🏠 గృహాలు: 'గృహం' లేదా 'ఇల్లు'",
+            "💼 ఉద్యోగం: 'ఉద్యోగం' లేదా 'పని శిక్షణ'",
+            "\n🔍 **లేదా పైన ఉన్న వర్గం బటన్లను క్లిక్ చేయండి!**"
+        ]
+    },
+    "hi": {
+        "text": "❌ आपकी क्वेरी के लिए कोई योजना नहीं मिली.\n\n💡 **ये सुझाव आज़माएं:**",
+        "options": [
+            "\n🎓 शिक्षा: 'छात्र छात्रवृत्ति' या 'शिक्षा'",
+            "🌾 कृषि: 'किसान ऋण' या 'कृषि'",
+            "👩 महिला: 'महिला योजना' या 'महिला'",
+            "🏥 स्वास्थ्य: 'स्वास्थ्य बीमा' या 'स्वास्थ्य'",
+            "💰 पेंशन: 'पेंशन' या 'वरिष्ठ नागरिक'",
+            "🏠 आवास: 'आवास' या 'घर'",
+            "💼 रोजगार: 'रोजगार' या 'नौकरी प्रशिक्षण'",
+            "\n🔍 **या ऊपर श्रेणी बटन पर क्लिक करें!**"
+        ]
+    }
+}
+
 def generate_response(query: str, schemes: List[Dict], language: str) -> str:
     """Generate smart responses with suggestions"""
     
     if not schemes:
         # NO RESULTS - Provide helpful suggestions
-        suggestions = {
-            "en": {
-                "text": "❌ No schemes found for your query.\n\n💡 **Try these suggestions:**",
-                "options": [
-                    "\n🎓 Education: 'student scholarship' or 'education'",
-                    "🌾 Agriculture: 'farmer loan' or 'agriculture'",
-                    "👩 Women: 'women scheme' or 'mahila'",
-                    "🏥 Health: 'health insurance' or 'medical'",
-                    "💰 Pension: 'pension' or 'senior citizen'",
-                    "🏠 Housing: 'housing' or 'awas'",
-                    "💼 Employment: 'employment' or 'job training'",
-                    "\n🔍 **Or click the category buttons above!**"
-                ]
-            },
-            "te": {
-                "text": "❌ మీ ప్రశ్నకు పథకాలు కనుగొనబడలేదు.\n\n💡 **ఈ సూచనలను ప్రయత్నించండి:**",
-                "options": [
-                    "\n🎓 విద్య: 'విద్యార్థి స్కాలర్‌షిప్' లేదా 'విద్య'",
-                    "🌾 వ్యవసాయం: 'రైతు రుణం' లేదా 'వ్యవసాయం'",
-                    "👩 మహిళలు: 'మహిళ పథకం' లేదా 'మహిళ'",
-                    "🏥 ఆరోగ్యం: 'ఆరోగ్య బీమా' లేదా 'ఆరోగ్యం'",
-                    "💰 పెన్షన్: 'పెన్షన్' లేదా 'వృద్ధులు'",
-                    "🏠 గృహాలు: 'గృహం' లేదా 'ఇల్లు'",
-                    "💼 ఉద్యోగం: 'ఉద్యోగం' లేదా 'పని శిక్షణ'",
-                    "\n🔍 **లేదా పైన ఉన్న వర్గం బటన్లను క్లిక్ చేయండి!**"
-                ]
-            },
-            "hi": {
-                "text": "❌ आपकी क्वेरी के लिए कोई योजना नहीं मिली.\n\n💡 **ये सुझाव आज़माएं:**",
-                "options": [
-                    "\n🎓 शिक्षा: 'छात्र छात्रवृत्ति' या 'शिक्षा'",
-                    "🌾 कृषि: 'किसान ऋण' या 'कृषि'",
-                    "👩 महिला: 'महिला योजना' या 'महिला'",
-                    "🏥 स्वास्थ्य: 'स्वास्थ्य बीमा' या 'स्वास्थ्य'",
-                    "💰 पेंशन: 'पेंशन' या 'वरिष्ठ नागरिक'",
-                    "🏠 आवास: 'आवास' या 'घर'",
-                    "💼 रोजगार: 'रोजगार' या 'नौकरी प्रशिक्षण'",
-                    "\n🔍 **या ऊपर श्रेणी बटन पर क्लिक करें!**"
-                ]
-            }
-        }
-        
-        sug = suggestions.get(language, suggestions["en"])
+        sug = NO_RESULTS_SUGGESTIONS.get(language, NO_RESULTS_SUGGESTIONS["en"])
         return sug["text"] + "".join(sug["options"])
     
     # FOUND SCHEMES - Format results
     top = schemes[0]
     count = len(schemes)
+    summary = top.get("snippet") or snippets.truncate(top["description"], snippets.SNIPPET_LENGTH, snippets.ELLIPSIS)
     
     if language == "en":
         resp = f"✅ Found {count} relevant scheme(s)!\n\n"
@@ -261,7 +511,7 @@ def generate_response(query: str, schemes: List[Dict], language: str) -> str:
             resp += f"📂 Category: {top['category']}\n"
         if top['scheme_type']:
             resp += f"🏷️ Type: {top['scheme_type']}\n"
-        resp += f"\n{top['description'][:160]}...\n"
+        resp += f"\n{summary}\n"
         
         if count > 1:
             resp += f"\n➕ **More schemes found:**"
@@ -277,7 +527,7 @@ def generate_response(query: str, schemes: List[Dict], language: str) -> str:
             resp += f"📂 వర్గం: {top['category']}\n"
         if top['scheme_type']:
             resp += f"🏷️ రకం: {top['scheme_type']}\n"
-        resp += f"\n{top['description'][:160]}...\n"
+        resp += f"\n{summary}\n"
         
         if count > 1:
             resp += f"\n➕ **మరిన్ని పథకాలు:**"
@@ -293,7 +543,7 @@ def generate_response(query: str, schemes: List[Dict], language: str) -> str:
             resp += f"📂 श्रेणी: {top['category']}\n"
         if top['scheme_type']:
             resp += f"🏷️ प्रकार: {top['scheme_type']}\n"
-        resp += f"\n{top['description'][:160]}...\n"
+        resp += f"\n{summary}\n"
         
         if count > 1:
             resp += f"\n➕ **और योजनाएं:**"
@@ -308,41 +558,207 @@ def generate_response(query: str, schemes: List[Dict], language: str) -> str:
 # MAIN CHAT ENDPOINT
 # ============================================================================
 
+ERROR_MESSAGES = {
+    "en": "⚠️ An error occurred. Please try again or use the category buttons above.",
+    "te": "⚠️ లోపం సంభవించింది. దయచేసి మళ్లీ ప్రయత్నించండి లేదా పైన ఉన్న వర్గం బటన్లను ఉపయోగించండి.",
+    "hi": "⚠️ एक त्रुटि हुई। कृपया पुनः प्रयास करें या ऊपर श्रेणी बटन का उपयोग करें।"
+}
+
+def _correct_message(message: str, lang: str) -> Optional[str]:
+    """Spelling-corrected message, or None when every term was already known"""
+    with metrics.phase("spelling_correction"):
+        corrected, changed = fuzzy.correct_query(message, lang)
+    return corrected if changed else None
+
+def fetch_candidates(db: Session, candidates: List[List[int]], language: str,
+                     terms: Optional[List[str]] = None) -> List[Dict]:
+    """Shaped rows for a conversation's stored [id, score] candidates, in stored order"""
+    if not candidates:
+        return []
+    source, params, (name_col, desc_col, elig_col, benefits_col, apply_col) = _text_source(language)
+    statement = text(f"""
+        SELECT id, {name_col} as scheme_name, {desc_col} as description, {elig_col} as eligibility,
+               {benefits_col} as benefits, {apply_col} as application_process,
+               scheme_type, category, official_link, beneficiary_tags, 0 as score
+        FROM {source}
+        WHERE id IN :ids
+    """).bindparams(bindparam("ids", expanding=True))
+    rows = {row.id: row for row in db.execute(statement, dict(params, ids=[scheme_id for scheme_id, _ in candidates]))}
+    return [
+        dict(shape_search_row(rows[scheme_id], language, terms), score=score)
+        for scheme_id, score in candidates if scheme_id in rows
+    ]
+
+def _load_turn(request: ChatRequest, lang: str, message: str):
+    """Load the conversation and decide whether the turn narrows its results.
+
+    Only clients that send a conversation_id get a conversation. Returns
+    (conversation_id or None, context, whether this is a follow-up).
+    """
+    conversation_id = request.conversation_id or None
+    context = get_conversation_store().get(conversation_id) if conversation_id else None
+    follow_up = bool(context) and context["language"] == lang and is_refinement(message, lang, context)
+    return conversation_id, context, follow_up
+
+def _refine_turn(db: Session, context: Dict, lang: str, message: str) -> Optional[List[Dict]]:
+    """Narrow the previous candidates, read back by primary key; None when nothing is left"""
+    with metrics.phase("refinement"):
+        candidates = fetch_candidates(db, context["candidates"], lang,
+                                      snippet_terms(message, lang, detect_intents(message, lang)))
+        return refine_candidates(message, lang, candidates) or None
+
+def _start_turn_in_own_session(request: ChatRequest, lang: str, message: str):
+    """(conversation_id or None, context, refined schemes or None) for a turn.
+
+    Uses a session of its own, like _search_in_own_session, so it can run in a thread.
+    """
+    conversation_id, context, follow_up = _load_turn(request, lang, message)
+    if not follow_up:
+        return conversation_id, context, None
+    db = ReadSessionLocal()
+    try:
+        return conversation_id, context, _refine_turn(db, context, lang, message)
+    finally:
+        db.close()
+
+def _remember_turn(conversation_id: Optional[str], lang: str, intents: Set[str], schemes: List[Dict]) -> None:
+    """Keep the turn's ranked ids and scores (not the rows) for follow-ups"""
+    if not conversation_id:
+        return
+    get_conversation_store().put(conversation_id, {
+        "language": lang,
+        "intents": sorted(intents),
+        "candidates": [[scheme["id"], scheme["score"]] for scheme in schemes],
+    })
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat(request: ChatRequest):
     """Main chatbot endpoint with enhanced search"""
     try:
         lang = request.language if request.language in ["en", "te", "hi"] else "en"
+        corrected_query = _correct_message(request.message, lang)
+        message = corrected_query or request.message
+        # The conversation store and the refinement read block, so they stay off the event loop
+        conversation_id, context, schemes = await asyncio.to_thread(_start_turn_in_own_session, request, lang, message)
+        limit = CANDIDATE_POOL if conversation_id else RESULT_LIMIT
+        
+        refined = schemes is not None
+        if refined:
+            intents = set(context["intents"]) | detect_intents(message, lang)
+        else:
+            # Search database
+            started = time.perf_counter()
+            query = query_log.normalize(message)
+            schemes = await _search_flight.do_async(
+                (catalogue.current_version(), query, lang, limit),
+                lambda: _search_in_own_session(query, lang, limit)
+            )
+            query_log.record("chat", lang, message, len(schemes), (time.perf_counter() - started) * 1000,
+                             [scheme["id"] for scheme in schemes])
+            intents = detect_intents(message, lang)
         
-        # Search database
-        schemes = search_database(request.message, lang, db, limit=10)
+        _remember_turn(conversation_id, lang, intents, schemes)
         
         # Generate smart response
-        response = generate_response(request.message, schemes, lang)
+        with metrics.phase("response_generation"):
+            response = generate_response(message, schemes[:10], lang)
         
         return ChatResponse(
             response=response,
             schemes=schemes[:3],  # Return top 3 schemes
-            language=lang
+            language=lang,
+            conversation_id=conversation_id,
+            refined=refined,
+            corrected_query=corrected_query
         )
         
-    except Exception as e:
-        print(f"❌ Chat error: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        error_messages = {
-            "en": "⚠️ An error occurred. Please try again or use the category buttons above.",
-            "te": "⚠️ లోపం సంభవించింది. దయచేసి మళ్లీ ప్రయత్నించండి లేదా పైన ఉన్న వర్గం బటన్లను ఉపయోగించండి.",
-            "hi": "⚠️ एक त्रुटि हुई। कृपया पुनः प्रयास करें या ऊपर श्रेणी बटन का उपयोग करें।"
-        }
+    except Exception:
+        logger.exception("chat_failed language=%r", request.language)
         
         return ChatResponse(
-            response=error_messages.get(request.language, error_messages["en"]),
+            response=ERROR_MESSAGES.get(request.language, ERROR_MESSAGES["en"]),
             schemes=[],
-            language=request.language
+            language=request.language,
+            conversation_id=request.conversation_id
         )
 
+# ============================================================================
+# STREAMING CHAT ENDPOINT (SERVER-SENT EVENTS)
+# ============================================================================
+
+def _sse(event_name: str, data) -> str:
+    return f"event: {event_name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_chat_events(request: ChatRequest) -> Iterator[str]:
+    """Yield SSE frames: intent, scheme (top), schemes (rest), response, done"""
+    lang = request.language if request.language in ["en", "te", "hi"] else "en"
+    db = ReadSessionLocal()
+    try:
+        corrected_query = _correct_message(request.message, lang)
+        message = corrected_query or request.message
+        conversation_id, context, follow_up = _load_turn(request, lang, message)
+        limit = CANDIDATE_POOL if conversation_id else RESULT_LIMIT
+        
+        with metrics.phase("keyword_extraction"):
+            keywords = extract_query_keywords(message, lang)
+        intents = detect_intents(message, lang)
+        
+        # Acknowledge the query before the refinement read or the search touches the catalogue
+        yield _sse("intent", {
+            "conversation_id": conversation_id,
+            "language": lang,
+            "keywords": sorted(keywords),
+            "intents": sorted(intents | set(context["intents"]) if follow_up else intents),
+            "follow_up": follow_up,
+            "corrected_query": corrected_query
+        })
+        
+        schemes = _refine_turn(db, context, lang, message) if follow_up else None
+        refined = schemes is not None
+        if refined:
+            intents |= set(context["intents"])
+            yield _sse("scheme", schemes[0])
+        else:
+            schemes = []
+            started = time.perf_counter()
+            for scheme in iter_routed_search(message, lang, db, limit, keywords):
+                schemes.append(scheme)
+                if len(schemes) == 1:
+                    yield _sse("scheme", scheme)
+            query_log.record("chat", lang, message, len(schemes), (time.perf_counter() - started) * 1000,
+                             [scheme["id"] for scheme in schemes])
+        
+        yield _sse("schemes", schemes[1:3])
+        _remember_turn(conversation_id, lang, intents, schemes)
+        
+        with metrics.phase("response_generation"):
+            response = generate_response(message, schemes[:10], lang)
+        yield _sse("response", {"response": response})
+        
+        yield _sse("done", ChatResponse(
+            response=response,
+            schemes=schemes[:3],
+            language=lang,
+            conversation_id=conversation_id,
+            refined=refined,
+            corrected_query=corrected_query
+        ).model_dump())
+        
+    except Exception:
+        logger.exception("chat_stream_failed language=%r", request.language)
+        yield _sse("error", {"response": ERROR_MESSAGES.get(lang, ERROR_MESSAGES["en"])})
+    finally:
+        db.close()
+
+@router.post("/chat/stream")
+def chat_stream(request: ChatRequest):
+    """Streaming variant of /chat for slow connections"""
+    return StreamingResponse(
+        stream_chat_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/health")
 def health():
     """Health check endpoint"""
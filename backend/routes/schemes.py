@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
-from database.connection import get_db
-from sqlalchemy import text
+from database.connection import get_read_db
+from database import translations
+from models.schemes import TRANSLATED_FIELDS, TRANSLATION_LANGUAGES
+from sqlalchemy import bindparam, text
+from services import catalogue, categories, eligibility, query_log, related
+from services.singleflight import SingleFlight
+import os
+import time
 
 router = APIRouter(prefix="/api/schemes", tags=["Schemes"])
 
+LANGUAGE_PATTERN = f"^({'|'.join(TRANSLATION_LANGUAGES)})$"
+
 # Response models
 class SchemeBasic(BaseModel):
     id: int
@@ -54,6 +62,7 @@ class EligibilityRequest(BaseModel):
     disability: Optional[bool] = None
     minority: Optional[bool] = None
     annual_income: Optional[int] = None
+    state: Optional[str] = None
 
 # Helper function to calculate relevance score
 def calculate_relevance(beneficiary_tags: str, criteria: EligibilityRequest) -> int:
@@ -107,37 +116,64 @@ def calculate_relevance(beneficiary_tags: str, criteria: EligibilityRequest) ->
     
     return score
 
+def scheme_detail(row, language: Optional[str] = None) -> dict:
+    """Full scheme dict for clients; only one language's text when language is given"""
+    scheme = {
+        "id": row.id,
+        "scheme_name_en": row.scheme_name_en,
+        "scheme_name_te": row.scheme_name_te,
+        "scheme_name_hi": row.scheme_name_hi,
+        "description_en": row.description_en,
+        "description_te": row.description_te,
+        "description_hi": row.description_hi,
+        "eligibility_en": row.eligibility_en,
+        "eligibility_te": row.eligibility_te,
+        "eligibility_hi": row.eligibility_hi,
+        "benefits_en": row.benefits_en,
+        "benefits_te": row.benefits_te,
+        "benefits_hi": row.benefits_hi,
+        "application_process_en": row.application_process_en,
+        "application_process_te": row.application_process_te,
+        "application_process_hi": row.application_process_hi,
+        "official_link": row.official_link,
+        "beneficiary_tags": row.beneficiary_tags,
+        "scheme_type": row.scheme_type,
+        "category": row.category
+    }
+
+    # Only one language's text when asked, to keep mobile payloads small
+    if language:
+        other = tuple(f"_{lang}" for lang in ("en", "te", "hi") if lang != language)
+        scheme = {k: v for k, v in scheme.items() if not k.endswith(other)}
+    return scheme
+
 # Get statistics
 @router.get("/statistics", response_model=StatisticsResponse)
-def get_statistics(db: Session = Depends(get_db)):
+def get_statistics(db: Session = Depends(get_read_db)):
     try:
+        # Served from the category index once the catalogue is loaded
+        index = categories.get_index()
+        if index is not None:
+            return StatisticsResponse(
+                total_schemes=index.total,
+                ap_schemes=index.ap_count,
+                central_schemes=index.total - index.ap_count,
+                categories=index.counts()
+            )
+        
         # Total schemes
         total = db.execute(text("SELECT COUNT(*) as count FROM schemes")).fetchone()
         
         # Check for AP schemes
         ap_count = db.execute(
-            text("""
-                SELECT COUNT(*) as count 
-                FROM schemes 
-                WHERE scheme_type ILIKE '%Andhra Pradesh%' 
-                   OR scheme_type ILIKE '%AP State%'
-                   OR scheme_type ILIKE '%State Scheme%'
-                   OR scheme_type ILIKE '%State Agency%'
-                   OR scheme_type ILIKE '%State Policy%'
-                   OR scheme_type ILIKE '%State-Implemented Scheme%'
-                   OR scheme_name_en ILIKE '%Andhra Pradesh%'
-                   OR scheme_name_en ILIKE '%AP%'
-                   OR scheme_name_en ILIKE '%State Scheme%'
-                   OR scheme_name_en ILIKE '%State Agency%'
-                   OR scheme_name_en ILIKE '%State Policy%'
-            """)
+            text(f"SELECT COUNT(*) as count FROM schemes WHERE {categories.AP_SCHEME_CONDITION}")
         ).fetchone()
         
         # Central schemes
         central_count = total.count - ap_count.count
         
         # Categories with counts
-        categories = db.execute(
+        rows = db.execute(
             text("""
                 SELECT category, COUNT(*) as count 
                 FROM schemes 
@@ -147,10 +183,15 @@ def get_statistics(db: Session = Depends(get_db)):
             """)
         ).fetchall()
         
-        categories_list = [
-            {"name": cat.category, "count": cat.count}
-            for cat in categories
-        ]
+        categories_list = []
+        for cat in rows:
+            category = categories.resolve(cat.category)
+            categories_list.append({
+                "name": cat.category,
+                "slug": category.slug if category else categories.slugify(cat.category),
+                "names": dict(category.names, en=category.name) if category else {"en": cat.category},
+                "count": cat.count
+            })
         
         return StatisticsResponse(
             total_schemes=total.count,
@@ -162,67 +203,85 @@ def get_statistics(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching statistics: {str(e)}")
 
+# Identical concurrent searches (e.g. after a scheme is announced) run once and share the result
+SEARCH_SINGLEFLIGHT_TIMEOUT = float(os.getenv("SEARCH_SINGLEFLIGHT_TIMEOUT", "5"))
+_search_flight = SingleFlight("scheme_search", SEARCH_SINGLEFLIGHT_TIMEOUT)
+
+def _search_schemes(query: str, language: str, limit: int, db: Session) -> List[dict]:
+    search_term = f"%{query}%"
+    
+    if language == "en":
+        results = db.execute(
+            text("""
+                SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
+                       category, scheme_type, official_link
+                FROM schemes
+                WHERE scheme_name_en ILIKE :search 
+                   OR description_en ILIKE :search
+                   OR beneficiary_tags ILIKE :search
+                ORDER BY id
+                LIMIT :limit
+            """),
+            {"search": search_term, "limit": limit}
+        ).fetchall()
+    elif language == "te":
+        results = db.execute(
+            text("""
+                SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
+                       category, scheme_type, official_link
+                FROM schemes
+                WHERE scheme_name_te ILIKE :search 
+                   OR description_te ILIKE :search
+                ORDER BY id
+                LIMIT :limit
+            """),
+            {"search": search_term, "limit": limit}
+        ).fetchall()
+    else:  # hindi
+        results = db.execute(
+            text("""
+                SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
+                       category, scheme_type, official_link
+                FROM schemes
+                WHERE scheme_name_hi ILIKE :search 
+                   OR description_hi ILIKE :search
+                ORDER BY id
+                LIMIT :limit
+            """),
+            {"search": search_term, "limit": limit}
+        ).fetchall()
+    
+    return [
+        {
+            "id": row.id,
+            "scheme_name_en": row.scheme_name_en,
+            "scheme_name_te": row.scheme_name_te,
+            "scheme_name_hi": row.scheme_name_hi,
+            "category": row.category,
+            "scheme_type": row.scheme_type,
+            "official_link": row.official_link
+        }
+        for row in results
+    ]
+
 # Search schemes
 @router.get("/search")
 def search_schemes(
     query: str = Query(..., min_length=2),
     language: str = Query("en", regex="^(en|te|hi)$"),
     limit: int = Query(20, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
-        search_term = f"%{query}%"
-        
-        if language == "en":
-            results = db.execute(
-                text("""
-                    SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
-                           category, scheme_type, official_link
-                    FROM schemes
-                    WHERE scheme_name_en ILIKE :search 
-                       OR description_en ILIKE :search
-                       OR beneficiary_tags ILIKE :search
-                    LIMIT :limit
-                """),
-                {"search": search_term, "limit": limit}
-            ).fetchall()
-        elif language == "te":
-            results = db.execute(
-                text("""
-                    SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
-                           category, scheme_type, official_link
-                    FROM schemes
-                    WHERE scheme_name_te ILIKE :search 
-                       OR description_te ILIKE :search
-                    LIMIT :limit
-                """),
-                {"search": search_term, "limit": limit}
-            ).fetchall()
-        else:  # hindi
-            results = db.execute(
-                text("""
-                    SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
-                           category, scheme_type, official_link
-                    FROM schemes
-                    WHERE scheme_name_hi ILIKE :search 
-                       OR description_hi ILIKE :search
-                    LIMIT :limit
-                """),
-                {"search": search_term, "limit": limit}
-            ).fetchall()
-        
-        schemes = [
-            {
-                "id": row.id,
-                "scheme_name_en": row.scheme_name_en,
-                "scheme_name_te": row.scheme_name_te,
-                "scheme_name_hi": row.scheme_name_hi,
-                "category": row.category,
-                "scheme_type": row.scheme_type,
-                "official_link": row.official_link
-            }
-            for row in results
-        ]
+        started = time.perf_counter()
+        # ILIKE ignores case, so case and spacing variants are the same search
+        normalized = query_log.normalize(query)
+        schemes = _search_flight.do(
+            (catalogue.current_version(), normalized, language, limit),
+            lambda: _search_schemes(normalized, language, limit, db)
+        )
+        query_log.record("search", language, query, len(schemes), (time.perf_counter() - started) * 1000,
+                         [scheme["id"] for scheme in schemes])
         
         return {
             "success": True,
@@ -233,52 +292,231 @@ def search_schemes(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
+# Catalogue changes since a version, for clients that keep a local copy
+@router.get("/changes")
+def get_changes(
+    since: int = Query(0, ge=0),
+    language: Optional[str] = Query(None, regex="^(en|te|hi)$"),
+    db: Session = Depends(get_read_db)
+):
+    """Schemes inserted, updated and deleted after catalogue version `since` (0 = everything)"""
+    try:
+        current = db.execute(text("SELECT COALESCE(MAX(id), 0) FROM catalogue_versions")).scalar()
+        if since == current and since > 0:
+            return Response(status_code=204, headers={"X-Catalogue-Version": str(current)})
+        if since > current:
+            raise HTTPException(status_code=410, detail="Unknown catalogue version, sync again from since=0")
+        
+        if since == 0:
+            # Full snapshot for a first sync
+            rows = db.execute(text("SELECT * FROM schemes ORDER BY id")).fetchall()
+            return {
+                "success": True,
+                "since": since,
+                "version": current,
+                "inserted": [scheme_detail(row, language) for row in rows],
+                "updated": [],
+                "deleted": []
+            }
+        
+        # Net effect per scheme: first and last change after `since`
+        changes = db.execute(
+            text("""
+                SELECT w.scheme_id, f.change_type AS first_change, l.change_type AS last_change
+                FROM (
+                    SELECT scheme_id, MIN(id) AS first_id, MAX(id) AS last_id
+                    FROM scheme_changes
+                    WHERE version > :since
+                    GROUP BY scheme_id
+                ) w
+                JOIN scheme_changes f ON f.id = w.first_id
+                JOIN scheme_changes l ON l.id = w.last_id
+            """),
+            {"since": since}
+        ).fetchall()
+        
+        inserted_ids, updated_ids, deleted_ids = [], [], []
+        for change in changes:
+            if change.last_change == "delete":
+                # Created and removed within the window: the client never saw it
+                if change.first_change != "insert":
+                    deleted_ids.append(change.scheme_id)
+            elif change.first_change == "insert":
+                inserted_ids.append(change.scheme_id)
+            else:
+                updated_ids.append(change.scheme_id)
+        
+        rows = {}
+        if inserted_ids or updated_ids:
+            rows = {
+                row.id: row
+                for row in db.execute(
+                    text("SELECT * FROM schemes WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    {"ids": inserted_ids + updated_ids}
+                )
+            }
+        
+        return {
+            "success": True,
+            "since": since,
+            "version": current,
+            "inserted": [scheme_detail(rows[i], language) for i in sorted(inserted_ids) if i in rows],
+            "updated": [scheme_detail(rows[i], language) for i in sorted(updated_ids) if i in rows],
+            "deleted": sorted(deleted_ids)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
 # Get schemes by category
 @router.get("/category/{category_name}")
 def get_by_category(
     category_name: str,
     limit: int = Query(50, le=100),
-    db: Session = Depends(get_db)
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
 ):
+    """Accepts a category slug, its stored name or a display name in any language"""
     try:
-        results = db.execute(
-            text("""
-                SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
-                       category, scheme_type, official_link
-                FROM schemes
-                WHERE category ILIKE :category
-                LIMIT :limit
-            """),
-            {"category": f"%{category_name}%", "limit": limit}
-        ).fetchall()
+        category = categories.resolve(category_name)
+        slug = category.slug if category else categories.slugify(category_name)
         
-        schemes = [
-            {
-                "id": row.id,
-                "scheme_name_en": row.scheme_name_en,
-                "scheme_name_te": row.scheme_name_te,
-                "scheme_name_hi": row.scheme_name_hi,
-                "category": row.category,
-                "scheme_type": row.scheme_type,
-                "official_link": row.official_link
-            }
-            for row in results
-        ]
+        index = categories.get_index()
+        # Known categories with no schemes are an empty page; only unknown names are 404
+        if category is None and (index is None or slug not in index.ids_by_slug):
+            raise HTTPException(status_code=404, detail="Category not found")
+        if index is not None:
+            total, schemes = index.page(slug, offset, limit)
+        else:
+            params = {"category": category.name, "limit": limit, "offset": offset}
+            total = db.execute(
+                text("SELECT COUNT(*) FROM schemes WHERE category = :category"), params
+            ).scalar()
+            results = db.execute(
+                text("""
+                    SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi, 
+                           category, scheme_type, official_link
+                    FROM schemes
+                    WHERE category = :category
+                    ORDER BY id
+                    LIMIT :limit OFFSET :offset
+                """),
+                params
+            ).fetchall()
+            schemes = [
+                {
+                    "id": row.id,
+                    "scheme_name_en": row.scheme_name_en,
+                    "scheme_name_te": row.scheme_name_te,
+                    "scheme_name_hi": row.scheme_name_hi,
+                    "category": row.category,
+                    "scheme_type": row.scheme_type,
+                    "official_link": row.official_link
+                }
+                for row in results
+            ]
         
         return {
             "success": True,
-            "category": category_name,
+            "category": category.name if category else category_name,
+            "slug": slug,
+            "total": total,
+            "offset": offset,
             "count": len(schemes),
             "schemes": schemes
         }
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+# Get related schemes
+@router.get("/{scheme_id}/related")
+def get_related_schemes(
+    scheme_id: int,
+    k: int = Query(5, ge=1, le=related.RELATED_K),
+    db: Session = Depends(get_read_db)
+):
+    """Nearest schemes by tags, category and text, from the precomputed similarity graph"""
+    try:
+        graph = related.get_graph()
+        index = categories.get_index()
+        if graph is not None and index is not None:
+            if scheme_id not in graph:
+                raise HTTPException(status_code=404, detail="Scheme not found")
+            schemes = [
+                dict(index.schemes[related_id], similarity=score)
+                for related_id, score in graph[scheme_id][:k]
+                if related_id in index.schemes
+            ]
+        else:
+            if not db.execute(text("SELECT 1 FROM schemes WHERE id = :id"), {"id": scheme_id}).fetchone():
+                raise HTTPException(status_code=404, detail="Scheme not found")
+            results = db.execute(
+                text("""
+                    SELECT s.id, s.scheme_name_en, s.scheme_name_te, s.scheme_name_hi,
+                           s.category, s.scheme_type, s.official_link, r.score
+                    FROM scheme_relations r JOIN schemes s ON s.id = r.related_id
+                    WHERE r.scheme_id = :id
+                    ORDER BY r.rank
+                    LIMIT :k
+                """),
+                {"id": scheme_id, "k": k}
+            ).fetchall()
+            schemes = [
+                {
+                    "id": row.id,
+                    "scheme_name_en": row.scheme_name_en,
+                    "scheme_name_te": row.scheme_name_te,
+                    "scheme_name_hi": row.scheme_name_hi,
+                    "category": row.category,
+                    "scheme_type": row.scheme_type,
+                    "official_link": row.official_link,
+                    "similarity": row.score
+                }
+                for row in results
+            ]
+        
+        return {
+            "success": True,
+            "scheme_id": scheme_id,
+            "count": len(schemes),
+            "related": schemes
+        }
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 # Get scheme detail by ID
 @router.get("/{scheme_id}")
-def get_scheme_detail(scheme_id: int, db: Session = Depends(get_db)):
+def get_scheme_detail(
+    scheme_id: int,
+    language: Optional[str] = Query(None, regex=LANGUAGE_PATTERN),
+    db: Session = Depends(get_read_db)
+):
     try:
+        if language and translations.enabled():
+            # Only the requested language's text is read, from its partial index
+            result = db.execute(
+                text("""
+                    SELECT id, official_link, beneficiary_tags, scheme_type, category
+                    FROM schemes WHERE id = :id
+                """),
+                {"id": scheme_id}
+            ).mappings().fetchone()
+            if not result:
+                raise HTTPException(status_code=404, detail="Scheme not found")
+            texts = translations.fetch_one(db, scheme_id, language)
+            scheme = dict(result)
+            for field in TRANSLATED_FIELDS:
+                scheme[f"{field}_{language}"] = texts.get(field, "")
+            return {"success": True, "scheme": scheme}
+        
         result = db.execute(
             text("SELECT * FROM schemes WHERE id = :id"),
             {"id": scheme_id}
@@ -287,136 +525,126 @@ def get_scheme_detail(scheme_id: int, db: Session = Depends(get_db)):
         if not result:
             raise HTTPException(status_code=404, detail="Scheme not found")
         
-        return {
-            "success": True,
-            "scheme": {
-                "id": result.id,
-                "scheme_name_en": result.scheme_name_en,
-                "scheme_name_te": result.scheme_name_te,
-                "scheme_name_hi": result.scheme_name_hi,
-                "description_en": result.description_en,
-                "description_te": result.description_te,
-                "description_hi": result.description_hi,
-                "eligibility_en": result.eligibility_en,
-                "eligibility_te": result.eligibility_te,
-                "eligibility_hi": result.eligibility_hi,
-                "benefits_en": result.benefits_en,
-                "benefits_te": result.benefits_te,
-                "benefits_hi": result.benefits_hi,
-                "application_process_en": result.application_process_en,
-                "application_process_te": result.application_process_te,
-                "application_process_hi": result.application_process_hi,
-                "official_link": result.official_link,
-                "beneficiary_tags": result.beneficiary_tags,
-                "scheme_type": result.scheme_type,
-                "category": result.category
-            }
-        }
+        # Languages without schemes columns are only served from scheme_translations
+        if language and language not in translations.WIDE_LANGUAGES:
+            language = translations.DEFAULT_LANGUAGE
+        return {"success": True, "scheme": scheme_detail(result, language)}
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-# Check eligibility
-@router.post("/check-eligibility")
-def check_eligibility(request: EligibilityRequest, db: Session = Depends(get_db)):
-    try:
-        # Build intelligent filters based on user profile
-        filters = []
-        params = {}
-        filter_index = 0
-        
-        # Gender-based filtering
-        if request.gender:
-            gender_lower = request.gender.lower()
-            filters.append(f"(beneficiary_tags ILIKE :filter{filter_index} OR beneficiary_tags ILIKE '%All%')")
-            params[f"filter{filter_index}"] = f"%{gender_lower}%"
-            filter_index += 1
-        
-        # Age-based filtering
-        if request.age:
-            age = request.age
-            # Child schemes (0-18)
-            if age < 18:
-                filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2 OR beneficiary_tags ILIKE :filter{filter_index}3)")
-                params[f"filter{filter_index}1"] = "%Child%"
-                params[f"filter{filter_index}2"] = "%Student%"
-                params[f"filter{filter_index}3"] = "%Minor%"
-                filter_index += 1
-            # Youth schemes (18-35)
-            elif age >= 18 and age <= 35:
-                filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
-                params[f"filter{filter_index}1"] = "%Youth%"
-                params[f"filter{filter_index}2"] = "%Young%"
-                filter_index += 1
-            # Senior citizen schemes (60+)
-            elif age >= 60:
-                filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
-                params[f"filter{filter_index}1"] = "%Senior%"
-                params[f"filter{filter_index}2"] = "%Elderly%"
-                filter_index += 1
-        
-        # Occupation-based filtering
-        if request.occupation and request.occupation != "Other":
-            occupation_lower = request.occupation.lower()
-            filters.append(f"beneficiary_tags ILIKE :filter{filter_index}")
-            params[f"filter{filter_index}"] = f"%{occupation_lower}%"
+def _tag_matches(request: EligibilityRequest, db: Session):
+    """Tag-based matching, used until the eligibility index has been built"""
+    # Build intelligent filters based on user profile
+    filters = []
+    params = {}
+    filter_index = 0
+
+    # Gender-based filtering
+    if request.gender:
+        gender_lower = request.gender.lower()
+        filters.append(f"(beneficiary_tags ILIKE :filter{filter_index} OR beneficiary_tags ILIKE '%All%')")
+        params[f"filter{filter_index}"] = f"%{gender_lower}%"
+        filter_index += 1
+
+    # Age-based filtering
+    if request.age:
+        age = request.age
+        # Child schemes (0-18)
+        if age < 18:
+            filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2 OR beneficiary_tags ILIKE :filter{filter_index}3)")
+            params[f"filter{filter_index}1"] = "%Child%"
+            params[f"filter{filter_index}2"] = "%Student%"
+            params[f"filter{filter_index}3"] = "%Minor%"
             filter_index += 1
-        
-        # Location-based filtering
-        if request.location:
-            location_lower = request.location.lower()
-            filters.append(f"(beneficiary_tags ILIKE :filter{filter_index} OR beneficiary_tags ILIKE '%All%')")
-            params[f"filter{filter_index}"] = f"%{location_lower}%"
+        # Youth schemes (18-35)
+        elif age >= 18 and age <= 35:
+            filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
+            params[f"filter{filter_index}1"] = "%Youth%"
+            params[f"filter{filter_index}2"] = "%Young%"
             filter_index += 1
-        
-        # Caste/Category-based filtering
-        if request.caste and request.caste != "General":
-            caste_lower = request.caste
+        # Senior citizen schemes (60+)
+        elif age >= 60:
             filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
-            params[f"filter{filter_index}1"] = f"%{caste_lower}%"
-            params[f"filter{filter_index}2"] = "%Backward%"
+            params[f"filter{filter_index}1"] = "%Senior%"
+            params[f"filter{filter_index}2"] = "%Elderly%"
             filter_index += 1
-        
-        # Disability-based filtering
-        if request.disability:
+
+    # Occupation-based filtering
+    if request.occupation and request.occupation != "Other":
+        occupation_lower = request.occupation.lower()
+        filters.append(f"beneficiary_tags ILIKE :filter{filter_index}")
+        params[f"filter{filter_index}"] = f"%{occupation_lower}%"
+        filter_index += 1
+
+    # Location-based filtering
+    if request.location:
+        location_lower = request.location.lower()
+        filters.append(f"(beneficiary_tags ILIKE :filter{filter_index} OR beneficiary_tags ILIKE '%All%')")
+        params[f"filter{filter_index}"] = f"%{location_lower}%"
+        filter_index += 1
+
+    # Caste/Category-based filtering
+    if request.caste and request.caste != "General":
+        caste_lower = request.caste
+        filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
+        params[f"filter{filter_index}1"] = f"%{caste_lower}%"
+        params[f"filter{filter_index}2"] = "%Backward%"
+        filter_index += 1
+
+    # Disability-based filtering
+    if request.disability:
+        filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
+        params[f"filter{filter_index}1"] = "%Disability%"
+        params[f"filter{filter_index}2"] = "%Divyang%"
+        filter_index += 1
+
+    # Minority-based filtering
+    if request.minority:
+        filters.append(f"beneficiary_tags ILIKE :filter{filter_index}")
+        params[f"filter{filter_index}"] = "%Minority%"
+        filter_index += 1
+
+    # Income-based filtering
+    if request.annual_income is not None:
+        if request.annual_income < 100000:
             filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
-            params[f"filter{filter_index}1"] = "%Disability%"
-            params[f"filter{filter_index}2"] = "%Divyang%"
+            params[f"filter{filter_index}1"] = "%BPL%"
+            params[f"filter{filter_index}2"] = "%Poor%"
             filter_index += 1
-        
-        # Minority-based filtering
-        if request.minority:
+        elif request.annual_income < 300000:
             filters.append(f"beneficiary_tags ILIKE :filter{filter_index}")
-            params[f"filter{filter_index}"] = "%Minority%"
+            params[f"filter{filter_index}"] = "%EWS%"
             filter_index += 1
-        
-        # Income-based filtering
-        if request.annual_income is not None:
-            if request.annual_income < 100000:
-                filters.append(f"(beneficiary_tags ILIKE :filter{filter_index}1 OR beneficiary_tags ILIKE :filter{filter_index}2)")
-                params[f"filter{filter_index}1"] = "%BPL%"
-                params[f"filter{filter_index}2"] = "%Poor%"
-                filter_index += 1
-            elif request.annual_income < 300000:
-                filters.append(f"beneficiary_tags ILIKE :filter{filter_index}")
-                params[f"filter{filter_index}"] = "%EWS%"
-                filter_index += 1
-        
-        # If no specific filters, return schemes for "All" beneficiaries
-        if not filters:
-            query = text("""
-                SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
-                       category, scheme_type, official_link, beneficiary_tags
-                FROM schemes
-                WHERE beneficiary_tags ILIKE '%All%'
-                LIMIT 50
-            """)
-            results = db.execute(query).fetchall()
-        else:
-            # Use AND logic for more precise matching
-            conditions = " AND ".join([f"({f})" for f in filters])
+
+    # If no specific filters, return schemes for "All" beneficiaries
+    if not filters:
+        query = text("""
+            SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
+                   category, scheme_type, official_link, beneficiary_tags
+            FROM schemes
+            WHERE beneficiary_tags ILIKE '%All%'
+            LIMIT 50
+        """)
+        results = db.execute(query).fetchall()
+    else:
+        # Use AND logic for more precise matching
+        conditions = " AND ".join([f"({f})" for f in filters])
+        query_str = f"""
+            SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
+                   category, scheme_type, official_link, beneficiary_tags
+            FROM schemes
+            WHERE {conditions}
+            ORDER BY id
+            LIMIT 50
+        """
+        results = db.execute(text(query_str), params).fetchall()
+
+        # If no results with AND, try OR for broader matches
+        if len(results) == 0:
+            conditions = " OR ".join([f"({f})" for f in filters])
             query_str = f"""
                 SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
                        category, scheme_type, official_link, beneficiary_tags
@@ -426,34 +654,141 @@ def check_eligibility(request: EligibilityRequest, db: Session = Depends(get_db)
                 LIMIT 50
             """
             results = db.execute(text(query_str), params).fetchall()
-            
-            # If no results with AND, try OR for broader matches
-            if len(results) == 0:
-                conditions = " OR ".join([f"({f})" for f in filters])
-                query_str = f"""
-                    SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
-                           category, scheme_type, official_link, beneficiary_tags
-                    FROM schemes
-                    WHERE {conditions}
-                    ORDER BY id
-                    LIMIT 50
-                """
-                results = db.execute(text(query_str), params).fetchall()
-        
-        schemes = [
-            {
-                "id": row.id,
-                "scheme_name_en": row.scheme_name_en,
-                "scheme_name_te": row.scheme_name_te,
-                "scheme_name_hi": row.scheme_name_hi,
-                "category": row.category,
-                "scheme_type": row.scheme_type,
-                "official_link": row.official_link,
-                "beneficiary_tags": row.beneficiary_tags,
-                "relevance_score": calculate_relevance(row.beneficiary_tags, request)
-            }
-            for row in results
-        ]
+    
+    return results
+
+# Soft boosts for schemes whose extracted targets name the user's group
+CONSTRAINT_BOOST = 40
+
+FEMALE_TAGS = ("women", "woman", "girl", "mother", "widow", "female")
+
+def _criteria_met(request: EligibilityRequest, constraints, tags_lower: str) -> List[bool]:
+    """Whether a scheme meets each criterion the profile gives.
+
+    An extracted limit or target decides a criterion when the scheme has one;
+    otherwise the tags decide it as _tag_matches would. Criteria neither can
+    judge (a man and a scheme without a gender limit) are left out.
+    """
+    met = []
+    gender = (request.gender or "").lower()
+    if gender and (constraints.gender == "female" or gender == "female" and any(word in tags_lower for word in FEMALE_TAGS)):
+        met.append(gender == "female")
+
+    if request.age is not None:
+        if constraints.min_age is not None or constraints.max_age is not None:
+            met.append(True)  # the index already dropped limits that leave the age out
+        elif request.age < 18:
+            met.append(any(word in tags_lower for word in ("child", "student", "minor")))
+        elif request.age <= 35:
+            met.append(any(word in tags_lower for word in ("youth", "young")))
+        elif request.age >= 60:
+            met.append(any(word in tags_lower for word in ("senior", "elderly")))
+
+    if request.occupation and request.occupation != "Other":
+        occupation = request.occupation.lower()
+        met.append(occupation in constraints.occupations if constraints.occupations else occupation in tags_lower)
+
+    if request.location:
+        met.append(request.location.lower() in tags_lower or "all" in tags_lower)
+
+    if request.caste and request.caste != "General":
+        categories_named = constraints.castes.intersection(eligibility.SOCIAL_CATEGORIES)
+        if categories_named:
+            met.append(True)  # the index already dropped categories that leave the caste out
+        else:
+            met.append(request.caste.lower() in tags_lower or "backward" in tags_lower)
+
+    if request.disability:
+        met.append(constraints.disability or any(word in tags_lower for word in ("disability", "disabled", "divyang")))
+
+    if request.minority:
+        met.append("minority" in constraints.castes or "minority" in tags_lower)
+
+    if request.annual_income is not None:
+        if constraints.income_ceiling is not None:
+            met.append(True)  # the index already dropped ceilings below the income
+        elif request.annual_income < 100000:
+            met.append(any(word in tags_lower for word in ("bpl", "poor")))
+        elif request.annual_income < 300000:
+            met.append("ews" in tags_lower)
+    return met
+
+def _constraint_matches(request: EligibilityRequest, index, db: Session):
+    """Schemes whose extracted limits and targets admit the profile and that meet its criteria"""
+    candidate_ids = index.match(request.age, request.annual_income, request.gender, request.state,
+                                request.occupation, request.caste)
+    if not candidate_ids:
+        return []
+    rows = db.execute(text("""
+        SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
+               category, scheme_type, official_link, beneficiary_tags
+        FROM schemes
+        WHERE id IN :ids
+        ORDER BY id
+    """).bindparams(bindparam("ids", expanding=True)), {"ids": candidate_ids}).fetchall()
+
+    # Every criterion met, else any of them, as _tag_matches falls back from AND to OR
+    met = {row.id: _criteria_met(request, index.constraints[row.id], (row.beneficiary_tags or "").lower())
+           for row in rows}
+    matched = [row for row in rows if met[row.id] and all(met[row.id])]
+    if not matched:
+        matched = [row for row in rows if any(met[row.id])]
+    if not matched and not any(met.values()):
+        # Nothing in the profile could be judged: schemes for everyone
+        matched = [row for row in rows if eligibility.open_to_all(row.beneficiary_tags)]
+
+    occupation = request.occupation.lower() if request.occupation and request.occupation != "Other" else None
+    caste = request.caste.lower() if request.caste and request.caste != "General" else None
+    
+    schemes = []
+    for row in matched:
+        constraints = index.constraints[row.id]
+        score = calculate_relevance(row.beneficiary_tags or "", request)
+        if occupation and occupation in constraints.occupations:
+            score += CONSTRAINT_BOOST
+        if caste and caste in constraints.castes:
+            score += CONSTRAINT_BOOST
+        if request.minority and "minority" in constraints.castes:
+            score += CONSTRAINT_BOOST
+        if request.disability and constraints.disability:
+            score += CONSTRAINT_BOOST
+        schemes.append({
+            "id": row.id,
+            "scheme_name_en": row.scheme_name_en,
+            "scheme_name_te": row.scheme_name_te,
+            "scheme_name_hi": row.scheme_name_hi,
+            "category": row.category,
+            "scheme_type": row.scheme_type,
+            "official_link": row.official_link,
+            "beneficiary_tags": row.beneficiary_tags,
+            "relevance_score": score,
+            "constraints": constraints.as_dict()
+        })
+    return schemes
+
+# Check eligibility
+@router.post("/check-eligibility")
+def check_eligibility(request: EligibilityRequest, db: Session = Depends(get_read_db)):
+    try:
+        index = eligibility.get_index()
+        if index is not None:
+            schemes = _constraint_matches(request, index, db)
+        else:
+            results = _tag_matches(request, db)
+            schemes = [
+                {
+                    "id": row.id,
+                    "scheme_name_en": row.scheme_name_en,
+                    "scheme_name_te": row.scheme_name_te,
+                    "scheme_name_hi": row.scheme_name_hi,
+                    "category": row.category,
+                    "scheme_type": row.scheme_type,
+                    "official_link": row.official_link,
+                    "beneficiary_tags": row.beneficiary_tags,
+                    "relevance_score": calculate_relevance(row.beneficiary_tags, request)
+                }
+                for row in results
+            ]
         
         # Sort by relevance score (highest first)
         schemes.sort(key=lambda x: x["relevance_score"], reverse=True)
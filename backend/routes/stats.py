@@ -1,14 +1,23 @@
 from fastapi import APIRouter
 from sqlalchemy import func
-from database.connection import SessionLocal
-from database.models import Scheme
+from database.connection import ReadSessionLocal
+from models.schemes import Scheme
+from services import categories
 
 router = APIRouter()
 
 @router.get("/api/chatbot/stats")
 async def get_stats():
     """Get scheme statistics"""
-    db = SessionLocal()
+    index = categories.get_index()
+    if index is not None:
+        return {
+            "total": index.total,
+            "ap": index.ap_count,
+            "central": index.total - index.ap_count
+        }
+    
+    db = ReadSessionLocal()
     try:
         total = db.query(Scheme).count()
         # You can add AP/Central filtering if you have a column for it
@@ -0,0 +1,89 @@
+"""
+Catalogue version tracking and in-memory index lifecycle.
+
+The schemes table changes only when the importer runs, so everything derived
+from it (response caches, in-memory indexes) is keyed by a catalogue version.
+Index builders register with on_change(); refresh() recomputes the version
+and re-runs every builder when it has changed. The app calls refresh() at
+startup and then periodically from a background task.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_REFRESH_SECONDS = int(os.getenv("CATALOGUE_REFRESH_SECONDS", "60"))
+
+_version: Optional[str] = None
+_listeners: List[Callable] = []
+_refresh_lock = threading.Lock()
+
+
+def current_version() -> Optional[str]:
+    """Version of the catalogue the in-memory state was built from (None until loaded)"""
+    return _version
+
+
+def compute_version(db) -> str:
+    """Latest version recorded by the importer, or a fingerprint of the schemes table"""
+    try:
+        latest = db.execute(text("SELECT MAX(id) FROM catalogue_versions")).scalar()
+    except Exception:
+        # Database predates versioned imports
+        db.rollback()
+        latest = None
+    if latest is not None:
+        return f"v{latest}"
+
+    row = db.execute(text("""
+        SELECT COUNT(*) AS total,
+               COALESCE(MAX(id), 0) AS max_id,
+               COALESCE(SUM(COALESCE(LENGTH(scheme_name_en), 0) + COALESCE(LENGTH(description_en), 0)
+                            + COALESCE(LENGTH(beneficiary_tags), 0) + COALESCE(LENGTH(category), 0)), 0) AS size
+        FROM schemes
+    """)).fetchone()
+    return f"{row.total}-{row.max_id}-{row.size}"
+
+
+def on_change(listener: Callable) -> Callable:
+    """Register listener(db, version), called whenever the catalogue version changes"""
+    _listeners.append(listener)
+    return listener
+
+
+def refresh(force: bool = False) -> bool:
+    """Recompute the version and rebuild registered indexes if it changed"""
+    global _version
+    from database.connection import ReadSessionLocal
+
+    with _refresh_lock:
+        db = ReadSessionLocal()
+        try:
+            version = compute_version(db)
+            if version == _version and not force:
+                return False
+            for listener in _listeners:
+                try:
+                    listener(db, version)
+                except Exception:
+                    logger.exception("catalogue_listener_failed listener=%s", getattr(listener, "__qualname__", listener))
+            _version = version
+            logger.info("catalogue_loaded version=%s", version)
+            return True
+        finally:
+            db.close()
+
+
+async def refresh_periodically(interval: int = CATALOGUE_REFRESH_SECONDS) -> None:
+    """Background task: pick up re-imports without a restart"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(refresh)
+        except Exception:
+            logger.exception("catalogue_refresh_failed")
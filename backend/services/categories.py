@@ -0,0 +1,192 @@
+"""
+Scheme category registry and in-memory category index.
+
+The registry is the single source of truth for categories: canonical names
+(as stored in schemes.category), URL slugs, per-language display names and
+the beneficiary-tag rules the importer uses to assign them.
+
+The index maps each category to its scheme ids in id order, together with the
+small listing row for each scheme and the catalogue-wide counts. It is rebuilt
+on catalogue change, so category pages and statistics never query Postgres.
+"""
+import logging
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+
+from services import catalogue, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Category(NamedTuple):
+    slug: str
+    name: str
+    names: Dict[str, str]
+    tag_markers: Tuple[str, ...]
+
+
+# Checked in order; the first category whose markers appear in the tags wins
+CATEGORIES: List[Category] = [
+    Category("agriculture-rural-environment", "Agriculture, Rural & Environment",
+             {"te": "వ్యవసాయం, గ్రామీణ & పర్యావరణం", "hi": "कृषि, ग्रामीण एवं पर्यावरण"},
+             ("farmer", "agriculture", "rural")),
+    Category("education-learning", "Education & Learning",
+             {"te": "విద్య & అభ్యాసం", "hi": "शिक्षा एवं अधिगम"},
+             ("education", "student", "learning")),
+    Category("women-child", "Women and Child",
+             {"te": "మహిళలు మరియు పిల్లలు", "hi": "महिला एवं बाल"},
+             ("women", "child")),
+    Category("health-wellness", "Health & Wellness",
+             {"te": "ఆరోగ్యం & శ్రేయస్సు", "hi": "स्वास्थ्य एवं कल्याण"},
+             ("health", "medical")),
+    Category("skills-employment", "Skills & Employment",
+             {"te": "నైపుణ్యాలు & ఉపాధి", "hi": "कौशल एवं रोजगार"},
+             ("employment", "skill", "job")),
+    Category("business-entrepreneurship", "Business & Entrepreneurship",
+             {"te": "వ్యాపారం & వ్యవస్థాపకత", "hi": "व्यवसाय एवं उद्यमिता"},
+             ("entrepreneur", "business")),
+    Category("housing-shelter", "Housing & Shelter",
+             {"te": "గృహనిర్మాణం & ఆశ్రయం", "hi": "आवास एवं आश्रय"},
+             ("housing", "shelter")),
+    Category("banking-financial-services-insurance", "Banking, Financial Services and Insurance",
+             {"te": "బ్యాంకింగ్, ఆర్థిక సేవలు మరియు బీమా", "hi": "बैंकिंग, वित्तीय सेवाएं और बीमा"},
+             ("bank", "insurance", "financial")),
+    Category("transport-infrastructure", "Transport & Infrastructure",
+             {"te": "రవాణా & మౌలిక సదుపాయాలు", "hi": "परिवहन एवं बुनियादी ढांचा"},
+             ("transport",)),
+    Category("social-welfare-empowerment", "Social welfare & Empowerment",
+             {"te": "సామాజిక సంక్షేమం & సాధికారత", "hi": "सामाजिक कल्याण एवं सशक्तिकरण"},
+             ()),
+]
+DEFAULT_CATEGORY = CATEGORIES[-1]
+
+# Same definition of "AP scheme" the statistics endpoint has always used; LOWER ... LIKE, not
+# ILIKE, so the export script can run it on SQLite too
+AP_SCHEME_CONDITION = """
+    LOWER(scheme_type) LIKE '%andhra pradesh%'
+    OR LOWER(scheme_type) LIKE '%ap state%'
+    OR LOWER(scheme_type) LIKE '%state scheme%'
+    OR LOWER(scheme_type) LIKE '%state agency%'
+    OR LOWER(scheme_type) LIKE '%state policy%'
+    OR LOWER(scheme_type) LIKE '%state-implemented scheme%'
+    OR LOWER(scheme_name_en) LIKE '%andhra pradesh%'
+    OR LOWER(scheme_name_en) LIKE '%ap%'
+    OR LOWER(scheme_name_en) LIKE '%state scheme%'
+    OR LOWER(scheme_name_en) LIKE '%state agency%'
+    OR LOWER(scheme_name_en) LIKE '%state policy%'
+"""
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def categorize(beneficiary_tags) -> Category:
+    """Category for a scheme's beneficiary tags"""
+    tags = str(beneficiary_tags).lower()
+    for category in CATEGORIES:
+        if any(marker in tags for marker in category.tag_markers):
+            return category
+    return DEFAULT_CATEGORY
+
+
+_by_slug: Dict[str, Category] = {category.slug: category for category in CATEGORIES}
+_by_key: Dict[str, Category] = {}
+for _category in CATEGORIES:
+    for _key in (_category.slug, _category.name, *_category.names.values()):
+        _by_key[_key.casefold()] = _category
+
+
+def resolve(value: str) -> Optional[Category]:
+    """Category for a slug, canonical name or display name in any language"""
+    value = value.strip().casefold()
+    category = _by_key.get(value) or _by_key.get(slugify(value))
+    if category is not None:
+        return category
+    # Short forms like "Health" are accepted only when they name one category unambiguously
+    matches = [c for c in CATEGORIES if c.name.casefold().startswith(value)]
+    return matches[0] if len(matches) == 1 and value else None
+
+
+# ============================================================================
+# IN-MEMORY INDEX
+# ============================================================================
+
+class CategoryIndex(NamedTuple):
+    version: str
+    schemes: Dict[int, Dict]
+    ids_by_slug: Dict[str, List[int]]
+    total: int
+    ap_count: int
+
+    def page(self, slug: str, offset: int, limit: int) -> Tuple[int, List[Dict]]:
+        ids = self.ids_by_slug.get(slug, [])
+        return len(ids), [self.schemes[i] for i in ids[offset:offset + limit]]
+
+    def counts(self) -> List[Dict]:
+        """Categories with their scheme counts, largest first"""
+        counts = [
+            (slug, self.schemes[ids[0]]["category"], len(ids))
+            for slug, ids in self.ids_by_slug.items() if ids
+        ]
+        counts.sort(key=lambda item: (-item[2], item[1]))
+        result = []
+        for slug, name, count in counts:
+            category = _by_slug.get(slug)
+            result.append({
+                "name": name,
+                "slug": slug,
+                "names": dict(category.names, en=category.name) if category else {"en": name},
+                "count": count,
+            })
+        return result
+
+
+_index: Optional[CategoryIndex] = None
+
+
+def get_index() -> Optional[CategoryIndex]:
+    """Current index, or None until the catalogue has been loaded"""
+    return _index
+
+
+@catalogue.on_change
+def rebuild(db, version: str) -> None:
+    global _index
+    started = time.perf_counter()
+    rows = db.execute(text(f"""
+        SELECT id, scheme_name_en, scheme_name_te, scheme_name_hi,
+               category, scheme_type, official_link,
+               ({AP_SCHEME_CONDITION}) AS is_ap
+        FROM schemes
+        ORDER BY id
+    """)).fetchall()
+
+    schemes = {}
+    ids_by_slug: Dict[str, List[int]] = {}
+    ap_count = 0
+    for row in rows:
+        schemes[row.id] = {
+            "id": row.id,
+            "scheme_name_en": row.scheme_name_en,
+            "scheme_name_te": row.scheme_name_te,
+            "scheme_name_hi": row.scheme_name_hi,
+            "category": row.category,
+            "scheme_type": row.scheme_type,
+            "official_link": row.official_link
+        }
+        if row.category:
+            category = resolve(row.category)
+            slug = category.slug if category else slugify(row.category)
+            ids_by_slug.setdefault(slug, []).append(row.id)
+        if row.is_ap:
+            ap_count += 1
+
+    _index = CategoryIndex(version, schemes, ids_by_slug, len(rows), ap_count)
+    metrics.log_event(
+        logger, logging.INFO, "category_index_built",
+        seconds=round(time.perf_counter() - started, 3), schemes=len(rows), categories=len(ids_by_slug),
+    )
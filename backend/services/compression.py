@@ -0,0 +1,285 @@
+"""
+Negotiated gzip/brotli response compression with a cache of pre-compressed
+catalogue responses.
+
+Scheme detail, category listings and statistics only change when the
+catalogue is re-imported, so their compressed bodies are cached per catalogue
+version, path, query string and encoding. A cache hit is answered without
+running the route or touching the database, and without compressing again.
+Other JSON responses above MIN_SIZE are compressed on the fly at a fast level.
+Compression runs in a worker thread, never on the event loop. Streaming
+responses (no Content-Length, e.g. SSE) are passed through untouched.
+
+Brotli is optional: without the `brotli` package only gzip is offered.
+"""
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from services import catalogue, metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+CACHEABLE_PATHS = (
+    re.compile(r"^/api/schemes/\d+$"),
+    re.compile(r"^/api/schemes/category/[^/]+$"),
+    re.compile(r"^/api/schemes/statistics$"),
+)
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+# Bodies compressed once per catalogue version can afford the slowest, densest settings;
+# per-request bodies use fast levels that compress nearly as well
+CACHED_LEVELS = {"br": 11, "gzip": 9}
+ON_THE_FLY_LEVELS = {
+    "br": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+    "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+}
+
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+async def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """body encoded off the event loop, at the cached or on-the-fly level"""
+    level = (CACHED_LEVELS if cached else ON_THE_FLY_LEVELS)[encoding]
+    return await asyncio.to_thread(_compress, body, encoding, level)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    offered = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        name = pieces[0].strip().lower()
+        q = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            offered[name] = q
+    for encoding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressedResponseCache:
+    """LRU of identity + encoded bodies, bounded by total bytes"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: Dict) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old["bytes"]
+            self._entries[key] = entry
+            self.size += entry["bytes"]
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted["bytes"]
+
+    def add_encoding(self, key: tuple, entry: Dict, encoding: str, body: bytes) -> None:
+        with self._lock:
+            entry["encoded"][encoding] = body
+            entry["bytes"] += len(body)
+            if key in self._entries:
+                self.size += len(body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+response_cache = CompressedResponseCache()
+
+
+@catalogue.on_change
+def _drop_stale_responses(db, version):
+    response_cache.clear()
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "POST"):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(_header(scope, b"accept-encoding"))
+        version = catalogue.current_version()
+        cache_key = None
+        if scope["method"] == "GET" and version and any(p.match(scope["path"]) for p in CACHEABLE_PATHS):
+            cache_key = (version, scope["path"], scope.get("query_string", b""))
+
+        if cache_key is not None:
+            entry = response_cache.get(cache_key)
+            if entry is not None:
+                metrics.cache_hit("compressed_responses")
+                await self._send_cached(scope, send, cache_key, entry, encoding)
+                return
+            metrics.cache_miss("compressed_responses")
+
+        if encoding is None and cache_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self._buffer_and_compress(scope, receive, send, encoding, cache_key)
+
+    async def _buffer_and_compress(self, scope, receive, send, encoding, cache_key):
+        start_message = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", ()))
+                content_type = headers.get(b"content-type", b"")
+                if (
+                    b"content-length" not in headers
+                    or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    # Streaming or already-encoded responses are sent as they are
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._finish(scope, send, start_message, b"".join(chunks), encoding, cache_key)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _finish(self, scope, send, start_message, body, encoding, cache_key):
+        status = start_message["status"]
+        headers = [(k, v) for k, v in start_message.get("headers", ()) if k != b"content-length"]
+
+        if cache_key is not None and status == 200:
+            entry = {
+                "status": status,
+                "headers": headers,
+                "identity": body,
+                "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+                "encoded": {},
+                "bytes": len(body),
+            }
+            response_cache.put(cache_key, entry)
+            await self._send_cached(scope, send, cache_key, entry, encoding)
+            return
+
+        if encoding is not None and len(body) >= MIN_SIZE:
+            body = await compress(body, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _send_cached(self, scope, send, cache_key, entry, encoding):
+        headers = list(entry["headers"]) + [
+            (b"etag", entry["etag"].encode()),
+            (b"vary", b"Accept-Encoding"),
+            (b"cache-control", b"public, max-age=300"),
+        ]
+
+        if _header(scope, b"if-none-match") == entry["etag"]:
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry["identity"]
+        if encoding is not None and len(body) >= MIN_SIZE:
+            encoded = entry["encoded"].get(encoding)
+            if encoded is None:
+                encoded = await compress(body, encoding, cached=True)
+                response_cache.add_encoding(cache_key, entry, encoding, encoded)
+            body = encoded
+            headers.append((b"content-encoding", encoding.encode()))
+
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": entry["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def warm(asgi_app, paths: List[str], progress=None) -> int:
+    """Fill the response cache by sending GETs for paths straight to asgi_app
+
+    Pass the app below the rate limiter so warming is not throttled. Each
+    path is requested once per offered encoding; returns the number of paths
+    cached. progress, if given, is awaited with the fraction done.
+    """
+    middleware = CompressionMiddleware(asgi_app)
+    encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+    cached = 0
+    for i, path in enumerate(paths):
+        path, _, query = path.partition("?")
+        status = None
+        for encoding in encodings:
+            scope = {
+                "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+                "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+                "headers": [(b"accept-encoding", encoding.encode()), (b"host", b"localhost")],
+                "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+            }
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+
+            await middleware(scope, receive, send)
+        if status == 200:
+            cached += 1
+        if progress is not None and ((i + 1) % 10 == 0 or i + 1 == len(paths)):
+            await progress((i + 1) / len(paths))
+    return cached
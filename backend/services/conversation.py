@@ -0,0 +1,82 @@
+"""
+Conversation-scoped chat context.
+
+Each conversation keeps the language, intents and ranked candidate ids (with
+their scores) of its last search, so a follow-up like "only for women" reads
+those schemes back by primary key and filters them instead of searching the
+catalogue again. Contexts hold ids, not rows, so each is a few hundred bytes.
+A conversation exists only when the client sends a conversation_id.
+
+The default store is a bounded, TTL-evicted in-process map. Deployments with
+several workers can plug in a shared backend with set_conversation_store();
+contexts are plain JSON-serializable dicts for that reason.
+"""
+import abc
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from services import metrics
+
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "1800"))
+CONVERSATION_MAX = int(os.getenv("CONVERSATION_MAX", "10000"))
+
+
+class ConversationStore(abc.ABC):
+    """Storage interface for conversation contexts"""
+
+    @abc.abstractmethod
+    def get(self, conversation_id: str) -> Optional[Dict]:
+        """The context, or None if unknown or expired"""
+
+    @abc.abstractmethod
+    def put(self, conversation_id: str, context: Dict) -> None:
+        """Store the context, replacing any earlier one"""
+
+
+class InMemoryConversationStore(ConversationStore):
+    """LRU map whose entries expire `ttl` seconds after their last write"""
+
+    def __init__(self, ttl: int = CONVERSATION_TTL, max_entries: int = CONVERSATION_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[conversation_id]
+                metrics.cache_miss("conversation")
+                return None
+            self._entries.move_to_end(conversation_id)
+        metrics.cache_hit("conversation")
+        return entry[1]
+
+    def put(self, conversation_id: str, context: Dict) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[conversation_id] = (now + self.ttl, context)
+            self._entries.move_to_end(conversation_id)
+            # Expired entries sit at the front once they stop being touched
+            while self._entries and (
+                len(self._entries) > self.max_entries or next(iter(self._entries.values()))[0] < now
+            ):
+                self._entries.popitem(last=False)
+
+
+_store: ConversationStore = InMemoryConversationStore()
+
+
+def get_conversation_store() -> ConversationStore:
+    return _store
+
+
+def set_conversation_store(store: ConversationStore) -> None:
+    global _store
+    _store = store
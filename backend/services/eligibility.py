@@ -0,0 +1,371 @@
+"""
+Structured eligibility constraints and an in-memory interval index over them.
+
+extract_constraints() turns a scheme's eligibility prose, tags and type into
+typed limits (age range, income ceiling, gender, state) plus soft targets
+(castes, occupations, disability). The importer stores them in
+scheme_constraints.
+
+EligibilityIndex answers "which schemes admit this age and this income" with
+binary searches over sorted bounds, and drops schemes whose occupation or caste
+targets leave the profile out. Each sorted position has a precomputed
+bitmask (Python int, one bit per scheme) of the schemes on one side of that
+bound. A query is a few bisects and integer ANDs, instead of a scan over every
+scheme's tags.
+"""
+import bisect
+import logging
+import re
+import time
+from itertools import compress
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import text
+
+from services import catalogue, metrics
+
+logger = logging.getLogger(__name__)
+
+UNBOUNDED = float("inf")
+
+# bin() digits to 0/1 bytes, the selectors compress() takes
+_BIT_SELECTORS = bytes.maketrans(b"01", b"\x00\x01")
+
+# ============================================================================
+# EXTRACTION
+# ============================================================================
+
+_AGE_RANGE = re.compile(r"(?:aged?\s*(?:group\s*of\s*)?)?(\d{1,2})\s*(?:-|–|to)\s*(\d{1,2})\s*(?:years|yrs)", re.I)
+_AGED_RANGE = re.compile(r"aged\s*(\d{1,2})\s*(?:-|–|to)\s*(\d{1,2})", re.I)
+# "N or more" is an age only with years/aged/age around it: "2 children or more" is not
+_AGE_MIN = (
+    re.compile(r"(?:(?:aged?|age\s*of)\s*(\d{1,2})\s*(?:years|yrs)?|(\d{1,2})\s*(?:years|yrs)(?:\s*of age)?)"
+               r"\s*(?:or|and)\s*(?:older|above|more)", re.I),
+    re.compile(r"(?:aged\s*)?(?:above|over|at least|minimum age of|not less than)\s*(\d{1,2})\s*(?:years|yrs)", re.I),
+    re.compile(r"\((\d{1,2})\+\)"),
+)
+# "below 25 years" admits 24-year-olds, not 25-year-olds: group 1 is exclusive, group 2 inclusive
+_AGE_MAX = (
+    re.compile(r"(?:(?:below|under|less than)\s*(\d{1,2})|(?:not more than|maximum age of)\s*(\d{1,2}))\s*(?:years|yrs)", re.I),
+    re.compile(r"up\s*to\s*()(\d{1,2})\s*(?:years|yrs)\s*of\s*age", re.I),
+)
+_INCOME = re.compile(
+    r"(monthly\s+)?(?:income|wages?|salary)[^.:;\n]{0,80}?(?:below|less than|up\s*to|upto|not exceeding|under|within|ceiling[^₹]{0,40}?)"
+    r"\s*(?:rs\.?|₹|inr)\s*([\d,]+(?:\.\d+)?)\s*(lakhs?|lacs?|crores?)?\s*(/\s*month|per month|a month)?",
+    re.I,
+)
+_INCOME_UNITS = {"lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000, "crore": 10_000_000, "crores": 10_000_000}
+
+_FEMALE_SUBJECT = re.compile(r"\b(women|woman|girls?|mothers?|widows?|female|pregnant)\b", re.I)
+_MIXED_SUBJECT = re.compile(
+    r"\b(men|male|boys|persons?|individuals?|citizens?|farmers?|households?|famil(y|ies)|children|youth|"
+    r"students?|entrepreneurs?|artisans?|workers?|any)\b",
+    re.I,
+)
+
+CASTE_TARGETS = {
+    "sc": re.compile(r"\bSCs?\b|scheduled castes?", re.I),
+    "st": re.compile(r"\bSTs?\b|scheduled tribes?", re.I),
+    "obc": re.compile(r"\bOBCs?\b|other backward", re.I),
+    "bc": re.compile(r"\bBCs?\b|backward class", re.I),
+    "ews": re.compile(r"\bEWS\b|economically weaker", re.I),
+    "minority": re.compile(r"minorit", re.I),
+}
+
+# Keys match the occupation choices offered by the eligibility form
+OCCUPATION_TARGETS = {
+    "farmer": ("farmer", "agricultur", "landholder", "cultivat", "kisan"),
+    "student": ("student", "scholar", "school", "pupil"),
+    "self employed": ("self-employed", "self employed", "entrepreneur", "msme", "vendor", "business", "artisan"),
+    "employed": ("employee", "worker", "workforce", "account holder"),
+    "unemployed": ("unemployed", "job seeker", "skill", "youth"),
+}
+
+_DISABILITY = re.compile(r"disabilit|disabled|divyang|differently abled", re.I)
+
+# Social categories; a scheme naming some of them is closed to the others
+SOCIAL_CATEGORIES = ("sc", "st", "obc", "bc", "ews")
+# OBC and BC are the same groups under central and AP naming
+_SAME_CATEGORY = {"obc": ("obc", "bc"), "bc": ("bc", "obc")}
+
+_OPEN_TAGS = re.compile(r"\bgeneral (population|public)\b|\ball\b(?! ration)", re.I)
+# Means-tested tags; such schemes get LOW_INCOME_CEILING when the prose states none
+_LOW_INCOME_TAGS = re.compile(r"\b(BPL|poor|ration card|AAY|PHH|EWS|LIG)\b", re.I)
+# Top of the income band the tag matcher treats as EWS
+LOW_INCOME_CEILING = 300_000
+
+
+class Constraints(NamedTuple):
+    min_age: Optional[int]
+    max_age: Optional[int]
+    income_ceiling: Optional[int]
+    gender: Optional[str]
+    state: Optional[str]
+    castes: Set[str]
+    occupations: Set[str]
+    disability: bool
+
+    def as_dict(self) -> Dict:
+        return {
+            "min_age": self.min_age,
+            "max_age": self.max_age,
+            "income_ceiling": self.income_ceiling,
+            "gender": self.gender,
+            "state": self.state,
+            "castes": sorted(self.castes),
+            "occupations": sorted(self.occupations),
+            "disability": self.disability,
+        }
+
+
+def _age_bounds(eligibility: str):
+    """Envelope of every age range mentioned: schemes with sub-schemes keep the widest"""
+    lows: List[Optional[int]] = []
+    highs: List[Optional[int]] = []
+    for pattern in (_AGE_RANGE, _AGED_RANGE):
+        for match in pattern.finditer(eligibility):
+            low, high = int(match.group(1)), int(match.group(2))
+            if low < high <= 120:
+                lows.append(low)
+                highs.append(high)
+    for pattern in _AGE_MIN:
+        for match in pattern.finditer(eligibility):
+            lows.append(int(next(group for group in match.groups() if group)))
+            highs.append(None)
+    for pattern in _AGE_MAX:
+        for match in pattern.finditer(eligibility):
+            exclusive, inclusive = match.groups()
+            lows.append(None)
+            highs.append(int(exclusive) - 1 if exclusive else int(inclusive))
+
+    if not lows:
+        return None, None
+    min_age = None if None in lows else min(lows)
+    max_age = None if None in highs else max(highs)
+    if min_age == 0:
+        min_age = None
+    return min_age, max_age
+
+
+def open_to_all(tags: str) -> bool:
+    """Whether the beneficiary tags name everyone rather than particular groups"""
+    return bool(_OPEN_TAGS.search(tags or ""))
+
+
+def _income_ceiling(eligibility: str) -> Optional[int]:
+    ceilings = []
+    for match in _INCOME.finditer(eligibility):
+        amount = float(match.group(2).replace(",", ""))
+        unit = (match.group(3) or "").lower()
+        amount *= _INCOME_UNITS.get(unit, 1)
+        if match.group(1) or match.group(4):
+            amount *= 12
+        ceilings.append(int(amount))
+    return max(ceilings) if ceilings else None
+
+
+def extract_constraints(eligibility: str, beneficiary_tags: str = "", scheme_type: str = "",
+                        scheme_name: str = "") -> Constraints:
+    eligibility = eligibility or ""
+    tags = beneficiary_tags or ""
+    scheme_type = scheme_type or ""
+
+    min_age, max_age = _age_bounds(eligibility)
+
+    # Women-only when the eligibility opens with a female subject and nobody else
+    opening = " ".join(eligibility.split()[:8])
+    gender = "female" if _FEMALE_SUBJECT.search(opening) and not _MIXED_SUBJECT.search(opening) else None
+
+    type_lower = scheme_type.lower()
+    state = None
+    if "central" not in type_lower and (
+        "state" in type_lower
+        or "andhra pradesh" in (scheme_name or "").lower()
+        or "residents of andhra pradesh" in eligibility.lower()
+    ):
+        state = "andhra pradesh"
+
+    income_ceiling = _income_ceiling(eligibility)
+    if income_ceiling is None and _LOW_INCOME_TAGS.search(tags) and not open_to_all(tags):
+        income_ceiling = LOW_INCOME_CEILING
+
+    # Targets narrow who may apply, so a scheme open to everyone has none
+    castes: Set[str] = set()
+    occupations: Set[str] = set()
+    if not open_to_all(tags):
+        haystack = f"{tags} {eligibility}"
+        castes = {caste for caste, pattern in CASTE_TARGETS.items() if pattern.search(haystack)}
+        tags_lower = tags.lower()
+        occupations = {
+            occupation for occupation, markers in OCCUPATION_TARGETS.items()
+            if any(marker in tags_lower for marker in markers)
+        }
+
+    return Constraints(
+        min_age, max_age, income_ceiling, gender, state, castes, occupations,
+        bool(_DISABILITY.search(tags)),
+    )
+
+
+def constraint_rows(schemes: Iterable) -> List[Dict]:
+    """scheme_constraints rows for scheme rows (id, eligibility_en, beneficiary_tags, scheme_type, scheme_name_en)"""
+    rows = []
+    for scheme in schemes:
+        c = extract_constraints(scheme["eligibility_en"], scheme["beneficiary_tags"],
+                                scheme["scheme_type"], scheme["scheme_name_en"])
+        rows.append({
+            "scheme_id": scheme["id"],
+            "min_age": c.min_age,
+            "max_age": c.max_age,
+            "income_ceiling": c.income_ceiling,
+            "gender": c.gender,
+            "state": c.state,
+            "castes": ",".join(sorted(c.castes)),
+            "occupations": ",".join(sorted(c.occupations)),
+            "disability": c.disability,
+        })
+    return rows
+
+
+# ============================================================================
+# INTERVAL INDEX
+# ============================================================================
+
+class _BoundIndex:
+    """Sorted bounds with cumulative bitmasks for one side of an interval"""
+
+    def __init__(self, bounds: List[tuple]):
+        # bounds: (value, bit) sorted by value
+        self.values = [value for value, _ in bounds]
+        self.prefix = [0]
+        for _, bit in bounds:
+            self.prefix.append(self.prefix[-1] | bit)
+        self.full = self.prefix[-1]
+
+    def at_most(self, x) -> int:
+        """Bits of every entry whose bound is <= x"""
+        return self.prefix[bisect.bisect_right(self.values, x)]
+
+    def at_least(self, x) -> int:
+        """Bits of every entry whose bound is >= x"""
+        return self.full & ~self.prefix[bisect.bisect_left(self.values, x)]
+
+
+class EligibilityIndex:
+    def __init__(self, constraints: Dict[int, Constraints]):
+        self.ids = sorted(constraints)
+        self.constraints = constraints
+        bits = {scheme_id: 1 << i for i, scheme_id in enumerate(self.ids)}
+        self.all = (1 << len(self.ids)) - 1
+
+        self.min_age = _BoundIndex(sorted((c.min_age or 0, bits[i]) for i, c in constraints.items()))
+        self.max_age = _BoundIndex(sorted(
+            (UNBOUNDED if c.max_age is None else c.max_age, bits[i]) for i, c in constraints.items()
+        ))
+        self.income = _BoundIndex(sorted(
+            (UNBOUNDED if c.income_ceiling is None else c.income_ceiling, bits[i]) for i, c in constraints.items()
+        ))
+        self.female_only = sum(bits[i] for i, c in constraints.items() if c.gender == "female")
+        self.state_only: Dict[str, int] = {}
+        # Per occupation or category, the schemes that name it among their targets
+        self.occupation_targets: Dict[str, int] = {}
+        self.category_targets: Dict[str, int] = {}
+        for i, c in constraints.items():
+            if c.state:
+                self.state_only[c.state] = self.state_only.get(c.state, 0) | bits[i]
+            for occupation in c.occupations:
+                self.occupation_targets[occupation] = self.occupation_targets.get(occupation, 0) | bits[i]
+            for category in c.castes.intersection(SOCIAL_CATEGORIES):
+                self.category_targets[category] = self.category_targets.get(category, 0) | bits[i]
+        self.occupation_targeted = sum(bits[i] for i, c in constraints.items() if c.occupations)
+        self.category_targeted = sum(bits[i] for i, c in constraints.items() if c.castes.intersection(SOCIAL_CATEGORIES))
+
+        # Ages at which some scheme starts or stops admitting a person
+        thresholds = set()
+        for c in constraints.values():
+            if c.min_age is not None:
+                thresholds.add(c.min_age)
+            if c.max_age is not None:
+                thresholds.add(c.max_age + 1)
+        self.age_thresholds: List[int] = sorted(thresholds)
+
+    def match(self, age: Optional[int] = None, annual_income: Optional[int] = None,
+              gender: Optional[str] = None, state: Optional[str] = None,
+              occupation: Optional[str] = None, caste: Optional[str] = None) -> List[int]:
+        """Ids of schemes whose limits and targets admit the profile, in id order"""
+        mask = self.all
+        if age is not None:
+            mask &= self.min_age.at_most(age) & self.max_age.at_least(age)
+        if annual_income is not None:
+            mask &= self.income.at_least(annual_income)
+        if gender and gender.lower() in ("male", "man", "men"):
+            mask &= ~self.female_only
+        if state:
+            for scheme_state, state_mask in self.state_only.items():
+                if scheme_state != state.lower():
+                    mask &= ~state_mask
+        # Occupations and categories outside the extracted vocabulary rule nothing out
+        occupation = (occupation or "").lower()
+        if occupation in OCCUPATION_TARGETS:
+            mask &= ~self.occupation_targeted | self.occupation_targets.get(occupation, 0)
+        caste = (caste or "").lower()
+        if caste in SOCIAL_CATEGORIES:
+            admitted = 0
+            for category in _SAME_CATEGORY.get(caste, (caste,)):
+                admitted |= self.category_targets.get(category, 0)
+            mask &= ~self.category_targeted | admitted
+        # Least significant bit first; shifting the mask once per scheme would be quadratic
+        return list(compress(self.ids, bin(mask)[:1:-1].encode().translate(_BIT_SELECTORS)))
+
+
+_index: Optional[EligibilityIndex] = None
+
+
+def get_index() -> Optional[EligibilityIndex]:
+    return _index
+
+
+def _parse_row(row) -> Constraints:
+    return Constraints(
+        row.min_age, row.max_age, row.income_ceiling, row.gender, row.state,
+        set(filter(None, (row.castes or "").split(","))),
+        set(filter(None, (row.occupations or "").split(","))),
+        bool(row.disability),
+    )
+
+
+@catalogue.on_change
+def rebuild(db, version: str) -> None:
+    global _index
+    started = time.perf_counter()
+    try:
+        rows = db.execute(text("""
+            SELECT s.id, c.scheme_id, c.min_age, c.max_age, c.income_ceiling, c.gender, c.state,
+                   c.castes, c.occupations, c.disability,
+                   s.eligibility_en, s.beneficiary_tags, s.scheme_type, s.scheme_name_en
+            FROM schemes s LEFT JOIN scheme_constraints c ON c.scheme_id = s.id
+        """)).fetchall()
+    except Exception:
+        # Database imported before constraints were extracted
+        db.rollback()
+        rows = db.execute(text("""
+            SELECT id, NULL AS scheme_id, eligibility_en, beneficiary_tags, scheme_type, scheme_name_en
+            FROM schemes
+        """)).fetchall()
+
+    constraints = {}
+    for row in rows:
+        if row.scheme_id is not None:
+            constraints[row.id] = _parse_row(row)
+        else:
+            constraints[row.id] = extract_constraints(
+                row.eligibility_en, row.beneficiary_tags, row.scheme_type, row.scheme_name_en
+            )
+
+    _index = EligibilityIndex(constraints)
+    metrics.log_event(
+        logger, logging.INFO, "eligibility_index_built",
+        seconds=round(time.perf_counter() - started, 3), schemes=len(constraints),
+        with_age=sum(1 for c in constraints.values() if c.min_age is not None or c.max_age is not None),
+        with_income=sum(1 for c in constraints.values() if c.income_ceiling is not None),
+    )
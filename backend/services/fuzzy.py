@@ -0,0 +1,213 @@
+"""
+Typo-tolerant query correction with a symmetric-delete (SymSpell) dictionary.
+
+For every vocabulary word we precompute the strings reachable by deleting up
+to MAX_EDIT_DISTANCE characters from its prefix. At query time the deletes of
+the query term, up to the distance allowed for its length, are looked up in
+that map, so finding candidate corrections is dict lookups instead of a scan
+over the vocabulary; only candidates of a close enough length and frequency get
+a real edit-distance check.
+
+One dictionary per language is built from the scheme text and the chatbot's
+intent keywords, and rebuilt whenever the catalogue version changes. The scheme
+text is not a general-language vocabulary, so a term is only corrected into an
+intent keyword or a word frequent in the catalogue; everyday words missing from
+it ("looking", "abroad") are left alone rather than snapped to a rare neighbour.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+MIN_TERM_LENGTH = 4
+
+# Letters plus the Devanagari/Telugu combining marks and zero-width joiners that \w splits on
+TOKEN_RE = re.compile(r"[\w\u0900-\u097F\u0C00-\u0C7F\u200C\u200D]+")
+
+# Intent keywords outrank words that only occur in scheme text
+KEYWORD_WEIGHT = 1000
+
+# Fewest occurrences a word needs to be offered as a correction; rarer words
+# and known conversational words are accepted as typed but never suggested
+MIN_CORRECTION_COUNT = 5
+
+
+def tokenize(value: str) -> List[str]:
+    return TOKEN_RE.findall(value.lower())
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or max_distance + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # A typo leaves most of the word intact; only the differing middle needs the table
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return len(a) + len(b)
+    # Cells further than max_distance from the diagonal are over it, so only the band is filled
+    exceeded = max_distance + 1
+    previous2: List[int] = []
+    previous = [min(j, exceeded) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [exceeded] * (len(b) + 1)
+        current[0] = row_min = min(i, exceeded)
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return exceeded
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SymSpell:
+    """Symmetric-delete spelling corrector over a word -> frequency vocabulary"""
+
+    def __init__(self, max_edit_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words: Dict[str, int] = {}
+        self.deletes: Dict[str, List[str]] = {}
+
+    def add_word(self, word: str, count: int = 1) -> None:
+        if word in self.words:
+            self.words[word] += count
+            return
+        self.words[word] = count
+        for delete in self._deletes(word):
+            self.deletes.setdefault(delete, []).append(word)
+
+    def _deletes(self, word: str, max_distance: Optional[int] = None) -> set:
+        word = word[:self.prefix_length]
+        result = {word}
+        frontier = {word}
+        for _ in range(self.max_edit_distance if max_distance is None else max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+            result |= frontier
+        return result
+
+    def lookup(self, term: str, min_count: int = 0) -> Optional[str]:
+        """Closest word to term seen at least min_count times (most frequent on ties), or None"""
+        if term in self.words:
+            return term
+        # Short words sit one edit away from other real words ("need" -> "seed"), so leave them alone
+        max_distance = min(self.max_edit_distance, 0 if len(term) < 5 else 1 if len(term) < 9 else 2)
+        if max_distance == 0:
+            return None
+
+        best, best_distance, best_count = None, max_distance + 1, 0
+        seen = set()
+        for delete in self._deletes(term, max_distance):
+            for candidate in self.deletes.get(delete, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                count = self.words[candidate]
+                if count < min_count or abs(len(candidate) - len(term)) > max_distance:
+                    continue
+                distance = edit_distance(term, candidate, max_distance)
+                if distance < best_distance or (distance == best_distance and count > best_count):
+                    best, best_distance, best_count = candidate, distance, count
+        return best if best_distance <= max_distance else None
+
+
+# ============================================================================
+# PER-LANGUAGE DICTIONARIES
+# ============================================================================
+
+_dictionaries: Dict[str, SymSpell] = {}
+
+
+def build_dictionary(texts: Iterable[str], keywords: Iterable[str], known_words: Iterable[str] = ()) -> SymSpell:
+    counts = Counter()
+    for value in texts:
+        if value:
+            counts.update(tokenize(value))
+    for keyword in keywords:
+        for token in tokenize(keyword):
+            counts[token] += KEYWORD_WEIGHT
+    # Present so they are never corrected, but add no weight as suggestions
+    for word in known_words:
+        for token in tokenize(word):
+            counts[token] += 0
+
+    speller = SymSpell()
+    for word, count in counts.items():
+        if not word.isdigit():
+            speller.add_word(word, count)
+    return speller
+
+
+def rebuild(db, intent_keywords: Dict[str, Dict[str, List[str]]],
+            known_words: Optional[Dict[str, Iterable[str]]] = None) -> None:
+    """Rebuild every language's dictionary from the schemes table.
+
+    known_words are accepted as typed so conversational words are never
+    "corrected", but are not suggested as corrections themselves.
+    """
+    global _dictionaries
+    started = time.perf_counter()
+    built = {}
+    for language, categories in intent_keywords.items():
+        rows = db.execute(text(f"""
+            SELECT scheme_name_{language}, description_{language}, eligibility_{language},
+                   benefits_{language}, application_process_{language}, beneficiary_tags, category
+            FROM schemes
+        """)).fetchall()
+        keywords = list(categories) + [kw for kws in categories.values() for kw in kws]
+        built[language] = build_dictionary((value for row in rows for value in row), keywords,
+                                           (known_words or {}).get(language, ()))
+
+    # Swapped in whole so lookups never see a half-built set
+    _dictionaries = built
+    metrics.log_event(
+        logger, logging.INFO, "fuzzy_dictionary_built",
+        seconds=round(time.perf_counter() - started, 3),
+        words={lang: len(d.words) for lang, d in built.items()},
+    )
+
+
+def correct_query(query: str, language: str) -> Tuple[str, bool]:
+    """Return (query with misspelled terms replaced, whether anything changed)"""
+    speller = _dictionaries.get(language)
+    if speller is None:
+        return query, False
+
+    pieces = []
+    last = 0
+    changed = False
+    for match in TOKEN_RE.finditer(query):
+        term = match.group().lower()
+        if len(term) < MIN_TERM_LENGTH or term.isdigit():
+            continue
+        correction = speller.lookup(term, MIN_CORRECTION_COUNT)
+        if correction is not None and correction != term:
+            pieces.append(query[last:match.start()])
+            pieces.append(correction)
+            last = match.end()
+            changed = True
+
+    if not changed:
+        return query, False
+    pieces.append(query[last:])
+    return "".join(pieces), True
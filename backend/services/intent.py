@@ -0,0 +1,205 @@
+"""
+Chat query routing with a small hashed character n-gram classifier.
+
+A message becomes a sparse vector: the character 2- to 4-grams of each
+space-padded token, hashed into HASH_DIM buckets and L2-normalised. N-grams
+need no tokeniser or vocabulary and work the same for English, Telugu and
+Hindi, including inflected and misspelt words. Two multinomial logistic
+regression heads share the vector, one over the chatbot intents and one
+over the catalogue categories, so prediction is a gather of a few dozen
+weight rows and a softmax.
+
+The weights are trained offline by train_intent.py and shipped as a NumPy
+array file (INTENT_MODEL_PATH). Without the file routing is off and chat
+search behaves as before.
+"""
+import logging
+import math
+import os
+import unicodedata
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from services.fuzzy import TOKEN_RE
+
+logger = logging.getLogger(__name__)
+
+INTENT_MODEL_PATH = os.getenv(
+    "INTENT_MODEL_PATH", os.path.join(os.path.dirname(__file__), "intent_model.npz")
+)
+INTENT_ROUTING_ENABLED = os.getenv("INTENT_ROUTING_ENABLED", "1") == "1"
+
+# Below this top probability a head's prediction is ignored
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.6"))
+CATEGORY_MIN_CONFIDENCE = float(os.getenv("CATEGORY_MIN_CONFIDENCE", "0.6"))
+
+# Categories are added in order of probability until they cover this much of it
+CATEGORY_COVERAGE = 0.9
+MAX_CATEGORIES = 3
+
+HASH_DIM = 2 ** 13
+NGRAM_RANGE = (2, 4)
+
+# Intent label for messages that name no intent (greetings, scheme names, ...)
+NO_INTENT = "none"
+
+
+def features(message: str, dim: int = HASH_DIM, ngram_range: Tuple[int, int] = NGRAM_RANGE) -> Tuple[np.ndarray, np.ndarray]:
+    """(bucket indices, L2-normalised weights) of a message's hashed character n-grams"""
+    counts: Dict[int, int] = {}
+    message = unicodedata.normalize("NFC", message).lower()
+    for token in TOKEN_RE.findall(message):
+        padded = f" {token} "
+        for n in range(ngram_range[0], ngram_range[1] + 1):
+            for start in range(len(padded) - n + 1):
+                bucket = zlib.crc32(padded[start:start + n].encode("utf-8")) % dim
+                counts[bucket] = counts.get(bucket, 0) + 1
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.sqrt(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return indices, values / np.linalg.norm(values)
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class Prediction(NamedTuple):
+    intent: Optional[str]  # None below INTENT_MIN_CONFIDENCE or for NO_INTENT
+    intent_confidence: float
+    categories: List[str]  # category slugs, most likely first; empty below CATEGORY_MIN_CONFIDENCE
+    category_confidence: float
+
+
+class IntentModel:
+    """Two softmax heads over one hashed n-gram vector"""
+
+    def __init__(self, intents: List[str], categories: List[str],
+                 intent_weights: np.ndarray, intent_bias: np.ndarray,
+                 category_weights: np.ndarray, category_bias: np.ndarray,
+                 ngram_range: Tuple[int, int] = NGRAM_RANGE):
+        self.intents = list(intents)
+        self.categories = list(categories)
+        self.dim = intent_weights.shape[0]
+        self.ngram_range = ngram_range
+        # One gather serves both heads
+        self.weights = np.hstack([intent_weights, category_weights]).astype(np.float32)
+        self.bias = np.concatenate([intent_bias, category_bias]).astype(np.float32)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with np.load(path) as data:
+            return cls(
+                [str(label) for label in data["intents"]], [str(label) for label in data["categories"]],
+                data["intent_weights"], data["intent_bias"],
+                data["category_weights"], data["category_bias"],
+                tuple(int(n) for n in data["ngram_range"]),
+            )
+
+    def save(self, path: str) -> None:
+        n_intents = len(self.intents)
+        # float16 halves the shipped file; predictions are unchanged at that precision
+        np.savez_compressed(
+            path,
+            intents=np.array(self.intents), categories=np.array(self.categories),
+            intent_weights=self.weights[:, :n_intents].astype(np.float16),
+            intent_bias=self.bias[:n_intents],
+            category_weights=self.weights[:, n_intents:].astype(np.float16),
+            category_bias=self.bias[n_intents:],
+            ngram_range=np.array(self.ngram_range),
+        )
+
+    def probabilities(self, message: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(intent probabilities, category probabilities) in label order"""
+        indices, values = features(message, self.dim, self.ngram_range)
+        logits = values @ self.weights[indices] + self.bias
+        n_intents = len(self.intents)
+        return softmax(logits[:n_intents]), softmax(logits[n_intents:])
+
+    def predict(self, message: str) -> Prediction:
+        intent_probs, category_probs = self.probabilities(message)
+
+        best = int(intent_probs.argmax())
+        confident = intent_probs[best] >= INTENT_MIN_CONFIDENCE
+        intent = self.intents[best] if confident else None
+        # The category head never saw chit-chat, so it is not asked about it
+        chit_chat = intent == NO_INTENT
+        if chit_chat:
+            intent = None
+
+        categories = []
+        order = np.argsort(-category_probs)
+        if not chit_chat and category_probs[order[0]] >= CATEGORY_MIN_CONFIDENCE:
+            covered = 0.0
+            for i in order[:MAX_CATEGORIES]:
+                categories.append(self.categories[i])
+                covered += category_probs[i]
+                if covered >= CATEGORY_COVERAGE:
+                    break
+        return Prediction(intent, float(intent_probs[best]), categories, float(category_probs[order[0]]))
+
+
+_model: Optional[IntentModel] = None
+_loaded = False
+
+
+def get_model() -> Optional[IntentModel]:
+    """The shipped model, loaded on first use; None when routing is off or the file is missing"""
+    global _model, _loaded
+    if not _loaded:
+        _loaded = True
+        if INTENT_ROUTING_ENABLED and os.path.exists(INTENT_MODEL_PATH):
+            try:
+                _model = IntentModel.load(INTENT_MODEL_PATH)
+            except Exception:
+                logger.exception("intent_model_unreadable path=%s", INTENT_MODEL_PATH)
+    return _model
+
+
+def classify(message: str) -> Optional[Prediction]:
+    model = get_model()
+    return model.predict(message) if model is not None else None
+
+
+# ============================================================================
+# TRAINING
+# ============================================================================
+
+def train_head(examples: List[Tuple[np.ndarray, np.ndarray]], labels: np.ndarray, n_classes: int,
+               dim: int = HASH_DIM, epochs: int = 40, batch_size: int = 64, learning_rate: float = 0.05,
+               l2: float = 1e-5, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Multinomial logistic regression on sparse examples with Adam; returns (weights, bias)"""
+    rng = np.random.default_rng(seed)
+    weights = np.zeros((dim, n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+    beta1, beta2, step = 0.9, 0.999, 0
+
+    for _ in range(epochs):
+        order = rng.permutation(len(examples))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            x = np.zeros((len(batch), dim), dtype=np.float32)
+            for row, i in enumerate(batch):
+                indices, values = examples[i]
+                x[row, indices] = values
+            probs = softmax(x @ weights + bias)
+            probs[np.arange(len(batch)), labels[batch]] -= 1.0
+            probs /= len(batch)
+
+            step += 1
+            for param, grad, m, v in (
+                (weights, x.T @ probs + l2 * weights, moments[0], moments[1]),
+                (bias, probs.sum(axis=0), moments[2], moments[3]),
+            ):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                correction = math.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+                param -= learning_rate * correction * m / (np.sqrt(v) + 1e-8)
+    return weights, bias
@@ -0,0 +1,495 @@
+"""
+Persisted background jobs with a local worker; no external broker.
+
+Jobs are rows in the jobs table. enqueue() inserts a queued row; a worker
+claims the oldest queued job with a conditional UPDATE, so several workers
+(API processes or the job_worker.py sidecar) never run the same job twice,
+runs its handler off the request path and records progress, result or error
+on the row. The admin API triggers and inspects jobs.
+
+Handlers that touch in-memory state (index rebuilds, cache warming) are
+per-process: one API process claims the job and records it on the row, and
+every other API process replays it once it has succeeded, within
+JOB_POLL_SECONDS. API processes started after the job do not replay it. The
+sidecar never runs them, and API processes run them even with
+JOB_WORKER_ENABLED=0.
+
+A running job's heartbeat_at is touched every JOB_HEARTBEAT_SECONDS. Jobs
+whose worker stopped touching it for JOB_STALE_SECONDS are failed by the
+next worker that polls.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import bindparam, inspect as inspect_db, text
+
+from services import catalogue, metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "1") == "1"
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+
+# A running job's worker touches heartbeat_at this often...
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+# ...and a job it has not touched for this long belonged to a worker that died
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", str(4 * JOB_HEARTBEAT_SECONDS)))
+
+JOB_COLUMNS = "id, kind, status, params, progress, message, result, error, created_at, started_at, finished_at"
+
+
+class Handler(NamedTuple):
+    fn: Callable
+    per_process: bool
+
+
+_handlers: Dict[str, Handler] = {}
+_app = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wake: Optional[asyncio.Event] = None
+
+# Per-process jobs: every id up to _replayed_up_to has been run or skipped here
+_replayed_up_to = 0
+_ran_here: Set[int] = set()
+
+
+def handler(kind: str, per_process: bool = False):
+    """Register fn(ctx, **params) as the handler for a job kind
+
+    per_process handlers change in-memory state, so every API process runs them.
+    """
+    def register(fn: Callable) -> Callable:
+        _handlers[kind] = Handler(fn, per_process)
+        return fn
+    return register
+
+
+def kinds() -> List[str]:
+    return sorted(_handlers)
+
+
+def set_app(app) -> None:
+    """Mark this process as an API process; handlers that need the app can run here"""
+    global _app
+    _app = app
+
+
+def per_process_kinds() -> List[str]:
+    return sorted(kind for kind, h in _handlers.items() if h.per_process)
+
+
+def runnable_kinds() -> List[str]:
+    if _app is None:
+        return [kind for kind, h in _handlers.items() if not h.per_process]
+    return [kind for kind, h in _handlers.items() if JOB_WORKER_ENABLED or h.per_process]
+
+
+def ensure_table() -> None:
+    from database.connection import Base, engine
+    from models.jobs import Job
+
+    Base.metadata.create_all(engine, tables=[Job.__table__])
+    # Tables created before heartbeats
+    if "heartbeat_at" not in {column["name"] for column in inspect_db(engine).get_columns("jobs")}:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE jobs ADD COLUMN heartbeat_at {Job.__table__.c.heartbeat_at.type.compile(engine.dialect)}"))
+
+
+def _shape(row) -> Dict:
+    job = dict(row)
+    for field in ("params", "result"):
+        job[field] = json.loads(job[field]) if job[field] else None
+    return job
+
+
+# ============================================================================
+# QUEUE
+# ============================================================================
+
+def enqueue(db, kind: str, params: Optional[Dict] = None, once: bool = False) -> Dict:
+    """Queue a job, or return the identical job that is already queued
+
+    With once, an identical job that is running or has succeeded is returned too.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    encoded = json.dumps(params or {}, sort_keys=True)
+    statuses = ["queued", "running", "succeeded"] if once else ["queued"]
+    existing = db.execute(
+        text(f"""
+            SELECT {JOB_COLUMNS} FROM jobs
+            WHERE kind = :kind AND params = :params AND status IN :statuses
+            ORDER BY id DESC LIMIT 1
+        """).bindparams(bindparam("statuses", expanding=True)),
+        {"kind": kind, "params": encoded, "statuses": statuses}
+    ).mappings().fetchone()
+    if existing is not None:
+        return _shape(existing)
+
+    job_id = db.execute(
+        text("""
+            INSERT INTO jobs (kind, status, params, progress, created_at)
+            VALUES (:kind, 'queued', :params, 0, CURRENT_TIMESTAMP)
+            RETURNING id
+        """),
+        {"kind": kind, "params": encoded}
+    ).scalar()
+    db.commit()
+    if _loop is not None and _wake is not None:
+        _loop.call_soon_threadsafe(_wake.set)
+    return get_job(db, job_id)
+
+
+def get_job(db, job_id: int) -> Optional[Dict]:
+    row = db.execute(text(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = :id"), {"id": job_id}).mappings().fetchone()
+    return _shape(row) if row is not None else None
+
+
+def list_jobs(db, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    where = "WHERE status = :status" if status else ""
+    rows = db.execute(
+        text(f"SELECT {JOB_COLUMNS} FROM jobs {where} ORDER BY id DESC LIMIT :limit"),
+        {"status": status, "limit": limit}
+    ).mappings().fetchall()
+    return [_shape(row) for row in rows]
+
+
+class JobContext:
+    """Passed to handlers; progress() is persisted so the admin API can show it"""
+
+    def __init__(self, job_id: int, session_factory, replay: bool = False):
+        self.job_id = job_id
+        self.replay = replay
+        self._session_factory = session_factory
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        if self.replay:
+            # The row shows the run of the process that claimed the job
+            return
+        db = self._session_factory()
+        try:
+            db.execute(
+                text("UPDATE jobs SET progress = :progress, message = COALESCE(:message, message) WHERE id = :id"),
+                {"progress": round(min(max(fraction, 0.0), 1.0), 4), "message": message, "id": self.job_id}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+def _claim(db) -> Optional[Dict]:
+    """Take the oldest runnable queued job; the status check in the UPDATE makes it race-free"""
+    runnable = runnable_kinds()
+    if not runnable:
+        return None
+    candidates = db.execute(
+        text("SELECT id FROM jobs WHERE status = 'queued' AND kind IN :kinds ORDER BY id LIMIT 5")
+        .bindparams(bindparam("kinds", expanding=True)),
+        {"kinds": runnable}
+    ).scalars().all()
+    for job_id in candidates:
+        claimed = db.execute(
+            text("""
+                UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP,
+                                heartbeat_at = CURRENT_TIMESTAMP, progress = 0
+                WHERE id = :id AND status = 'queued'
+            """),
+            {"id": job_id}
+        ).rowcount
+        db.commit()
+        if claimed:
+            return get_job(db, job_id)
+    return None
+
+
+def _finish(db, job_id: int, status: str, result=None, error: Optional[str] = None) -> None:
+    db.execute(
+        text("""
+            UPDATE jobs
+            SET status = :status, result = :result, error = :error, finished_at = CURRENT_TIMESTAMP,
+                progress = CASE WHEN :status = 'succeeded' THEN 1 ELSE progress END
+            WHERE id = :id
+        """),
+        {"status": status, "result": json.dumps(result, default=str) if result is not None else None,
+         "error": error, "id": job_id}
+    )
+    db.commit()
+
+
+def _heartbeat(db, job_id: int) -> None:
+    db.execute(text("UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP WHERE id = :id"), {"id": job_id})
+    db.commit()
+
+
+def _fail_stale(db) -> None:
+    db.execute(
+        text("""
+            UPDATE jobs SET status = 'failed', error = 'Worker stopped while the job was running',
+                            finished_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < :cutoff
+        """),
+        {"cutoff": datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)}
+    )
+    db.commit()
+
+
+def _replay_cursor(db) -> int:
+    """Newest per-process job id; jobs up to it predate this process"""
+    return db.execute(
+        text("SELECT COALESCE(MAX(id), 0) FROM jobs WHERE kind IN :kinds")
+        .bindparams(bindparam("kinds", expanding=True)),
+        {"kinds": per_process_kinds()}
+    ).scalar()
+
+
+def _to_replay(db) -> List[Dict]:
+    """Per-process jobs another process has run since the cursor, oldest first
+
+    The cursor stops at the first job still queued or running so it is not skipped.
+    """
+    global _replayed_up_to
+    rows = db.execute(
+        text(f"SELECT {JOB_COLUMNS} FROM jobs WHERE kind IN :kinds AND id > :after ORDER BY id")
+        .bindparams(bindparam("kinds", expanding=True)),
+        {"kinds": per_process_kinds(), "after": _replayed_up_to}
+    ).mappings().fetchall()
+    replay = []
+    for row in rows:
+        if row["status"] in ("queued", "running"):
+            break
+        _replayed_up_to = row["id"]
+        if row["status"] == "succeeded" and row["id"] not in _ran_here:
+            replay.append(_shape(row))
+        _ran_here.discard(row["id"])
+    return replay
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+async def _call(fn: Callable, ctx: JobContext, params: Optional[Dict]):
+    if inspect.iscoroutinefunction(fn):
+        return await fn(ctx, **(params or {}))
+    return await asyncio.to_thread(fn, ctx, **(params or {}))
+
+
+async def _keep_alive(job_id: int) -> None:
+    """Touch the job's heartbeat until cancelled"""
+    from database.connection import SessionLocal
+
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        db = SessionLocal()
+        try:
+            await asyncio.to_thread(_heartbeat, db, job_id)
+        except Exception:
+            logger.exception("job_heartbeat_failed id=%s", job_id)
+        finally:
+            db.close()
+
+
+async def run_next() -> bool:
+    """Claim and run one job; returns False when nothing was runnable"""
+    from database.connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        job = await asyncio.to_thread(_claim, db)
+    finally:
+        db.close()
+    if job is None:
+        return False
+
+    started = time.perf_counter()
+    registered = _handlers[job["kind"]]
+    if registered.per_process:
+        _ran_here.add(job["id"])
+    heartbeat = asyncio.create_task(_keep_alive(job["id"]))
+    status, result, error = "succeeded", None, None
+    try:
+        result = await _call(registered.fn, JobContext(job["id"], SessionLocal), job["params"])
+    except Exception as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        logger.error("job_failed id=%s kind=%s\n%s", job["id"], job["kind"], traceback.format_exc())
+    finally:
+        heartbeat.cancel()
+
+    db = SessionLocal()
+    try:
+        await asyncio.to_thread(_finish, db, job["id"], status, result, error)
+    finally:
+        db.close()
+    metrics.log_event(
+        logger, logging.INFO, "job_finished",
+        id=job["id"], kind=job["kind"], status=status, seconds=round(time.perf_counter() - started, 3),
+    )
+    return True
+
+
+async def replay_per_process() -> int:
+    """Run here the per-process jobs other API processes have run; returns how many"""
+    from database.connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        replay = await asyncio.to_thread(_to_replay, db)
+    finally:
+        db.close()
+    for job in replay:
+        started = time.perf_counter()
+        status = "succeeded"
+        try:
+            await _call(_handlers[job["kind"]].fn, JobContext(job["id"], SessionLocal, replay=True), job["params"])
+        except Exception:
+            status = "failed"
+            logger.error("job_replay_failed id=%s kind=%s\n%s", job["id"], job["kind"], traceback.format_exc())
+        metrics.log_event(
+            logger, logging.INFO, "job_replayed",
+            id=job["id"], kind=job["kind"], status=status, seconds=round(time.perf_counter() - started, 3),
+        )
+    return len(replay)
+
+
+async def run_worker(poll_seconds: float = JOB_POLL_SECONDS) -> None:
+    """Run queued jobs one at a time; woken early by enqueue() in the same process
+
+    In an API process this also replays per-process jobs and, with
+    JOB_WORKER_ENABLED=0, runs only per-process kinds.
+    """
+    global _loop, _wake, _replayed_up_to
+    from database.connection import SessionLocal
+
+    _loop = asyncio.get_running_loop()
+    _wake = asyncio.Event()
+    try:
+        await asyncio.to_thread(ensure_table)
+        db = SessionLocal()
+        try:
+            _replayed_up_to = await asyncio.to_thread(_replay_cursor, db)
+        finally:
+            db.close()
+    except Exception:
+        logger.exception("job_table_unavailable")
+        return
+
+    while True:
+        try:
+            db = SessionLocal()
+            try:
+                await asyncio.to_thread(_fail_stale, db)
+            finally:
+                db.close()
+            if _app is not None:
+                await replay_per_process()
+            if await run_next():
+                continue
+        except Exception:
+            logger.exception("job_worker_error")
+        _wake.clear()
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+@handler("import_catalogue")
+def import_catalogue(ctx: JobContext, csv_path: str = "SahayataDatasetFinal.csv"):
+    """Run the dataset import, then reload this process's indexes"""
+    import import_data
+
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+    ctx.progress(0.05, "Importing dataset")
+    import_data.import_schemes(csv_path)
+    ctx.progress(0.9, "Reloading catalogue")
+    catalogue.refresh()
+    return {"catalogue_version": catalogue.current_version()}
+
+
+@handler("rebuild_indexes", per_process=True)
+def rebuild_indexes(ctx: JobContext):
+    """Rebuild every in-memory catalogue index, even if the version has not changed"""
+    catalogue.refresh(force=True)
+    return {"catalogue_version": catalogue.current_version()}
+
+
+@handler("export_snapshot")
+def export_snapshot(ctx: JobContext, out: str = "catalogue_export", precompress: bool = True):
+    """Write the static content-hashed catalogue bundles"""
+    import export_catalogue
+
+    ctx.progress(0.05, f"Exporting to {out}")
+    export_catalogue.export_catalogue(out, precompress)
+    with open(os.path.join(out, "manifest.json"), encoding="utf-8") as f:
+        return {"version": json.load(f)["version"], "out": out}
+
+
+@handler("export_embedded")
+def export_embedded(ctx: JobContext, path: str = "catalogue.sqlite3"):
+    """Write the read-only SQLite catalogue for offline deployments"""
+    import import_data
+
+    ctx.progress(0.05, f"Writing {path}")
+    return {"path": path, "rows": import_data.export_embedded(path)}
+
+
+@handler("refresh_recommendations")
+def refresh_recommendations(ctx: JobContext, catalogue_version: Optional[str] = None, day: Optional[str] = None):
+    """Recompute stale stored recommendations
+
+    catalogue_version and day tell the periodic refreshes of several processes apart.
+    """
+    from database.connection import SessionLocal
+    from services import recommendations
+
+    if catalogue_version is not None and catalogue_version != catalogue.current_version():
+        # Queued by a process that picked up a new catalogue before this one
+        catalogue.refresh()
+
+    db = SessionLocal()
+    try:
+        return {"users": recommendations.refresh_stale(db, progress=ctx.progress)}
+    finally:
+        db.close()
+
+
+def _routes_app(app):
+    """The app below the user middleware (exception handling and routing), so warming skips rate limits"""
+    from starlette.middleware.exceptions import ExceptionMiddleware
+
+    node = app.middleware_stack or app.build_middleware_stack()
+    while node is not None and not isinstance(node, ExceptionMiddleware):
+        node = getattr(node, "app", None)
+    return node if node is not None else app.router
+
+
+@handler("warm_cache", per_process=True)
+async def warm_cache(ctx: JobContext, details: bool = True):
+    """Pre-render and compress statistics, category pages and (optionally) every scheme detail"""
+    from services import categories, compression
+
+    index = categories.get_index()
+    if index is None:
+        raise RuntimeError("Catalogue not loaded")
+    paths = ["/api/schemes/statistics"]
+    paths += [f"/api/schemes/category/{slug}" for slug in sorted(index.ids_by_slug)]
+    if details:
+        paths += [f"/api/schemes/{scheme_id}" for scheme_id in sorted(index.schemes)]
+
+    async def progress(fraction: float) -> None:
+        await asyncio.to_thread(ctx.progress, fraction, f"{round(fraction * len(paths))}/{len(paths)} paths")
+
+    cached = await compression.warm(_routes_app(_app), paths, progress=progress)
+    return {"paths": len(paths), "cached": cached}
@@ -0,0 +1,316 @@
+"""
+Lightweight in-process metrics exported in Prometheus text format.
+
+Counters and histograms are plain dicts keyed by label tuples so recording a
+sample costs one lock and a couple of additions. Per-request DB statistics are
+collected through a ContextVar that the ASGI middleware sets and the engine
+event hooks update.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000)
+
+# ============================================================================
+# METRIC TYPES
+# ============================================================================
+
+_registry = []
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, (), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield self.name + "_bucket", labels, (("le", _format_bound(bound)),), cumulative
+            yield self.name + "_bucket", labels, (("le", "+Inf"),), state[-1]
+            yield self.name + "_sum", labels, (), state[-2]
+            yield self.name + "_count", labels, (), state[-1]
+
+
+def _format_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for sample_name, labels, extra, value in metric.samples():
+            pairs = list(zip(metric.labelnames, labels)) + list(extra)
+            if pairs:
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+                lines.append(f"{sample_name}{{{label_str}}} {value}")
+            else:
+                lines.append(f"{sample_name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# APPLICATION METRICS
+# ============================================================================
+
+REQUEST_LATENCY = Histogram(
+    "sahayata_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route"),
+)
+REQUESTS = Counter(
+    "sahayata_http_requests_total",
+    "HTTP requests by route template and status code",
+    ("method", "route", "status"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "sahayata_request_db_queries",
+    "Database statements executed per request",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "sahayata_request_db_duration_seconds",
+    "Total database time per request",
+    ("route",),
+)
+REQUEST_DB_ROWS = Histogram(
+    "sahayata_request_db_rows",
+    "Rows fetched from the database per request",
+    ("route",),
+    buckets=ROW_BUCKETS,
+)
+DB_QUERY_LATENCY = Histogram(
+    "sahayata_db_query_duration_seconds",
+    "Latency of individual database statements",
+)
+CACHE_REQUESTS = Counter(
+    "sahayata_cache_requests_total",
+    "Cache lookups by cache name and result",
+    ("cache", "result"),
+)
+SINGLEFLIGHT_REQUESTS = Counter(
+    "sahayata_singleflight_requests_total",
+    "Coalescable calls by group and outcome (leader, coalesced, timeout)",
+    ("group", "result"),
+)
+INTENT_ROUTES = Counter(
+    "sahayata_intent_routes_total",
+    "Chat searches by routing outcome (routed, fallback, intent_only, unrouted)",
+    ("result",),
+)
+SEARCH_PHASE_LATENCY = Histogram(
+    "sahayata_search_phase_duration_seconds",
+    "Search engine phase timings",
+    ("phase",),
+)
+
+
+# ============================================================================
+# REQUEST-SCOPED STATISTICS
+# ============================================================================
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds", "db_rows")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.db_rows = 0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def cache_hit(cache: str) -> None:
+    CACHE_REQUESTS.inc(cache, "hit")
+
+
+def cache_miss(cache: str) -> None:
+    CACHE_REQUESTS.inc(cache, "miss")
+
+
+@contextmanager
+def phase(name: str):
+    """Time a search engine phase (keyword_extraction, retrieval, scoring, ...)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SEARCH_PHASE_LATENCY.observe(time.perf_counter() - start, name)
+
+
+def log_event(log: logging.Logger, level: int, event_name: str, **fields) -> None:
+    """Emit a single-line key=value log record, skipping all formatting when disabled"""
+    if log.isEnabledFor(level):
+        log.log(level, "%s %s", event_name, " ".join(f"{k}={v!r}" for k, v in fields.items()))
+
+
+# ============================================================================
+# ENGINE INSTRUMENTATION
+# ============================================================================
+
+def _count_fetched_row(cursor, row):
+    """sqlite3 row_factory that counts rows as they are fetched and returns them unchanged"""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_rows += 1
+    return row
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement on the engine and attribute it to the current request.
+
+    Rows come from cursor.rowcount, except on SQLite: its rowcount is -1 for
+    SELECTs, so rows are counted as they are fetched instead.
+    """
+    count_fetched = engine.dialect.name == "sqlite"
+    if count_fetched:
+        @event.listens_for(engine, "connect")
+        def _connect(dbapi_connection, connection_record):
+            dbapi_connection.row_factory = _count_fetched_row
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        DB_QUERY_LATENCY.observe(elapsed)
+
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_seconds += elapsed
+            rowcount = -1 if count_fetched else getattr(cursor, "rowcount", -1)
+            if rowcount and rowcount > 0:
+                stats.db_rows += rowcount
+
+
+# ============================================================================
+# ASGI MIDDLEWARE
+# ============================================================================
+
+class MetricsMiddleware:
+    """Record latency and DB usage for every HTTP request, labelled by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+
+            REQUEST_LATENCY.observe(elapsed, method, route_path)
+            REQUESTS.inc(method, route_path, str(status_code))
+            REQUEST_DB_QUERIES.observe(stats.db_queries, route_path)
+            REQUEST_DB_TIME.observe(stats.db_seconds, route_path)
+            REQUEST_DB_ROWS.observe(stats.db_rows, route_path)
+
+            log_event(
+                logger, logging.DEBUG, "request",
+                method=method, route=route_path, status=status_code,
+                ms=round(elapsed * 1000, 2), db_queries=stats.db_queries,
+                db_ms=round(stats.db_seconds * 1000, 2), rows=stats.db_rows,
+            )
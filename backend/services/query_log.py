@@ -0,0 +1,195 @@
+"""
+Search query log: an in-memory ring buffer flushed to Postgres in batches.
+
+record() normalises the query and appends one tuple to a bounded deque.
+deque.append is atomic, so request threads never take a lock or touch the
+database. When the buffer is full the oldest entries are dropped and counted.
+A background task drains the buffer every QUERY_LOG_FLUSH_SECONDS and writes
+the batch with COPY (psycopg2), or a multi-row INSERT on other drivers.
+
+top_queries() and zero_result_queries() aggregate the table for the admin API
+and for cache warming.
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "1") == "1"
+QUERY_LOG_CAPACITY = int(os.getenv("QUERY_LOG_CAPACITY", "10000"))
+QUERY_LOG_FLUSH_SECONDS = float(os.getenv("QUERY_LOG_FLUSH_SECONDS", "5"))
+MAX_QUERY_LENGTH = 200
+TOP_IDS = 5
+
+COLUMNS = ("logged_at", "source", "language", "query", "result_count", "latency_ms", "top_ids")
+
+_buffer: deque = deque(maxlen=QUERY_LOG_CAPACITY)
+_dropped = 0
+
+
+def normalize(query: str) -> str:
+    """Case-folded, NFC, single-spaced query so variants of one search aggregate together"""
+    query = unicodedata.normalize("NFC", query or "").casefold()
+    return re.sub(r"\s+", " ", query).strip()[:MAX_QUERY_LENGTH]
+
+
+def record(source: str, language: str, query: str, result_count: int, latency_ms: float,
+           top_ids: Sequence[int] = ()) -> None:
+    """Append one search to the buffer; never blocks and never raises into the request"""
+    global _dropped
+    if not QUERY_LOG_ENABLED:
+        return
+    if len(_buffer) == _buffer.maxlen:
+        _dropped += 1
+    _buffer.append((
+        datetime.now(timezone.utc), source, language, normalize(query), result_count,
+        round(latency_ms, 2), ",".join(str(scheme_id) for scheme_id in list(top_ids)[:TOP_IDS]),
+    ))
+
+
+def pending() -> int:
+    return len(_buffer)
+
+
+def dropped() -> int:
+    return _dropped
+
+
+def _drain() -> List[tuple]:
+    entries = []
+    while True:
+        try:
+            entries.append(_buffer.popleft())
+        except IndexError:
+            return entries
+
+
+def _write(engine, entries: List[tuple]) -> None:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if hasattr(cursor, "copy_expert"):
+            data = io.StringIO()
+            csv.writer(data).writerows(entries)
+            data.seek(0)
+            cursor.copy_expert(f"COPY query_log ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", data)
+        else:
+            placeholders = ", ".join("?" if engine.dialect.paramstyle == "qmark" else "%s" for _ in COLUMNS)
+            cursor.executemany(f"INSERT INTO query_log ({', '.join(COLUMNS)}) VALUES ({placeholders})", entries)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def flush(engine=None) -> int:
+    """Write everything buffered in one batch; returns the number of entries written"""
+    global _dropped
+    if engine is None:
+        from database.connection import engine
+    entries = _drain()
+    if not entries:
+        return 0
+    started = time.perf_counter()
+    try:
+        _write(engine, entries)
+    except Exception:
+        # Keep what fits back in the buffer so a database blip loses as little as possible
+        free = _buffer.maxlen - len(_buffer)
+        if free:
+            _buffer.extendleft(reversed(entries[-free:]))
+        _dropped += max(len(entries) - free, 0)
+        raise
+    metrics.log_event(
+        logger, logging.DEBUG, "query_log_flushed",
+        entries=len(entries), seconds=round(time.perf_counter() - started, 3),
+    )
+    return len(entries)
+
+
+def ensure_table() -> None:
+    from database.connection import Base, engine
+    from models.analytics import QueryLog
+
+    Base.metadata.create_all(engine, tables=[QueryLog.__table__])
+
+
+async def flush_periodically(interval: float = QUERY_LOG_FLUSH_SECONDS) -> None:
+    """Background task: the only writer of query_log"""
+    try:
+        await asyncio.to_thread(ensure_table)
+    except Exception:
+        logger.exception("query_log_table_unavailable")
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(flush)
+        except Exception:
+            logger.exception("query_log_flush_failed")
+
+
+# ============================================================================
+# ANALYTICS
+# ============================================================================
+
+def _filters(days: int, language: Optional[str]):
+    conditions = ["logged_at >= :since"]
+    params = {"since": datetime.now(timezone.utc) - timedelta(days=days)}
+    if language:
+        conditions.append("language = :language")
+        params["language"] = language
+    return " AND ".join(conditions), params
+
+
+def top_queries(db, days: int = 7, language: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    """Most frequent queries with their average result count and latency"""
+    where, params = _filters(days, language)
+    rows = db.execute(text(f"""
+        SELECT language, query, COUNT(*) AS searches,
+               AVG(result_count) AS avg_results,
+               SUM(CASE WHEN result_count = 0 THEN 1 ELSE 0 END) AS zero_results,
+               AVG(latency_ms) AS avg_latency_ms
+        FROM query_log
+        WHERE {where} AND query <> ''
+        GROUP BY language, query
+        ORDER BY searches DESC, query
+        LIMIT :limit
+    """), dict(params, limit=limit)).mappings().fetchall()
+    return [
+        {
+            "language": row["language"],
+            "query": row["query"],
+            "searches": row["searches"],
+            "avg_results": round(float(row["avg_results"]), 2),
+            "zero_results": row["zero_results"],
+            "avg_latency_ms": round(float(row["avg_latency_ms"]), 2),
+        }
+        for row in rows
+    ]
+
+
+def zero_result_queries(db, days: int = 7, language: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    """Queries that returned nothing, most frequent first"""
+    where, params = _filters(days, language)
+    rows = db.execute(text(f"""
+        SELECT language, query, COUNT(*) AS searches, MAX(logged_at) AS last_seen
+        FROM query_log
+        WHERE {where} AND result_count = 0 AND query <> ''
+        GROUP BY language, query
+        ORDER BY searches DESC, query
+        LIMIT :limit
+    """), dict(params, limit=limit)).mappings().fetchall()
+    return [dict(row) for row in rows]
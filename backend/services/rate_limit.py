@@ -0,0 +1,294 @@
+"""
+Per-client rate limiting and per-route concurrency control.
+
+Token buckets are kept per IP and per signed-in user in a BucketStore. A user
+is the subject of a bearer token that verifies; any other token counts as no
+token, so made-up tokens cannot pose as new clients. The default store is in-process; a shared store (Redis, the
+database, ...) can be plugged in with set_bucket_store() when the API runs with
+several workers.
+
+Expensive routes (chat, search, eligibility) run full-table scans, so they
+also go through a concurrency limiter that is capped below the DB pool size.
+Waiting requests are served round-robin per client, so one scraper queueing
+hundreds of requests cannot starve everyone else, and anything that cannot get
+a slot in time is shed with 503 before it reaches Postgres. Cheap routes
+(detail, category, statistics) never wait on that limiter.
+"""
+import abc
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+from services import metrics, tokens
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# Behind a reverse proxy (Render, nginx, ...) every request comes from the proxy's
+# address, so all clients share one IP bucket unless X-Forwarded-For is trusted.
+# Clients can send the header themselves, so the address is read TRUSTED_PROXY_HOPS
+# entries from the right: the one appended by the outermost proxy we run behind.
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "0") == "1"
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+# (requests per second, burst) per IP for each route class
+IP_LIMITS = {
+    "expensive": (float(os.getenv("RATE_LIMIT_EXPENSIVE_RPS", "2")), int(os.getenv("RATE_LIMIT_EXPENSIVE_BURST", "10"))),
+    "cheap": (float(os.getenv("RATE_LIMIT_CHEAP_RPS", "20")), int(os.getenv("RATE_LIMIT_CHEAP_BURST", "60"))),
+}
+USER_LIMIT = (float(os.getenv("RATE_LIMIT_USER_RPS", "5")), int(os.getenv("RATE_LIMIT_USER_BURST", "30")))
+
+EXPENSIVE_CONCURRENCY = int(os.getenv("EXPENSIVE_CONCURRENCY", "6"))
+EXPENSIVE_QUEUE = int(os.getenv("EXPENSIVE_QUEUE", "64"))
+EXPENSIVE_QUEUE_PER_CLIENT = int(os.getenv("EXPENSIVE_QUEUE_PER_CLIENT", "4"))
+EXPENSIVE_QUEUE_TIMEOUT = float(os.getenv("EXPENSIVE_QUEUE_TIMEOUT", "2.0"))
+
+EXPENSIVE_ROUTES = (
+    ("POST", "/api/chatbot/chat"),
+    ("POST", "/api/chatbot/chat/stream"),
+    ("GET", "/api/schemes/search"),
+    ("POST", "/api/schemes/check-eligibility"),
+)
+EXEMPT_PATHS = ("/", "/health", "/metrics", "/docs", "/openapi.json", "/api/chatbot/health")
+
+RATE_LIMITED = metrics.Counter(
+    "sahayata_rate_limited_total",
+    "Requests rejected by the token bucket limiter",
+    ("route_class", "scope"),
+)
+SHED = metrics.Counter(
+    "sahayata_load_shed_total",
+    "Expensive requests shed by the concurrency limiter",
+    ("reason",),
+)
+
+
+# ============================================================================
+# TOKEN BUCKETS
+# ============================================================================
+
+class BucketStore(abc.ABC):
+    """Storage for token buckets; implement consume() to share limits across workers"""
+
+    @abc.abstractmethod
+    def consume(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take `cost` tokens; return (allowed, seconds until enough tokens are available)"""
+
+
+class InMemoryBucketStore(BucketStore):
+    """Process-local buckets, evicting the least recently used beyond max_keys"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(burst), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, 0.0
+            return False, (cost - bucket[0]) / rate if rate > 0 else 60.0
+
+
+_bucket_store: BucketStore = InMemoryBucketStore()
+
+
+def set_bucket_store(store: BucketStore) -> None:
+    global _bucket_store
+    _bucket_store = store
+
+
+# ============================================================================
+# FAIR CONCURRENCY LIMITER
+# ============================================================================
+
+class FairConcurrencyLimiter:
+    """Concurrency cap whose waiters are woken round-robin across clients"""
+
+    def __init__(self, limit: int, max_queue: int, max_queue_per_client: int, timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+
+    async def acquire(self, client: str) -> Optional[str]:
+        """Return None once a slot is held, otherwise the reason the request was shed"""
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return None
+
+        queue = self._queues.get(client)
+        if self.waiting >= self.max_queue:
+            return "queue_full"
+        if queue is not None and len(queue) >= self.max_queue_per_client:
+            return "client_queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._queues[client] = deque()
+        queue.append(future)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            return None
+        except asyncio.TimeoutError:
+            if self._abandon(client, future):
+                return None
+            return "timeout"
+        except asyncio.CancelledError:
+            # Client went away while queued; pass on a slot it may already hold
+            if self._abandon(client, future):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        # Hand the slot to the next client in round-robin order
+        while self._queues:
+            client, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+
+    def _abandon(self, client: str, future) -> bool:
+        """Withdraw a waiter; True if it had already been handed a slot"""
+        if future.done() and not future.cancelled():
+            return True
+        future.cancel()
+        self._discard(client, future)
+        return False
+
+    def _discard(self, client: str, future) -> None:
+        queue = self._queues.get(client)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self.waiting -= 1
+            if not queue:
+                del self._queues[client]
+
+
+# ============================================================================
+# ASGI MIDDLEWARE
+# ============================================================================
+
+def classify(method: str, path: str) -> str:
+    for route_method, route_path in EXPENSIVE_ROUTES:
+        if method == route_method and path == route_path:
+            return "expensive"
+    return "cheap"
+
+
+def client_ip(scope) -> str:
+    if TRUST_PROXY_HEADERS:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                hops = value.decode("latin-1").split(",")
+                return hops[max(0, len(hops) - TRUSTED_PROXY_HOPS)].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def credential_key(scope) -> Optional[str]:
+    """User id of a valid bearer access token, or None to fall back to the IP"""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            try:
+                claims = tokens.verify_token(value[7:].decode("latin-1").strip())
+            except tokens.TokenError:
+                return None
+            return str(claims.get("sub"))
+    return None
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting plus load shedding for expensive routes"""
+
+    def __init__(self, app):
+        self.app = app
+        self.limiter = FairConcurrencyLimiter(
+            EXPENSIVE_CONCURRENCY, EXPENSIVE_QUEUE, EXPENSIVE_QUEUE_PER_CLIENT, EXPENSIVE_QUEUE_TIMEOUT
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not RATE_LIMIT_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"])
+        ip = client_ip(scope)
+
+        rate, burst = IP_LIMITS[route_class]
+        allowed, retry_after = _bucket_store.consume(f"ip:{route_class}:{ip}", rate, burst)
+        if not allowed:
+            RATE_LIMITED.inc(route_class, "ip")
+            await _reject(send, 429, "Too many requests, please slow down", retry_after)
+            return
+
+        user = credential_key(scope)
+        if user is not None:
+            allowed, retry_after = _bucket_store.consume(f"user:{user}", *USER_LIMIT)
+            if not allowed:
+                RATE_LIMITED.inc(route_class, "user")
+                await _reject(send, 429, "Too many requests, please slow down", retry_after)
+                return
+
+        if route_class != "expensive":
+            await self.app(scope, receive, send)
+            return
+
+        shed_reason = await self.limiter.acquire(f"user:{user}" if user is not None else f"ip:{ip}")
+        if shed_reason is not None:
+            SHED.inc(shed_reason)
+            metrics.log_event(logger, logging.INFO, "load_shed", reason=shed_reason, path=scope["path"])
+            await _reject(send, 503, "Server is busy, please retry shortly", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
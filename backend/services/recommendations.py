@@ -0,0 +1,216 @@
+"""
+Per-user scheme recommendations, precomputed from the stored profile.
+
+A user's ranked scheme ids are computed from their date of birth and gender
+against the eligibility index, at signup and on profile update. Only schemes
+whose age limits or gender target admit the user are kept; schemes that merely
+do not rule them out are not recommended. The ids are stored in
+user_recommendations together with the catalogue version they were computed
+for and the date they stay valid until: the next birthday on which the user's
+age crosses some scheme's age limit. Serving is one keyed read.
+
+A background task in every API process queues one refresh_recommendations
+job per catalogue version and day; the job, run by a single worker,
+recomputes in bulk only the rows that went stale: a new catalogue version,
+or a valid_until date that has passed.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import time
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from services import catalogue, eligibility, metrics
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_LIMIT = 20
+RECOMMENDATION_REFRESH_SECONDS = int(os.getenv("RECOMMENDATION_REFRESH_SECONDS", "300"))
+REFRESH_BATCH_SIZE = 500
+
+# Schemes aimed at the user's own group rank above schemes open to everyone
+GENDER_TARGET_SCORE = 30
+AGE_TARGET_SCORE = 25
+
+
+def age_on(dob: date, today: date) -> int:
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def _birthday(dob: date, age: int) -> date:
+    try:
+        return dob.replace(year=dob.year + age)
+    except ValueError:
+        # Born on 29 February: the birthday falls on 1 March in other years
+        return date(dob.year + age, 3, 1)
+
+
+def compute(dob: Optional[date], gender: Optional[str],
+            today: Optional[date] = None) -> Optional[Tuple[List[int], Optional[date]]]:
+    """(ranked scheme ids, valid until) for a profile, or None until the index is loaded"""
+    index = eligibility.get_index()
+    if index is None:
+        return None
+    today = today or date.today()
+    age = age_on(dob, today) if dob else None
+    gender = gender.lower() if gender else None
+
+    scored = []
+    for scheme_id in index.match(age=age, gender=gender):
+        c = index.constraints[scheme_id]
+        score = 0
+        if gender and c.gender == gender:
+            score += GENDER_TARGET_SCORE
+        if age is not None and (c.min_age is not None or c.max_age is not None):
+            score += AGE_TARGET_SCORE
+        if score:
+            scored.append((-score, scheme_id))
+    scored.sort()
+
+    valid_until = None
+    if age is not None:
+        position = bisect.bisect_right(index.age_thresholds, age)
+        if position < len(index.age_thresholds):
+            valid_until = _birthday(dob, index.age_thresholds[position])
+    return [scheme_id for _, scheme_id in scored[:RECOMMENDATION_LIMIT]], valid_until
+
+
+_UPSERT = text("""
+    INSERT INTO user_recommendations (user_id, catalogue_version, valid_until, scheme_ids, computed_at)
+    VALUES (:user_id, :catalogue_version, :valid_until, :scheme_ids, :computed_at)
+    ON CONFLICT (user_id) DO UPDATE SET
+        catalogue_version = EXCLUDED.catalogue_version,
+        valid_until = EXCLUDED.valid_until,
+        scheme_ids = EXCLUDED.scheme_ids,
+        computed_at = EXCLUDED.computed_at
+""")
+
+
+def _row(user_id: int, dob, gender, today: date) -> Optional[dict]:
+    result = compute(dob, gender, today)
+    if result is None:
+        return None
+    scheme_ids, valid_until = result
+    return {
+        "user_id": user_id,
+        "catalogue_version": catalogue.current_version(),
+        "valid_until": valid_until,
+        "scheme_ids": ",".join(str(scheme_id) for scheme_id in scheme_ids),
+        "computed_at": datetime.utcnow(),
+    }
+
+
+def refresh_user(db, user_id: int) -> Optional[dict]:
+    """Recompute and store one user's recommendations; the caller commits"""
+    user = db.execute(text("SELECT id, dob, gender FROM users WHERE id = :id"), {"id": user_id}).fetchone()
+    if user is None:
+        return None
+    row = _row(user.id, user.dob, user.gender, date.today())
+    if row is not None:
+        db.execute(_UPSERT, row)
+    return row
+
+
+def is_stale(row, today: Optional[date] = None) -> bool:
+    today = today or date.today()
+    return row["catalogue_version"] != catalogue.current_version() or (
+        row["valid_until"] is not None and row["valid_until"] <= today
+    )
+
+
+def get(db, user_id: int) -> Optional[dict]:
+    """Stored recommendations for a user, recomputed first if missing or stale"""
+    row = db.execute(
+        text("SELECT * FROM user_recommendations WHERE user_id = :id"), {"id": user_id}
+    ).mappings().fetchone()
+    if row is not None and not is_stale(row):
+        return dict(row)
+    row = refresh_user(db, user_id)
+    if row is not None:
+        db.commit()
+    return row
+
+
+def refresh_stale(db, progress=None) -> int:
+    """Recompute every missing or stale row in batches; returns the number rewritten
+
+    progress(fraction), if given, is called after each batch.
+    """
+    version = catalogue.current_version()
+    if version is None or eligibility.get_index() is None:
+        return 0
+    today = date.today()
+    started = time.perf_counter()
+    users = db.execute(text("""
+        SELECT u.id, u.dob, u.gender
+        FROM users u LEFT JOIN user_recommendations r ON r.user_id = u.id
+        WHERE r.user_id IS NULL
+           OR r.catalogue_version <> :version
+           OR r.valid_until <= :today
+    """), {"version": version, "today": today}).fetchall()
+
+    refreshed = 0
+    for start in range(0, len(users), REFRESH_BATCH_SIZE):
+        rows = [_row(user.id, user.dob, user.gender, today) for user in users[start:start + REFRESH_BATCH_SIZE]]
+        rows = [row for row in rows if row is not None]
+        if rows:
+            db.execute(_UPSERT, rows)
+            db.commit()
+            refreshed += len(rows)
+        if progress is not None:
+            progress(min(start + REFRESH_BATCH_SIZE, len(users)) / len(users))
+
+    if refreshed:
+        metrics.log_event(
+            logger, logging.INFO, "recommendations_refreshed",
+            seconds=round(time.perf_counter() - started, 3), users=refreshed, version=version,
+        )
+    return refreshed
+
+
+def ensure_table() -> None:
+    from database.connection import Base, engine
+    from models.users import UserRecommendation
+
+    Base.metadata.create_all(engine, tables=[UserRecommendation.__table__])
+
+
+def _refresh_if_due(last_run):
+    """Queue a refresh_stale job when the catalogue version or the date moved since last_run
+
+    The job's params name the version and day, and an identical job queued,
+    running or done by another process is reused, so one refresh runs per change.
+    """
+    from database.connection import SessionLocal
+    from services import jobs
+
+    key = (catalogue.current_version(), date.today())
+    if key == last_run or key[0] is None:
+        return last_run
+    db = SessionLocal()
+    try:
+        jobs.enqueue(db, "refresh_recommendations",
+                     {"catalogue_version": key[0], "day": key[1].isoformat()}, once=True)
+    finally:
+        db.close()
+    return key
+
+
+async def refresh_periodically(interval: int = RECOMMENDATION_REFRESH_SECONDS) -> None:
+    """Background task: keep stored recommendations in step with the catalogue and the calendar"""
+    try:
+        await asyncio.to_thread(ensure_table)
+    except Exception:
+        logger.exception("recommendations_table_unavailable")
+        return
+    last_run = None
+    while True:
+        try:
+            last_run = await asyncio.to_thread(_refresh_if_due, last_run)
+        except Exception:
+            logger.exception("recommendations_refresh_failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,175 @@
+"""
+Related schemes from a precomputed k-nearest-neighbour graph.
+
+Every scheme becomes one vector built from three blocks: TF-IDF over its
+English text, IDF-weighted beneficiary tags, and a one-hot category. Each
+block is L2-normalised and scaled by the square root of its weight, so the
+dot product of two vectors is the weighted sum of the per-block cosine
+similarities. The whole catalogue is compared at once with one matrix
+product, and the importer stores the top RELATED_K neighbours of each
+scheme in scheme_relations.
+
+At serve time the graph is held as a dict of short tuples, rebuilt on
+catalogue change, so a lookup costs O(k).
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from services import catalogue, metrics
+from services.fuzzy import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Neighbours stored per scheme; the endpoint can ask for at most this many
+RELATED_K = 10
+
+TEXT_FIELDS = ("scheme_name_en", "description_en", "eligibility_en", "benefits_en")
+TEXT_WEIGHT = 0.5
+TAG_WEIGHT = 0.3
+CATEGORY_WEIGHT = 0.2
+
+# Terms in more than this share of schemes say nothing about similarity
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+
+def _tags(value) -> List[str]:
+    return [tag.strip().lower() for tag in str(value or "").split(",") if tag.strip()]
+
+
+def _block(documents: List[List[str]], weight: float, idf: bool = True,
+           max_df: float = 1.0) -> np.ndarray:
+    """Documents (lists of terms) as an L2-normalised, weight-scaled matrix"""
+    n = len(documents)
+    document_frequency: Dict[str, int] = {}
+    for terms in documents:
+        for term in set(terms):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    vocabulary = {
+        term: i for i, term in enumerate(sorted(
+            term for term, df in document_frequency.items() if df <= max(1, max_df * n)
+        ))
+    }
+
+    matrix = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    for row, terms in enumerate(documents):
+        for term in terms:
+            column = vocabulary.get(term)
+            if column is not None:
+                matrix[row, column] += 1.0
+    if not vocabulary:
+        return matrix
+
+    # Sublinear term frequency, then inverse document frequency
+    np.log1p(matrix, out=matrix)
+    if idf:
+        df = np.array([document_frequency[term] for term in sorted(vocabulary, key=vocabulary.get)],
+                      dtype=np.float32)
+        matrix *= np.log((1 + n) / (1 + df)) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix * np.float32(np.sqrt(weight))
+
+
+def scheme_vectors(schemes: List[Dict]) -> np.ndarray:
+    """One row per scheme; dot products are weighted cosine similarities"""
+    texts = [
+        [term for term in tokenize(" ".join(str(s.get(field) or "") for field in TEXT_FIELDS))
+         if len(term) > 2 and not term.isdigit()]
+        for s in schemes
+    ]
+    tags = [_tags(s.get("beneficiary_tags")) for s in schemes]
+    categories = [[s["category"]] if s.get("category") else [] for s in schemes]
+    return np.hstack([
+        _block(texts, TEXT_WEIGHT, max_df=MAX_DOCUMENT_FREQUENCY),
+        _block(tags, TAG_WEIGHT),
+        _block(categories, CATEGORY_WEIGHT, idf=False),
+    ])
+
+
+def nearest_neighbours(schemes: List[Dict], k: int = RELATED_K) -> Dict[int, List[Tuple[int, float]]]:
+    """Top-k most similar schemes of every scheme, most similar first"""
+    if len(schemes) < 2:
+        return {s["id"]: [] for s in schemes}
+    ids = np.array([s["id"] for s in schemes])
+    vectors = scheme_vectors(schemes)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -np.inf)
+
+    k = min(k, len(schemes) - 1)
+    # argpartition finds the k best per row in linear time; only those k get sorted
+    top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(similarity, top, axis=1)
+    order = np.lexsort((ids[top], -top_scores), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    return {
+        int(ids[row]): [
+            (int(ids[column]), round(float(score), 4))
+            for column, score in zip(top[row], top_scores[row]) if score > 0
+        ]
+        for row in range(len(schemes))
+    }
+
+
+def relation_rows(schemes: Iterable, k: int = RELATED_K) -> List[Dict]:
+    """scheme_relations rows for full scheme rows"""
+    neighbours = nearest_neighbours([dict(s) for s in schemes], k)
+    return [
+        {"scheme_id": scheme_id, "rank": rank, "related_id": related_id, "score": score}
+        for scheme_id, related in neighbours.items()
+        for rank, (related_id, score) in enumerate(related)
+    ]
+
+
+# ============================================================================
+# IN-MEMORY GRAPH
+# ============================================================================
+
+_graph: Optional[Dict[int, Tuple[Tuple[int, float], ...]]] = None
+
+
+def get_graph() -> Optional[Dict[int, Tuple[Tuple[int, float], ...]]]:
+    """Scheme id -> ((related id, score), ...) best first, or None until loaded"""
+    return _graph
+
+
+@catalogue.on_change
+def rebuild(db, version: str) -> None:
+    global _graph
+    started = time.perf_counter()
+    source = "table"
+    try:
+        rows = db.execute(text("""
+            SELECT scheme_id, related_id, score
+            FROM scheme_relations
+            ORDER BY scheme_id, rank
+        """)).fetchall()
+        scheme_ids = [row.id for row in db.execute(text("SELECT id FROM schemes")).fetchall()]
+    except Exception:
+        # Database imported before relations were computed
+        db.rollback()
+        rows, scheme_ids = [], []
+
+    graph: Dict[int, List[Tuple[int, float]]] = {scheme_id: [] for scheme_id in scheme_ids}
+    for row in rows:
+        if row.scheme_id in graph:
+            graph[row.scheme_id].append((row.related_id, row.score))
+
+    if not rows:
+        source = "computed"
+        schemes = db.execute(text(f"""
+            SELECT id, category, beneficiary_tags, {", ".join(TEXT_FIELDS)}
+            FROM schemes
+        """)).mappings().fetchall()
+        graph = nearest_neighbours([dict(s) for s in schemes])
+
+    _graph = {scheme_id: tuple(related) for scheme_id, related in graph.items()}
+    metrics.log_event(
+        logger, logging.INFO, "related_graph_built",
+        seconds=round(time.perf_counter() - started, 3), schemes=len(_graph), source=source,
+    )
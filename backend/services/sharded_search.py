@@ -0,0 +1,447 @@
+"""
+Scatter-gather chat search over catalogue shards in a persistent process pool.
+
+With every state's schemes the catalogue grows to tens of thousands of rows,
+and ranking them in Python would run on one core under the GIL. Here the
+catalogue is split by scheme id into one shard per worker. Each shard is a
+single shared memory block holding, per searchable column, the lowercased
+UTF-8 text of its schemes separated by NUL bytes and the offset where each
+scheme starts, plus the scheme ids and category codes. A search sends the
+query to every shard at once; a worker maps the block (once per shard), finds
+the schemes whose columns contain the query with a substring search over the
+mapped memory (a regex only when the query has LIKE wildcards), scores them
+with the same weights as the SQL relevance score in routes/chatbot.py and
+returns its top k. The caller merges the per-shard top k lists, so results
+match the SQL search exactly.
+
+Workers are spawned once and kept; shards are rebuilt per catalogue version.
+Sharding by scheme id keeps the shards the same size, which sharding by state
+or scheme type would not: most schemes share a handful of values.
+
+Off by default (PARALLEL_SCORING_WORKERS=0). Small catalogues stay on SQL,
+where a search is cheaper than the fan-out (PARALLEL_SCORING_MIN_SCHEMES).
+"""
+import bisect
+import concurrent.futures
+import functools
+import heapq
+import itertools
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from sqlalchemy import text
+
+from database import translations
+from models.schemes import TRANSLATED_FIELDS
+from services import catalogue, metrics
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_SCORING_WORKERS = int(os.getenv("PARALLEL_SCORING_WORKERS", "0"))
+PARALLEL_SCORING_MIN_SCHEMES = int(os.getenv("PARALLEL_SCORING_MIN_SCHEMES", "5000"))
+
+LANGUAGES = translations.WIDE_LANGUAGES
+
+# Relevance score of a match in each column; keep in step with iter_search_database
+FIELD_WEIGHTS = (
+    ("scheme_name", 100),
+    ("category", 90),
+    ("beneficiary_tags", 80),
+    ("scheme_type", 70),
+    ("description", 60),
+    ("eligibility", 40),
+    ("benefits", 30),
+    ("application_process", 20),
+)
+# Extracted keywords add a bonus when they appear in any of these columns
+KEYWORD_FIELDS = ("beneficiary_tags", "category")
+KEYWORD_BONUS = 50
+
+SEPARATOR = b"\x00"
+
+
+class SchemeRow(NamedTuple):
+    """A search result row, with the attributes shape_search_row reads"""
+    id: int
+    scheme_name: Optional[str]
+    description: Optional[str]
+    eligibility: Optional[str]
+    benefits: Optional[str]
+    application_process: Optional[str]
+    scheme_type: Optional[str]
+    category: Optional[str]
+    official_link: Optional[str]
+    beneficiary_tags: Optional[str]
+    score: int = 0
+
+
+def _column(field: str, language: str) -> str:
+    return f"{field}_{language}" if field in TRANSLATED_FIELDS else field
+
+
+# ============================================================================
+# SHARDS
+# ============================================================================
+
+class Shard(NamedTuple):
+    """Where one shard's arrays live in its shared memory block; small enough to send with every query"""
+    name: str  # shared memory block
+    generation: int
+    size: int  # schemes
+    ids: int  # offset of the int64 scheme ids
+    categories: int  # offset of the int32 category codes
+    # column -> (text offset, text length, int64 starts offset, uint8 not-NULL flags offset)
+    columns: Dict[str, Tuple[int, int, int, int]]
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _write_shard(rows: Dict[str, List[SchemeRow]], category_codes: Dict[str, int],
+                 generation: int, index: int) -> Tuple[Shard, shared_memory.SharedMemory]:
+    """Copy one shard's rows (the same schemes in every language) into a new shared memory block"""
+    base = rows[LANGUAGES[0]]
+    blobs = {}
+    for language in LANGUAGES:
+        for field, _ in FIELD_WEIGHTS:
+            column = _column(field, language)
+            if column in blobs:
+                continue
+            values = [getattr(row, field) for row in rows[language]]
+            texts = [(value or "").replace("\x00", "").lower().encode("utf-8") for value in values]
+            starts = np.zeros(len(texts) + 1, dtype=np.int64)
+            # Each text is followed by a separator, so the next one starts one byte later
+            np.cumsum([len(value) + 1 for value in texts], out=starts[1:])
+            # NULL never matches LIKE, not even '%%'
+            present = np.array([value is not None for value in values], dtype=np.uint8)
+            blobs[column] = (SEPARATOR.join(texts) + SEPARATOR, starts, present)
+
+    layout = {}
+    offset = 0
+    ids_offset = offset
+    offset = _align(offset + 8 * len(base))
+    categories_offset = offset
+    offset = _align(offset + 4 * len(base))
+    for column, (blob, starts, present) in blobs.items():
+        starts_offset = offset
+        present_offset = _align(starts_offset + starts.nbytes)
+        text_offset = _align(present_offset + present.nbytes)
+        layout[column] = (text_offset, len(blob), starts_offset, present_offset)
+        offset = _align(text_offset + len(blob))
+
+    name = f"sahayata_{os.getpid()}_{generation}_{index}"
+    block = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+    np.ndarray(len(base), dtype=np.int64, buffer=block.buf, offset=ids_offset)[:] = [row.id for row in base]
+    np.ndarray(len(base), dtype=np.int32, buffer=block.buf, offset=categories_offset)[:] = [
+        category_codes[row.category or ""] for row in base
+    ]
+    for column, (blob, starts, present) in blobs.items():
+        text_offset, length, starts_offset, present_offset = layout[column]
+        np.ndarray(len(starts), dtype=np.int64, buffer=block.buf, offset=starts_offset)[:] = starts
+        np.ndarray(len(present), dtype=np.uint8, buffer=block.buf, offset=present_offset)[:] = present
+        block.buf[text_offset:text_offset + length] = blob
+    return Shard(name, generation, len(base), ids_offset, categories_offset, layout), block
+
+
+class ShardedCatalogue:
+    """The catalogue split into shared memory shards, plus the full rows to build results from"""
+
+    def __init__(self, version: str, generation: int, shards: List[Shard],
+                 blocks: List[shared_memory.SharedMemory], rows: Dict[str, Dict[int, SchemeRow]],
+                 category_codes: Dict[str, int]):
+        self.version = version
+        self.generation = generation
+        self.shards = shards
+        self.blocks = blocks
+        self.rows = rows
+        self.category_codes = category_codes
+
+    @property
+    def size(self) -> int:
+        return sum(shard.size for shard in self.shards)
+
+    def close(self) -> None:
+        """Remove the shared memory blocks; workers still mapping them keep them until they let go"""
+        for block in self.blocks:
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self.blocks = []
+
+
+_generations = itertools.count(1)
+
+
+def build(version: str, rows: Dict[str, List[SchemeRow]], shard_count: int) -> ShardedCatalogue:
+    """Split rows (the same schemes, in the same order, per language) into shard_count shards by id"""
+    shard_count = max(1, shard_count)
+    generation = next(_generations)
+    category_codes = {
+        name: code for code, name in enumerate(sorted({row.category or "" for row in rows[LANGUAGES[0]]}))
+    }
+
+    shards, blocks = [], []
+    try:
+        for index in range(shard_count):
+            shard_rows = {
+                language: [row for row in language_rows if row.id % shard_count == index]
+                for language, language_rows in rows.items()
+            }
+            shard, block = _write_shard(shard_rows, category_codes, generation, index)
+            shards.append(shard)
+            blocks.append(block)
+    except Exception:
+        for block in blocks:
+            block.close()
+            block.unlink()
+        raise
+
+    by_id = {language: {row.id: row for row in language_rows} for language, language_rows in rows.items()}
+    return ShardedCatalogue(version, generation, shards, blocks, by_id, category_codes)
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+# Shards this process has mapped: name -> (block, ids, category codes, {column: (text offset, length, starts, not-NULL flags)})
+_mapped: Dict[str, tuple] = {}
+_mapped_generation = 0
+
+
+def _map(shard: Shard) -> tuple:
+    global _mapped_generation
+    mapped = _mapped.get(shard.name)
+    if mapped is not None:
+        return mapped
+    if shard.generation != _mapped_generation:
+        # A new catalogue version: let go of the old shards so their memory can be freed
+        for old in list(_mapped):
+            block = _mapped.pop(old)[0]
+            try:
+                block.close()
+            except BufferError:
+                pass
+        _mapped_generation = shard.generation
+
+    block = shared_memory.SharedMemory(name=shard.name)
+    ids = np.ndarray(shard.size, dtype=np.int64, buffer=block.buf, offset=shard.ids)
+    codes = np.ndarray(shard.size, dtype=np.int32, buffer=block.buf, offset=shard.categories)
+    columns = {
+        # starts as a memoryview of int64: bisect reads its items much faster than a NumPy array's
+        column: (text_offset, length,
+                 block.buf[starts_offset:starts_offset + 8 * (shard.size + 1)].cast("q"),
+                 np.ndarray(shard.size, dtype=np.bool_, buffer=block.buf, offset=present_offset))
+        for column, (text_offset, length, starts_offset, present_offset) in shard.columns.items()
+    }
+    mapped = _mapped[shard.name] = (block, ids, codes, columns)
+    return mapped
+
+
+def _search(memory: mmap.mmap, view: memoryview, pattern: Union[bytes, "re.Pattern"], start: int, end: int) -> int:
+    """Offset of the first match of pattern within memory[start:end], or -1"""
+    if isinstance(pattern, bytes):
+        # A plain substring search, several times faster than the regex engine on UTF-8 text
+        return memory.find(pattern, start, end)
+    match = pattern.search(view, start, end)
+    return match.start() if match else -1
+
+
+def _matching(memory: mmap.mmap, column: tuple, pattern: Union[bytes, "re.Pattern"]) -> np.ndarray:
+    """Positions of the schemes whose text in column contains pattern"""
+    text_offset, length, starts, present = column
+    # Stop before the last separator: wildcard-only patterns match the empty string there
+    end = text_offset + length - 1
+    found = []
+    with memoryview(memory) as view:
+        position = _search(memory, view, pattern, text_offset, end)
+        while position != -1:
+            doc = bisect.bisect_right(starts, position - text_offset) - 1
+            found.append(doc)
+            # One hit per scheme is enough: continue from the next one
+            position = _search(memory, view, pattern, text_offset + starts[doc + 1], end)
+    found = np.array(found, dtype=np.int64)
+    return found[present[found]]
+
+
+# One UTF-8 encoded character that is not the separator
+_ANY_CHARACTER = rb"(?:[\x01-\x7f]|[\xc0-\xff][\x80-\xbf]*)"
+
+
+@functools.lru_cache(maxsize=1024)
+def like_pattern(value: str) -> Union[bytes, "re.Pattern"]:
+    """What finds '%value%' as Postgres LIKE does: the bytes to look for, or a regex when
+    value has % or _ wildcards (backslash escapes the next character)"""
+    literal, parts = [], []
+    wildcards = False
+    chars = iter(value.replace("\x00", ""))
+    for ch in chars:
+        if ch == "\\":
+            ch = next(chars, "\\")
+        elif ch in "%_":
+            wildcards = True
+            parts.append(rb"[^\x00]*" if ch == "%" else _ANY_CHARACTER)
+            continue
+        literal.append(ch.encode("utf-8"))
+        parts.append(re.escape(literal[-1]))
+    return re.compile(b"".join(parts)) if wildcards else b"".join(literal)
+
+
+def score_shard(shard: Shard, language: str, query: str, keywords: Sequence[str],
+                category_codes: Optional[Sequence[int]], limit: int) -> List[Tuple[int, int]]:
+    """[(score, scheme id)] of the shard's top limit matches, best first"""
+    block, ids, codes, columns = _map(shard)
+    memory = block.buf.obj
+    scores = np.zeros(shard.size, dtype=np.int32)
+    matched = np.zeros(shard.size, dtype=bool)
+
+    pattern = like_pattern(query)
+    for field, weight in FIELD_WEIGHTS:
+        found = _matching(memory, columns[_column(field, language)], pattern)
+        scores[found] += weight
+        matched[found] = True
+
+    if keywords:
+        bonus = np.zeros(shard.size, dtype=bool)
+        for keyword in keywords:
+            keyword_pattern = like_pattern(keyword)
+            for field in KEYWORD_FIELDS:
+                bonus[_matching(memory, columns[field], keyword_pattern)] = True
+        scores[bonus] += KEYWORD_BONUS
+        matched |= bonus
+
+    if category_codes is not None:
+        matched &= np.isin(codes, category_codes)
+
+    candidates = np.flatnonzero(matched)
+    if not len(candidates):
+        return []
+    # Best score first, then lowest id, as ORDER BY score DESC, id ASC
+    order = np.lexsort((ids[candidates], -scores[candidates]))[:limit]
+    top = candidates[order]
+    return list(zip(scores[top].tolist(), ids[top].tolist()))
+
+
+# ============================================================================
+# POOL
+# ============================================================================
+
+_catalogue: Optional[ShardedCatalogue] = None
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def start_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Persistent worker processes; spawned, not forked, so they inherit no threads or connections"""
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = start_pool(PARALLEL_SCORING_WORKERS)
+        return _pool
+
+
+def scatter_gather(pool: Optional[concurrent.futures.Executor], sharded: ShardedCatalogue, language: str,
+                   query: str, keywords: Iterable[str] = (), category_names: Optional[Iterable[str]] = None,
+                   limit: int = 10) -> List[SchemeRow]:
+    """Score every shard (in pool, or in this process without one) and merge their top limit lists"""
+    codes = None
+    if category_names is not None:
+        codes = tuple(sharded.category_codes[name] for name in category_names if name in sharded.category_codes)
+
+    args = (language, query, tuple(keywords), codes, limit)
+    if pool is None:
+        results = [score_shard(shard, *args) for shard in sharded.shards]
+    else:
+        futures = [pool.submit(score_shard, shard, *args) for shard in sharded.shards]
+        results = [future.result() for future in futures]
+
+    rows = sharded.rows[language]
+    top = heapq.nsmallest(limit, ((-score, scheme_id) for result in results for score, scheme_id in result))
+    return [rows[scheme_id]._replace(score=-score) for score, scheme_id in top]
+
+
+def available() -> bool:
+    """True while a sharded catalogue is loaded"""
+    return _catalogue is not None
+
+
+def search(query: str, language: str, keywords: Set[str], category_names: Optional[List[str]] = None,
+           limit: int = 10) -> Optional[List[SchemeRow]]:
+    """Ranked matches for a lowercased query, or None when the search should run in SQL"""
+    sharded = _catalogue
+    if sharded is None or language not in sharded.rows:
+        return None
+    try:
+        return scatter_gather(_get_pool(), sharded, language, query, sorted(keywords), category_names, limit)
+    except Exception:
+        # E.g. the shards were replaced while this search was in flight
+        logger.exception("sharded_search_failed query=%r language=%r", query, language)
+        return None
+
+
+def _language_rows(db, language: str) -> List[SchemeRow]:
+    """Every scheme in one language, read from the same source the SQL search reads"""
+    if translations.uses_table(language):
+        source = f"({translations.localized_schemes_sql()}) AS schemes"
+        params = {"lang": language, "default_lang": translations.DEFAULT_LANGUAGE}
+        columns = ", ".join(TRANSLATED_FIELDS)
+    else:
+        source = "schemes"
+        params = {}
+        columns = ", ".join(f"{field}_{language} AS {field}" for field in TRANSLATED_FIELDS)
+    result = db.execute(text(f"""
+        SELECT id, {columns}, scheme_type, category, official_link, beneficiary_tags
+        FROM {source}
+        ORDER BY id
+    """), params).mappings()
+    return [SchemeRow(**row) for row in result]
+
+
+@catalogue.on_change
+def rebuild(db, version: str) -> None:
+    global _catalogue
+    if PARALLEL_SCORING_WORKERS <= 0:
+        return
+    previous = _catalogue
+    count = db.execute(text("SELECT COUNT(*) FROM schemes")).scalar()
+    if count < PARALLEL_SCORING_MIN_SCHEMES:
+        _catalogue = None
+    else:
+        started = time.perf_counter()
+        rows = {language: _language_rows(db, language) for language in LANGUAGES}
+        _catalogue = build(version, rows, PARALLEL_SCORING_WORKERS)
+        _get_pool()
+        metrics.log_event(
+            logger, logging.INFO, "sharded_catalogue_built",
+            seconds=round(time.perf_counter() - started, 3), schemes=_catalogue.size,
+            shards=len(_catalogue.shards), workers=PARALLEL_SCORING_WORKERS,
+        )
+    if previous is not None:
+        previous.close()
+
+
+def shutdown() -> None:
+    """Stop the workers and free the shards"""
+    global _catalogue, _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+    if _catalogue is not None:
+        _catalogue.close()
+        _catalogue = None
@@ -0,0 +1,84 @@
+"""
+Single-flight coalescing of identical concurrent computations.
+
+When many requests ask the same question at once (a scheme announced on TV),
+the first caller for a key becomes the leader and runs the computation; every
+caller that arrives while it is in flight waits for the leader's result
+instead of running its own. A waiter that is still waiting after the group's
+timeout gives up on the leader and computes for itself, so one stuck query
+cannot stall everyone behind it. Results are shared between callers and must
+be treated as read-only.
+
+do() is for sync code (threadpool routes); do_async() keeps the event loop
+free while leading or waiting.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from services import metrics
+
+
+class SingleFlight:
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """The in-flight future for key and whether this caller leads it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _settle(self, key: Hashable, future: Future, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        future, leader = self._join(key)
+        if leader:
+            metrics.SINGLEFLIGHT_REQUESTS.inc(self.name, "leader")
+            return self._settle(key, future, fn)
+        try:
+            result = future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            metrics.SINGLEFLIGHT_REQUESTS.inc(self.name, "timeout")
+            return fn()
+        metrics.SINGLEFLIGHT_REQUESTS.inc(self.name, "coalesced")
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Like do(), with fn run in a worker thread"""
+        future, leader = self._join(key)
+        if leader:
+            metrics.SINGLEFLIGHT_REQUESTS.inc(self.name, "leader")
+            return await asyncio.to_thread(self._settle, key, future, fn)
+        try:
+            result = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), self.timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            metrics.SINGLEFLIGHT_REQUESTS.inc(self.name, "timeout")
+            return await asyncio.to_thread(fn)
+        metrics.SINGLEFLIGHT_REQUESTS.inc(self.name, "coalesced")
+        return result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
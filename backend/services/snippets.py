@@ -0,0 +1,301 @@
+"""
+Match-aware, grapheme-safe snippets from a positional index.
+
+For every scheme, language and text field the index keeps the text, the start
+offset of each grapheme cluster and the (start, end) offsets of each token.
+It is built once per catalogue version, from the same text the search reads
+(scheme_translations for languages without wide columns). At request time a snippet needs no
+scan of the text: the query terms are looked up in the language's
+vocabulary (substring matches, as in the SQL search, cached per term), their
+offsets come from the postings, and the densest window of hits in the best
+field is cut at grapheme boundaries with the hits wrapped in markers.
+
+Grapheme clusters follow the extended rules that matter for our scripts:
+combining marks, joiners and variation selectors stay with their base, and a
+consonant after a Devanagari or Telugu virama stays in the conjunct. Slicing
+at these boundaries never leaves a dangling vowel sign or half a conjunct.
+"""
+import bisect
+import logging
+import time
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+
+from database import translations
+from services import catalogue, metrics
+from services.fuzzy import TOKEN_RE, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Chat languages
+LANGUAGES = translations.WIDE_LANGUAGES
+
+# Fields a snippet can come from, best first (same order as their search score)
+SNIPPET_FIELDS = ("description", "eligibility", "benefits", "application_process")
+
+SNIPPET_LENGTH = 160
+# Context kept before the first hit in the window
+LEADING_CONTEXT = 40
+# How far a cut may move to land on a space instead of mid-word
+WORD_SNAP = 20
+
+HIGHLIGHT = ("**", "**")
+ELLIPSIS = "…"
+
+MIN_TERM_LENGTH = 2
+
+VIRAMAS = {"\u094D", "\u0C4D"}  # Devanagari, Telugu
+JOINERS = {"\u200C", "\u200D"}  # ZWNJ, ZWJ
+ZWJ = "\u200D"
+
+
+# ============================================================================
+# GRAPHEME CLUSTERS
+# ============================================================================
+
+def grapheme_starts(value: str) -> array:
+    """Start offset of every grapheme cluster in value, followed by len(value)"""
+    starts = array("I")
+    after_virama = False
+    previous = ""
+    for i, ch in enumerate(value):
+        category = unicodedata.category(ch)
+        extends = i > 0 and (
+            category in ("Mn", "Mc", "Me")
+            or ch in JOINERS
+            or "\uFE00" <= ch <= "\uFE0F"
+            or "\U0001F3FB" <= ch <= "\U0001F3FF"  # emoji skin tone modifiers
+            or previous == ZWJ  # emoji ZWJ sequences such as 👩‍🌾
+            or (after_virama and category == "Lo")
+            or (previous == "\r" and ch == "\n")
+        )
+        if not extends:
+            starts.append(i)
+        if ch in VIRAMAS:
+            after_virama = True
+        elif ch not in JOINERS:
+            after_virama = False
+        previous = ch
+    starts.append(len(value))
+    return starts
+
+
+def _floor(starts: array, offset: int) -> int:
+    """Largest cluster boundary at or before offset"""
+    return starts[bisect.bisect_right(starts, offset) - 1]
+
+
+def _ceil(starts: array, offset: int) -> int:
+    """Smallest cluster boundary at or after offset"""
+    return starts[min(bisect.bisect_left(starts, offset), len(starts) - 1)]
+
+
+def truncate(value: str, limit: int, ellipsis: str = "...") -> str:
+    """value cut to at most limit characters without splitting a grapheme cluster"""
+    if len(value) <= limit:
+        return value
+    # Only the clusters around the cut matter
+    cut = _floor(grapheme_starts(value[:limit + 16]), limit)
+    return value[:cut] + ellipsis
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class FieldIndex(NamedTuple):
+    text: str
+    graphemes: array
+    postings: Dict[str, Tuple[Tuple[int, int], ...]]  # lowercased token -> (start, end) offsets
+
+
+def index_field(value: str) -> FieldIndex:
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for match in TOKEN_RE.finditer(value):
+        postings.setdefault(match.group().lower(), []).append(match.span())
+    return FieldIndex(value, grapheme_starts(value),
+                      {token: tuple(spans) for token, spans in postings.items()})
+
+
+# Query terms whose matching tokens are remembered per index
+MATCH_CACHE_SIZE = 4096
+
+
+class SnippetIndex(NamedTuple):
+    version: str
+    fields: Dict[Tuple[int, str, str], FieldIndex]  # (scheme id, language, field)
+    vocabulary: Dict[str, Tuple[str, ...]]  # language -> every indexed token
+    matches: Dict[Tuple[str, str], Tuple[str, ...]]  # (language, term) -> tokens containing the term
+
+    def matching_tokens(self, language: str, term: str) -> Tuple[str, ...]:
+        key = (language, term)
+        tokens = self.matches.get(key)
+        if tokens is None:
+            tokens = tuple(token for token in self.vocabulary.get(language, ()) if term in token)
+            if len(self.matches) >= MATCH_CACHE_SIZE:
+                self.matches.clear()
+            self.matches[key] = tokens
+        return tokens
+
+
+_index: Optional[SnippetIndex] = None
+
+
+def get_index() -> Optional[SnippetIndex]:
+    return _index
+
+
+def _field_rows(db, language: str):
+    """(id, field values...) per scheme in one language, from the same source the search reads"""
+    if translations.uses_table(language):
+        source = f"({translations.localized_schemes_sql(SNIPPET_FIELDS)}) AS schemes"
+        columns = ", ".join(SNIPPET_FIELDS)
+        params = {"lang": language, "default_lang": translations.DEFAULT_LANGUAGE}
+    else:
+        source = "schemes"
+        columns = ", ".join(f"{field}_{language}" for field in SNIPPET_FIELDS)
+        params = {}
+    return db.execute(text(f"SELECT id, {columns} FROM {source}"), params).fetchall()
+
+
+@catalogue.on_change
+def rebuild(db, version: str) -> None:
+    global _index
+    started = time.perf_counter()
+    fields = {}
+    vocabulary: Dict[str, set] = {language: set() for language in LANGUAGES}
+    schemes = 0
+    for language in LANGUAGES:
+        rows = _field_rows(db, language)
+        schemes = len(rows)
+        for scheme_id, *values in rows:
+            for field, value in zip(SNIPPET_FIELDS, values):
+                if value:
+                    entry = index_field(value)
+                    fields[(scheme_id, language, field)] = entry
+                    vocabulary[language].update(entry.postings)
+
+    _index = SnippetIndex(
+        version, fields, {language: tuple(sorted(words)) for language, words in vocabulary.items()}, {}
+    )
+    metrics.log_event(
+        logger, logging.INFO, "snippet_index_built",
+        seconds=round(time.perf_counter() - started, 3), schemes=schemes, fields=len(fields),
+    )
+
+
+# ============================================================================
+# SNIPPETS
+# ============================================================================
+
+class Snippet(NamedTuple):
+    field: str
+    text: str  # with HIGHLIGHT markers around matched terms
+    matched: Tuple[str, ...]  # query terms found in the window
+
+
+def query_terms(query: str, extra: Iterable[str] = (), stopwords: Iterable[str] = ()) -> List[str]:
+    """Distinct lowercased search terms of a query, plus extra terms such as matched keywords"""
+    stopwords = set(stopwords)
+    terms = []
+    for term in tokenize(query) + [term.lower() for term in extra]:
+        if len(term) >= MIN_TERM_LENGTH and term not in stopwords and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _best_window(hits: List[Tuple[int, int, str]], length: int) -> Tuple[int, int, int]:
+    """(distinct terms, first hit, last hit) of the window of at most length characters with most terms"""
+    best = (0, 0, 0)
+    first = 0
+    for last in range(len(hits)):
+        while hits[last][1] - hits[first][0] > length:
+            first += 1
+        distinct = len({term for _, _, term in hits[first:last + 1]})
+        if distinct > best[0] or (distinct == best[0] and last - first > best[2] - best[1]):
+            best = (distinct, first, last)
+    return best
+
+
+def _hits(index: SnippetIndex, entry: FieldIndex, language: str, terms: List[str]) -> List[Tuple[int, int, str]]:
+    hits = []
+    for term in terms:
+        for token in index.matching_tokens(language, term):
+            for start, end in entry.postings.get(token, ()):
+                hits.append((start, end, term))
+    hits.sort()
+    return hits
+
+
+def _cut(entry: FieldIndex, start: int, end: int) -> Tuple[int, int]:
+    """Window [start, end) moved onto grapheme boundaries, and onto spaces when one is close"""
+    value = entry.text
+    start = _floor(entry.graphemes, max(start, 0))
+    end = _ceil(entry.graphemes, min(end, len(value)))
+    if start > 0:
+        space = value.find(" ", start, start + WORD_SNAP)
+        if space != -1:
+            start = space + 1
+    if end < len(value):
+        space = value.rfind(" ", end - WORD_SNAP, end)
+        if space > start:
+            end = space
+    return start, end
+
+
+def _render(entry: FieldIndex, start: int, end: int, hits: List[Tuple[int, int, str]]) -> str:
+    value = entry.text
+    pieces = [ELLIPSIS] if start > 0 else []
+    position = start
+    for hit_start, hit_end, _ in hits:
+        if hit_start < position or hit_end > end:
+            continue
+        pieces.append(value[position:hit_start])
+        pieces.append(f"{HIGHLIGHT[0]}{value[hit_start:hit_end]}{HIGHLIGHT[1]}")
+        position = hit_end
+    pieces.append(value[position:end].rstrip())
+    if end < len(value):
+        pieces.append(ELLIPSIS)
+    return "".join(pieces).strip()
+
+
+def snippet(scheme_id: int, language: str, terms: List[str], length: int = SNIPPET_LENGTH) -> Optional[Snippet]:
+    """Window around the best-matching region of the scheme's best field, or None if it is not indexed"""
+    index = _index
+    if index is None:
+        return None
+
+    best = None
+    for priority, field in enumerate(SNIPPET_FIELDS):
+        entry = index.fields.get((scheme_id, language, field))
+        if entry is None:
+            continue
+        hits = _hits(index, entry, language, terms) if terms else []
+        if not hits:
+            if best is None:
+                # Nothing matched anywhere yet: the opening of the first field present
+                best = (0, priority, field, entry, [], 0, 0)
+            continue
+        distinct, first, last = _best_window(hits, length)
+        if best is None or distinct > best[0]:
+            best = (distinct, priority, field, entry, hits, first, last)
+
+    if best is None:
+        return None
+    distinct, _, field, entry, hits, first, last = best
+    if not hits:
+        start, end = _cut(entry, 0, length)
+        return Snippet(field, _render(entry, start, end, []), ())
+
+    window = hits[first:last + 1]
+    span_start, span_end = window[0][0], window[-1][1]
+    # Lead with some context, then fill the rest of the length after the hits
+    start = max(0, min(span_start - LEADING_CONTEXT, span_end - length))
+    start, end = _cut(entry, start, start + length)
+    if span_end > end:
+        end = _ceil(entry.graphemes, span_end)
+    matched = tuple(sorted({term for hit_start, hit_end, term in window if hit_start >= start and hit_end <= end}))
+    return Snippet(field, _render(entry, start, end, window), matched)
@@ -0,0 +1,139 @@
+"""
+Stateless signed session tokens.
+
+Tokens are `<kid>.<payload>.<signature>` where payload is base64url JSON and
+signature is HMAC-SHA256 over `<kid>.<payload>`. Verification is pure CPU
+work, and a small LRU of recently verified tokens means repeat calls with the
+same token skip even the HMAC, so authenticated requests need no users-table
+lookup and no bcrypt.
+
+Keys come from AUTH_SIGNING_KEYS as "kid:secret,kid:secret". The first key
+signs new tokens; the others are still accepted, which allows rotation:
+prepend a new key, deploy, and drop the old one once its tokens have expired.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", str(15 * 60)))
+REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL", str(30 * 24 * 3600)))
+VERIFY_CACHE_SIZE = int(os.getenv("TOKEN_VERIFY_CACHE_SIZE", "10000"))
+
+
+class TokenError(Exception):
+    """Raised when a token is malformed, forged, expired or of the wrong type"""
+
+
+def _load_keys() -> "OrderedDict[str, bytes]":
+    keys = OrderedDict()
+    for entry in os.getenv("AUTH_SIGNING_KEYS", "").split(","):
+        if ":" in entry:
+            kid, secret = entry.strip().split(":", 1)
+            keys[kid] = secret.encode("utf-8")
+    if not keys:
+        logger.warning("AUTH_SIGNING_KEYS not set; using an ephemeral key, tokens will not survive restarts")
+        keys["ephemeral"] = secrets.token_bytes(32)
+    return keys
+
+
+_keys = _load_keys()
+
+
+def set_signing_keys(keys: Dict[str, bytes]) -> None:
+    """Replace the key ring (first entry signs) and drop cached verifications"""
+    global _keys
+    _keys = OrderedDict(keys)
+    with _cache_lock:
+        _verified.clear()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(kid: str, payload: str) -> str:
+    return _b64encode(hmac.new(_keys[kid], f"{kid}.{payload}".encode("ascii"), hashlib.sha256).digest())
+
+
+def create_token(claims: Dict, token_type: str, ttl: int) -> str:
+    kid = next(iter(_keys))
+    now = int(time.time())
+    body = dict(claims, typ=token_type, iat=now, exp=now + ttl)
+    payload = _b64encode(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+    return f"{kid}.{payload}.{_sign(kid, payload)}"
+
+
+def issue_token_pair(user_id: int, username: str, name: str) -> Dict:
+    claims = {"sub": user_id, "usr": username, "name": name}
+    return {
+        "access_token": create_token(claims, "access", ACCESS_TOKEN_TTL),
+        "refresh_token": create_token(claims, "refresh", REFRESH_TOKEN_TTL),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL,
+    }
+
+
+# ============================================================================
+# VERIFICATION
+# ============================================================================
+
+_verified: "OrderedDict[str, Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def verify_token(token: str, token_type: str = "access") -> Dict:
+    """Return the token's claims or raise TokenError"""
+    with _cache_lock:
+        claims = _verified.get(token)
+        if claims is not None:
+            _verified.move_to_end(token)
+
+    if claims is None:
+        metrics.cache_miss("token_verify")
+        claims = _verify_signature(token)
+        with _cache_lock:
+            _verified[token] = claims
+            if len(_verified) > VERIFY_CACHE_SIZE:
+                _verified.popitem(last=False)
+    else:
+        metrics.cache_hit("token_verify")
+
+    # Expiry and type are checked on every call, cached or not
+    if claims.get("exp", 0) < time.time():
+        raise TokenError("Token expired")
+    if claims.get("typ") != token_type:
+        raise TokenError("Wrong token type")
+    return claims
+
+
+def _verify_signature(token: str) -> Dict:
+    if not token.isascii():
+        raise TokenError("Malformed token")
+    try:
+        kid, payload, signature = token.split(".")
+    except ValueError:
+        raise TokenError("Malformed token")
+    if kid not in _keys:
+        raise TokenError("Unknown signing key")
+    if not hmac.compare_digest(signature.encode("utf-8"), _sign(kid, payload).encode("ascii")):
+        raise TokenError("Invalid signature")
+    try:
+        return json.loads(_b64decode(payload))
+    except ValueError:
+        raise TokenError("Malformed token")
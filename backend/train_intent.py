@@ -0,0 +1,426 @@
+"""
+Train the chat intent/category classifier shipped as services/intent_model.npz.
+
+    python train_intent.py [--csv SahayataDatasetFinal.csv] [--out services/intent_model.npz]
+
+Training data is built offline, with no database:
+
+- every intent keyword in INTENT_KEYWORDS, alone and in short query templates,
+  labelled with its intent and that intent's category
+- each scheme's name and the first sentence of its description in en/te/hi,
+  labelled with the scheme's category (and its intent, where the category has one)
+- natural phrasings without any intent keyword ("my paddy fields were
+  flooded"), labelled with their intent and category
+- greetings, generic questions and random junk, labelled with no intent
+
+A seeded 20% of the examples is held out to report accuracy, then the model
+is refit on everything and written. EVAL_MESSAGES, keyword-less messages
+never trained on, and a fresh batch of junk then report how often the
+written model routes the messages it exists for to the right intent and how
+often it routes garbage.
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from import_data import build_scheme_rows
+from routes.chatbot import INTENT_KEYWORDS, REFINEMENT_STOPWORDS, extract_query_keywords
+from services import intent
+from services.categories import CATEGORIES, resolve
+
+# Category each intent's schemes are filed under
+INTENT_CATEGORIES = {
+    "education": "education-learning",
+    "agriculture": "agriculture-rural-environment",
+    "women": "women-child",
+    "health": "health-wellness",
+    "pension": "social-welfare-empowerment",
+    "employment": "skills-employment",
+    "housing": "housing-shelter",
+    "financial": "banking-financial-services-insurance",
+}
+
+# Social welfare covers more than pensions, so it does not imply an intent
+CATEGORY_INTENTS = {slug: name for name, slug in INTENT_CATEGORIES.items() if name != "pension"}
+
+JUNK_EXAMPLES = 400
+# Natural messages are few next to the scheme texts, so each is fitted this many times
+NATURAL_REPEATS = 3
+
+QUERY_TEMPLATES = {
+    "en": ["{}", "{} scheme", "schemes for {}", "{} yojana", "government help for {}", "i need {}"],
+    "te": ["{}", "{} పథకం", "{} పథకాలు", "{} కోసం పథకాలు"],
+    "hi": ["{}", "{} योजना", "{} के लिए योजना", "{} योजनाएं"],
+}
+
+NO_INTENT_MESSAGES = {
+    "en": ["hi", "hello", "thanks", "thank you", "help", "ok", "what schemes are there", "show me schemes",
+           "how to apply", "what is this", "who are you", "good morning", "list all schemes", "details please"],
+    "te": ["నమస్కారం", "ధన్యవాదాలు", "సహాయం", "పథకాలు చూపించు", "ఎలా దరఖాస్తు చేయాలి", "మీరు ఎవరు"],
+    "hi": ["नमस्ते", "धन्यवाद", "मदद", "योजनाएं दिखाओ", "आवेदन कैसे करें", "आप कौन हैं"],
+}
+
+# Natural messages that name no intent keyword, written per intent
+NATURAL_MESSAGES = {
+    "en": {
+        "education": [
+            "fees for my son's engineering course", "help paying tuition fees",
+            "my daughter got admission in btech", "coaching for competitive entrance tests",
+            "free books and uniform for kids", "hostel for backward class pupils",
+            "merit award for class 10 toppers", "fee reimbursement for post matric",
+            "mid day meal for children", "i want to do my phd abroad", "support for iti diploma course",
+            "my child is in class 8, any support", "laptop for meritorious pupils",
+            "tuition support for sc st children", "what happens if i cannot pay semester fees",
+            "semester fee support", "coaching fees for upsc",
+            "my son wants to do nursing course, fees are high", "free hostel and food for pupils",
+            "bicycle for kids going to class", "fees for neet coaching",
+            "support for children of poor parents to continue classes", "overseas masters fee help",
+            "my kids need notebooks and bags", "10th class pass, what support for further classes",
+        ],
+        "agriculture": [
+            "my paddy fields were flooded", "seeds and fertiliser support", "tractor purchase help",
+            "drip sprinkler for my fields", "soil testing card", "compensation for lost paddy",
+            "cattle and dairy support", "fisherman boat support", "organic manure for my fields",
+            "price support for cotton", "rythu bharosa", "tenant cultivators support",
+            "poultry and goat rearing help", "my cotton yield failed this season",
+            "pest attack on my chilli plants", "my fields got no rain this year", "buying a power tiller",
+            "compensation for cattle death", "sheep rearing support", "borewell for my fields",
+            "storage godown for produce", "minimum support price for paddy", "hail ruined my mango orchard",
+            "tenant cultivator help", "fish pond support", "pump set for fields",
+        ],
+        "women": [
+            "i lost my husband recently", "support for a single mom", "benefits for my wife's delivery",
+            "financial help for daughter's marriage", "schemes for ladies", "safety for daughters",
+            "help after my husband died", "sukanya samriddhi for my daughter", "nutrition during pregnancy",
+            "anganwadi services for my baby", "wife of a deceased soldier", "sewing machine for ladies",
+            "stree nidhi", "i am a divorced lady with two kids", "i lost my husband, any help?",
+            "help for my wife after childbirth", "my daughter is getting married next month",
+            "schemes for ladies groups", "support for abandoned wives", "baby care allowance for new moms",
+            "single mom with kids, need help", "my husband died in an accident", "ladies tailoring support",
+            "dowry free marriage assistance", "support for transgender persons",
+        ],
+        "health": [
+            "free surgery for heart problem", "cancer patients support", "cost of dialysis",
+            "my father needs a kidney operation", "free eye check up", "vaccination for my baby",
+            "tb patients support", "aarogyasri card", "cashless cover for operations",
+            "free tests at government dispensary", "mental illness support", "generic drugs at low price",
+            "ambulance service", "covid patients help", "my son is sick and we cannot afford the bills",
+            "my father had a stroke", "free operation for my child", "costs of knee replacement surgery",
+            "free blood transfusion", "free check up for diabetes", "my wife has cancer",
+            "who pays for my surgery", "snake bite compensation", "free tests for bp and sugar",
+            "my baby is ill, any help with bills",
+        ],
+        "pension": [
+            "monthly allowance for people above 60", "my grandfather is 70 and has no income",
+            "support for people over sixty", "old people monthly payment", "elders welfare",
+            "benefits for retired government staff", "allowance for disabled persons",
+            "monthly cash for handicapped", "aasara", "vridha support", "help for my 75 year old grandpa",
+            "monthly income after 60 years", "atal scheme for unorganised sector after 60",
+            "my parents are above 65 and alone", "my grandpa has no one to look after him",
+            "monthly support for people above 60", "allowance for blind persons",
+            "support for people above seventy", "my father is 68 and not earning",
+            "monthly allowance for leprosy patients", "wheelchair for disabled", "allowance for deaf and dumb",
+        ],
+        "employment": [
+            "i am unemployed", "looking for a government vacancy", "apprenticeship for youth",
+            "start my own business", "stipend for idle youth", "mgnrega 100 days",
+            "placement after graduation", "driving course to earn a living", "help me get hired",
+            "i lost my livelihood", "ways to earn a living", "vacancies in railways",
+            "tailoring course for youth", "i need a career", "no income since the factory closed",
+            "i need to earn", "any openings for tenth pass youth", "how to get hired as a driver",
+            "support for start ups by youth", "i lost my livelihood in the lockdown",
+            "placement drive for graduates", "courses to become an electrician", "hiring in police department",
+            "i am a graduate with no income", "stipend while searching for a career",
+        ],
+        "housing": [
+            "i don't have a roof over my head", "pucca roof for my family", "plot for poor families to build",
+            "my hut was destroyed by floods", "tidco", "pmay urban", "rent support for poor",
+            "toilet for my family", "electricity connection for my hut", "i live in a kutcha dwelling",
+            "own a place to live", "slum redevelopment", "repair my old roof", "we are living on the street",
+            "we have no place to stay", "our roof leaks every monsoon", "plot for building a dwelling",
+            "rent is too high, need our own place", "my hut burnt down", "tiled roof repair support",
+            "allotment of dwelling units for poor", "pucca dwelling for tribal families",
+            "urban poor dwelling units", "support to build a toilet",
+        ],
+        "financial": [
+            "borrow for my small shop", "mudra", "interest free advance for vendors",
+            "capital for my business", "street vendors capital", "i need cash urgently",
+            "zero balance account", "debt relief", "pay off my debts", "interest waiver",
+            "seed capital for startup", "jan dhan account", "micro lending for small traders",
+            "someone to lend for my small shop", "how to borrow without collateral",
+            "i want to borrow for a tea stall", "capital for my tailoring unit", "debt waiver for poor",
+            "interest subvention", "lending for street vendors", "collateral free borrowing",
+            "i am in debt, please help", "support to open an account", "capital to buy an auto rickshaw",
+            "overdraft for my shop",
+        ],
+    },
+    "te": {
+        "education": [
+            "ఫీజు కట్టడానికి సహాయం", "నా కొడుకు ఇంజనీరింగ్ ఫీజు", "పిల్లలకు పుస్తకాలు",
+            "హాస్టల్ వసతి పిల్లలకు", "ఫీజు రీయింబర్స్‌మెంట్", "అమ్మ ఒడి", "ఫీజు కట్టలేకపోతున్నాం",
+            "పిల్లలకు హాస్టల్", "కోచింగ్ ఫీజు", "పుస్తకాలు యూనిఫారం", "పై తరగతులకు సహాయం",
+            "ఇంజనీరింగ్ ఫీజు సహాయం", "విదేశాల్లో మాస్టర్స్", "పేద పిల్లలకు ఫీజు",
+        ],
+        "agriculture": [
+            "ఎరువులు విత్తనాలు", "ట్రాక్టర్ కొనడానికి", "వరద వల్ల వరి నష్టం", "పశువుల పెంపకం",
+            "మిరప తోట నష్టం", "చేపల వేట పడవ", "వర్షాలు లేక నష్టం", "పశువులు చనిపోయాయి", "బోరు బావి కోసం",
+            "విత్తనాలు కావాలి", "గొర్రెల పెంపకం", "చేపల చెరువు", "మామిడి తోట నష్టం", "పత్తి ధర", "పాడి ఆవులు",
+        ],
+        "women": [
+            "నా భర్త చనిపోయారు", "కూతురి పెళ్లికి సహాయం", "ఆడపిల్లల కోసం", "ప్రసవం సమయంలో సహాయం",
+            "డ్వాక్రా సంఘాలు", "ఒంటరి ఆడవారికి సహాయం", "భర్త చనిపోయిన వారికి", "ఆడవారికి సహాయం",
+            "పెళ్లి ఖర్చులు", "ప్రసవం తర్వాత సహాయం", "ఒంటరి తల్లులు", "కూతురి పెళ్లి ఖర్చు", "ఆడపడుచులకు",
+            "భర్త వదిలేసిన వారికి",
+        ],
+        "health": [
+            "గుండె ఆపరేషన్ ఉచితంగా", "క్యాన్సర్ రోగులకు", "ఆరోగ్యశ్రీ", "కిడ్నీ డయాలసిస్ ఖర్చు",
+            "ఉచిత కళ్లద్దాలు", "జబ్బు ఖర్చులు భరించలేము", "గుండె జబ్బు", "క్యాన్సర్ ఖర్చులు", "ఆపరేషన్ ఖర్చు",
+            "డయాలసిస్", "కళ్లద్దాలు", "జబ్బుకు సహాయం", "సర్జరీ ఖర్చు", "మా పాపకు జబ్బు",
+        ],
+        "pension": [
+            "60 ఏళ్లు దాటిన వారికి నెలసరి", "వికలాంగులకు నెలవారీ భత్యం", "ముసలివాళ్లకు సహాయం", "ఆసరా",
+            "వయసు మీరిన వారికి భత్యం", "ముసలి వారికి నెలవారీ", "వికలాంగులకు సహాయం", "దివ్యాంగులకు",
+            "60 ఏళ్లు దాటిన వారికి", "తాతకు ఆదాయం లేదు", "అవ్వాతాతలకు", "వయసైన వారికి భత్యం",
+            "చెవిటి మూగ వారికి",
+        ],
+        "employment": [
+            "నిరుద్యోగ భృతి", "సొంత వ్యాపారం పెట్టాలి", "ప్రభుత్వ ఖాళీలు", "అప్రెంటిస్‌షిప్",
+            "యువతకు కొలువులు", "నిరుద్యోగులకు భృతి", "సంపాదన కావాలి", "కొలువు కావాలి", "ప్రభుత్వ కొలువులు",
+            "సొంత వ్యాపారం", "యువతకు సహాయం", "డ్రైవర్ కోర్సు", "ఆదాయ మార్గం",
+        ],
+        "housing": [
+            "సొంత ఇంటి స్థలం", "పక్కా కట్టడం", "గుడిసె కూలిపోయింది", "అద్దె ఇంట్లో ఉంటున్నాం", "టిడ్కో",
+            "ఇంటి పట్టా కావాలి", "ఇంటి స్థలం కావాలి", "గుడిసెలో ఉంటున్నాం", "అద్దె ఎక్కువ", "పక్కా ఇంటి కోసం",
+            "ఉండటానికి చోటు లేదు", "పైకప్పు కారుతోంది", "జగనన్న కాలనీలు", "ఇంటి పట్టాలు",
+        ],
+        "financial": [
+            "వ్యాపారానికి పెట్టుబడి", "అప్పు తీర్చాలి", "వడ్డీ లేని అప్పు", "జీరో బ్యాలెన్స్ ఖాతా", "ముద్ర",
+            "అప్పుల బాధ", "అప్పు కావాలి", "పెట్టుబడి కావాలి", "వడ్డీ మాఫీ", "అప్పుల బాధ తీరాలి",
+            "ఖాతా తెరవాలి", "దుకాణానికి అప్పు", "చిన్న వ్యాపారానికి పెట్టుబడి", "తాకట్టు లేని అప్పు",
+        ],
+    },
+    "hi": {
+        "education": [
+            "बेटे की इंजीनियरिंग फीस", "बच्चों के लिए किताबें", "कोचिंग के लिए मदद", "फीस माफी",
+            "मेधावी बच्चों को लैपटॉप", "हॉस्टल", "फीस नहीं भर पा रहे", "बच्चों के लिए हॉस्टल", "कोचिंग की फीस",
+            "किताबें और वर्दी", "आगे पढ़ने के लिए मदद", "इंजीनियरिंग की फीस", "विदेश में मास्टर्स",
+            "गरीब बच्चों की फीस",
+        ],
+        "agriculture": [
+            "खाद और बीज", "ट्रैक्टर खरीदने के लिए", "बाढ़ से धान बर्बाद", "पशुपालन", "मछुआरों के लिए नाव",
+            "ट्यूबवेल", "बारिश नहीं हुई, नुकसान", "मवेशी मर गए", "बोरवेल के लिए", "बीज चाहिए", "भेड़ पालन",
+            "मछली तालाब", "आम के बाग का नुकसान", "कपास का दाम", "दुधारू गाय",
+        ],
+        "women": [
+            "मेरे पति का निधन हो गया", "बेटी की शादी के लिए मदद", "प्रसव के समय सहायता", "बेटियों के लिए",
+            "अकेली माताएं", "तलाकशुदा औरतों के लिए", "पति की मृत्यु के बाद मदद", "औरतों के लिए मदद",
+            "शादी का खर्च", "प्रसव के बाद सहायता", "अकेली औरत", "बेटी की शादी", "बहनों के लिए",
+            "पति ने छोड़ दिया",
+        ],
+        "health": [
+            "मुफ्त ऑपरेशन", "कैंसर मरीजों के लिए", "डायलिसिस का खर्च", "आयुष्मान कार्ड", "मुफ्त चश्मा",
+            "इलाज का खर्च नहीं उठा सकते", "दिल का ऑपरेशन", "कैंसर का खर्च", "ऑपरेशन का खर्च", "डायलिसिस",
+            "चश्मा", "इलाज में मदद", "सर्जरी का खर्च", "बच्चे का इलाज",
+        ],
+        "pension": [
+            "60 साल से ऊपर के लोगों को मासिक भत्ता", "दिव्यांगों को भत्ता", "बुजुर्गों की मदद",
+            "बुढ़ापे का सहारा", "विधुर बुजुर्ग", "बूढ़े लोगों को मासिक", "विकलांगों के लिए मदद",
+            "दिव्यांग भत्ता", "60 साल से ऊपर", "दादा की आमदनी नहीं", "बुजुर्ग माता पिता",
+            "बड़ी उम्र के लोगों को भत्ता", "अंधे लोगों के लिए",
+        ],
+        "employment": [
+            "बेकार युवाओं को भत्ता", "अपना व्यवसाय शुरू करना", "सरकारी भर्ती", "अप्रेंटिसशिप", "मनरेगा",
+            "फैक्ट्री बंद हो गई, आमदनी नहीं", "बेकारी भत्ता", "कमाई चाहिए", "सरकारी भर्ती कब", "अपना धंधा",
+            "युवाओं को मदद", "ड्राइवर का कोर्स", "आमदनी का जरिया", "नौजवानों के लिए भर्ती",
+        ],
+        "housing": [
+            "पक्की छत", "झोपड़ी टूट गई", "किराए के कमरे में रहते हैं", "शौचालय बनवाना", "रहने की जगह नहीं",
+            "सिर पर छत चाहिए", "रहने को जगह चाहिए", "झोपड़ी में रहते हैं", "किराया बहुत ज्यादा",
+            "पक्की छत चाहिए", "छत टपकती है", "प्लॉट चाहिए", "शौचालय", "अपनी छत",
+        ],
+        "financial": [
+            "व्यापार के लिए पूंजी", "कर्ज चुकाना है", "ब्याज मुक्त उधार", "जीरो बैलेंस खाता", "मुद्रा",
+            "साहूकार का कर्ज", "उधार चाहिए", "पूंजी चाहिए", "ब्याज माफी", "कर्ज से छुटकारा", "खाता खोलना है",
+            "दुकान के लिए उधार", "छोटे व्यापार के लिए पूंजी", "बिना गारंटी उधार",
+        ],
+    },
+}
+
+# Held out from training: keyword-less messages the router exists for
+EVAL_MESSAGES = {
+    "en": {
+        "education": ["who pays for my son's btech fees", "my kid wants to become an engineer, any help with fees",
+                      "free coaching for neet", "stipend for pupils from poor families", "books for class 5 children"],
+        "agriculture": ["drought destroyed my chilli plants", "help buying a water pump for my fields",
+                        "fertiliser for sugarcane", "fishermen assistance during ban period", "dairy cows support"],
+        "women": ["my husband passed away, any help?", "marriage assistance for my daughter",
+                  "support for lactating moms", "schemes for rural ladies", "benefits for a deserted wife"],
+        "health": ["my dad needs bypass surgery", "who pays for cancer drugs", "free spectacles for poor people",
+                   "help with dialysis costs", "heart operation for my baby"],
+        "pension": ["my grandpa is 80 with no income", "allowance for persons with disability",
+                    "cash support for elders living alone", "monthly payment for people past sixty"],
+        "employment": ["i have no income source, need to earn", "any openings for graduates",
+                       "i want to start a small shop of my own", "recruitment drives near me",
+                       "how to get hired in government"],
+        "housing": ["we live in a rented room, want our own place", "the cyclone blew away our hut",
+                    "site for building a dwelling", "roof for my family", "jagananna colonies"],
+        "financial": ["need capital to open a tea stall", "clear my debts", "interest free lending for vendors",
+                      "open an account with zero balance", "borrowing for my shop"],
+    },
+    "te": {
+        "education": ["మా పాప ఫీజు కట్టలేకపోతున్నాం", "కోచింగ్ కోసం సహాయం"],
+        "agriculture": ["కరువుతో పత్తి ఎండిపోయింది", "పాడి ఆవుల కోసం సహాయం"],
+        "women": ["భర్త లేని ఆడవాళ్లకు సహాయం", "పెళ్లి కానుక"],
+        "health": ["నాన్నకు బైపాస్ సర్జరీ", "కీమోథెరపీ ఖర్చు"],
+        "pension": ["మా తాతకు ఆదాయం లేదు", "దివ్యాంగులకు భత్యం"],
+        "employment": ["సంపాదన మార్గం కావాలి", "నిరుద్యోగులకు సహాయం"],
+        "housing": ["తుఫానుకు మా గుడిసె పోయింది", "అద్దె కట్టలేకపోతున్నాం"],
+        "financial": ["చిన్న దుకాణానికి పెట్టుబడి కావాలి", "వడ్డీ లేని అప్పు కావాలి"],
+    },
+    "hi": {
+        "education": ["बेटी की फीस भरने में मदद", "नीट की मुफ्त कोचिंग"],
+        "agriculture": ["सूखे से कपास सूख गई", "डेयरी गायों के लिए सहायता"],
+        "women": ["पति नहीं रहे, कोई मदद", "बहनों के लिए योजनाएं"],
+        "health": ["पिताजी की बाईपास सर्जरी", "कीमोथेरेपी का खर्च"],
+        "pension": ["दादाजी की कोई आमदनी नहीं", "विकलांग भत्ता"],
+        "employment": ["कमाई का कोई साधन नहीं", "युवाओं के लिए भर्ती"],
+        "housing": ["बाढ़ में झोपड़ी बह गई", "अपनी छत चाहिए"],
+        "financial": ["दुकान खोलने के लिए पूंजी", "कर्ज माफी"],
+    },
+}
+
+# Pieces of input that is not a question at all: injection attempts, markup, keyboard mashing
+JUNK_FRAGMENTS = ["'; drop table", "drop table schemes", "select * from", "union select", "or 1=1", "--",
+                  "<script>", "alert(1)", "../../etc/passwd", "${jndi:", "null", "undefined", "asdf", "qwerty",
+                  "lorem ipsum", "test", "xyz", "???", "!!!", "...", "12345", "0000", "@#$%", "http://", ".com"]
+
+
+def junk_messages(count: int, seed: int):
+    """Random junk built from JUNK_FRAGMENTS, random letters, digits and punctuation"""
+    rng = np.random.default_rng(seed)
+    alphabets = ["abcdefghijklmnopqrstuvwxyz", "0123456789", "!@#$%^&*()_+-=[]{};:'\",.<>/?|`~"]
+    messages = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.integers(1, 4)):
+            if rng.random() < 0.5:
+                parts.append(JUNK_FRAGMENTS[rng.integers(len(JUNK_FRAGMENTS))])
+            else:
+                alphabet = alphabets[rng.integers(len(alphabets))]
+                parts.append("".join(rng.choice(list(alphabet), size=rng.integers(2, 10))))
+        messages.append(" ".join(parts))
+    return messages
+
+
+def _first_sentence(value: str) -> str:
+    return re.split(r"(?<=[.!?।])\s", value.strip(), maxsplit=1)[0]
+
+
+def build_examples(csv_path: str):
+    """[(text, intent label or None, category slug or None)]"""
+    examples = []
+    for lang, intents in INTENT_KEYWORDS.items():
+        for name, keywords in intents.items():
+            for keyword in keywords + ([name] if lang == "en" else []):
+                for template in QUERY_TEMPLATES[lang]:
+                    examples.append((template.format(keyword), name, INTENT_CATEGORIES[name]))
+        for message in NO_INTENT_MESSAGES[lang] + sorted(REFINEMENT_STOPWORDS[lang]):
+            examples.append((message, intent.NO_INTENT, None))
+        for name, messages in NATURAL_MESSAGES[lang].items():
+            for message in messages:
+                examples.append((message, name, INTENT_CATEGORIES[name]))
+    for message in junk_messages(JUNK_EXAMPLES, seed=0):
+        examples.append((message, intent.NO_INTENT, None))
+
+    for scheme in build_scheme_rows(pd.read_csv(csv_path), verbose=False):
+        category = resolve(scheme["category"])
+        slug = category.slug if category else None
+        for lang in ("en", "te", "hi"):
+            for text in (scheme[f"scheme_name_{lang}"], _first_sentence(scheme[f"description_{lang}"])):
+                if text and text != "nan":
+                    examples.append((text, CATEGORY_INTENTS.get(slug), slug))
+        examples.append((scheme["beneficiary_tags"], CATEGORY_INTENTS.get(slug), slug))
+    return examples
+
+
+def fit(examples, intents, categories, seed: int) -> intent.IntentModel:
+    natural = {message for intents in NATURAL_MESSAGES.values() for messages in intents.values() for message in messages}
+    examples = [example for example in examples for _ in range(NATURAL_REPEATS if example[0] in natural else 1)]
+    vectors = [intent.features(text) for text, _, _ in examples]
+    heads = []
+    for position, labels in ((1, intents), (2, categories)):
+        rows = [i for i, example in enumerate(examples) if example[position] is not None]
+        y = np.array([labels.index(examples[i][position]) for i in rows])
+        heads.append(intent.train_head([vectors[i] for i in rows], y, len(labels), seed=seed))
+    (intent_weights, intent_bias), (category_weights, category_bias) = heads
+    return intent.IntentModel(intents, categories, intent_weights, intent_bias, category_weights, category_bias)
+
+
+def routing_rate(model: intent.IntentModel):
+    """(share of EVAL_MESSAGES routed to their intent, share of held-out junk routed anywhere)"""
+    hits = total = 0
+    for lang, intents in EVAL_MESSAGES.items():
+        for name, messages in intents.items():
+            for message in messages:
+                if extract_query_keywords(message, lang):
+                    raise ValueError(f"evaluation message {message!r} names an intent keyword")
+                total += 1
+                hits += model.predict(message).intent == name
+    junk = junk_messages(JUNK_EXAMPLES // 4, seed=1)
+    routed = sum(model.predict(message).intent is not None for message in junk)
+    return hits / total, routed / len(junk)
+
+
+def accuracy(model: intent.IntentModel, examples):
+    intent_hits = intent_total = category_hits = category_total = 0
+    for text, intent_label, category_label in examples:
+        intent_probs, category_probs = model.probabilities(text)
+        if intent_label is not None:
+            intent_total += 1
+            intent_hits += model.intents[int(intent_probs.argmax())] == intent_label
+        if category_label is not None:
+            category_total += 1
+            category_hits += model.categories[int(category_probs.argmax())] == category_label
+    return intent_hits / max(intent_total, 1), category_hits / max(category_total, 1)
+
+
+def train(csv_path: str, out: str, seed: int = 0):
+    print("🚀 Training intent classifier...")
+    examples = build_examples(csv_path)
+    intents = sorted(INTENT_CATEGORIES) + [intent.NO_INTENT]
+    categories = [category.slug for category in CATEGORIES]
+    print(f"✅ {len(examples)} examples, {len(intents)} intents, {len(categories)} categories")
+
+    order = np.random.default_rng(seed).permutation(len(examples))
+    held_out = set(order[:len(examples) // 5].tolist())
+    train_set = [example for i, example in enumerate(examples) if i not in held_out]
+    test_set = [example for i, example in enumerate(examples) if i in held_out]
+    started = time.perf_counter()
+    model = fit(train_set, intents, categories, seed)
+    intent_accuracy, category_accuracy = accuracy(model, test_set)
+    print(f"📊 Held out {len(test_set)}: intent accuracy {intent_accuracy:.1%}, "
+          f"category accuracy {category_accuracy:.1%} ({time.perf_counter() - started:.1f}s)")
+
+    model = fit(examples, intents, categories, seed)
+    model.save(out)
+    routed, junk_routed = routing_rate(model)
+    print(f"📊 EVAL_MESSAGES routed to their intent: {routed:.1%}; junk routed: {junk_routed:.1%}")
+
+    model = intent.IntentModel.load(out)
+    started = time.perf_counter()
+    for text, _, _ in examples:
+        model.predict(text)
+    per_message = (time.perf_counter() - started) / len(examples) * 1e6
+    print(f"\n✅ Model written to {out} ({per_message:.0f} µs per prediction)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the chat intent classifier")
+    parser.add_argument("--csv", default="SahayataDatasetFinal.csv", help="dataset to learn categories from")
+    parser.add_argument("--out", default=intent.INTENT_MODEL_PATH, help="model file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    train(args.csv, args.out, args.seed)